@@ -0,0 +1,185 @@
+# bench_pe_utils.py
+#
+# Golden-output check and benchmark for the pe_utils name parser.
+#
+#   python bench_pe_utils.py            # check + benchmark over skinport_cache.json
+#   python bench_pe_utils.py --json X   # use another name list (JSON object keys)
+#
+# The check compares pe_utils.pricempire_url with the original implementation
+# (kept verbatim below as _legacy_*) for every name in the snapshot.
+import json
+import os
+import re
+import sys
+import time
+
+import pe_utils
+
+SNAPSHOT_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bot', 'skinport_cache.json')
+
+# ---- ORIGINAL IMPLEMENTATION (reference only) ----
+def _legacy_sanitize_for_url(text):
+    text = text.lower()
+    text = text.replace('★ ', '')
+    text = text.replace('stattrak™', 'stattrak')
+    text = text.replace(' | ', '-')
+    text = text.replace(' ', '-')
+    text = text.replace('&', 'and')
+    text = text.replace('(', '').replace(')', '')
+    text = re.sub(r'[^a-z0-9-]', '', text)
+    while '--' in text:
+        text = text.replace('--', '-')
+    return text.strip('-')
+
+def _legacy_normalize_case_name(name):
+    name = name.lower()
+    name = re.sub(r'[^a-z0-9 ]', '', name)
+    name = re.sub(r'\s+', ' ', name)
+    return name.strip()
+
+_LEGACY_CASE_CONTAINER_NAMES = set([
+    _legacy_normalize_case_name(x) for x in [
+        "esports 2013 case", "esports 2013 winter case", "esports 2014 summer case",
+        "csgo weapon case", "csgo weapon case 2", "csgo weapon case 3",
+        "cs20 case", "horizon case", "danger zone case", "glove case",
+        "revolver case", "gamma case", "gamma 2 case", "chroma case", "chroma 2 case",
+        "chroma 3 case", "falchion case", "shadow case", "operation vanguard weapon case",
+        "operation breakout weapon case", "operation phoenix weapon case", "operation hydra case",
+        "operation bravo case", "operation wildfire case", "winter offensive weapon case",
+        "huntsman weapon case", "breakout case", "spectrum case", "spectrum 2 case", "clutch case"
+    ]
+])
+
+def _legacy_is_case_or_container(skin):
+    skin_norm = _legacy_normalize_case_name(skin)
+    if skin_norm.endswith(" case") or skin_norm.endswith(" weapon case") or skin_norm.endswith(" container") or " souvenir package" in skin_norm:
+        return True
+    return skin_norm in _LEGACY_CASE_CONTAINER_NAMES
+
+def _legacy_is_glove(skin):
+    glove_types = [
+        'hand wraps', 'moto gloves', 'specialist gloves', 'sport gloves', 'driver gloves',
+        'hydra gloves', 'broken fang gloves', 'bloodhound gloves'
+    ]
+    lower = skin.lower()
+    return any(gt in lower for gt in glove_types)
+
+def _legacy_flatten_skin_name(skin_name):
+    m = re.match(r'^(.*)\s+\(([^()]*)\)\s*$', skin_name)
+    if m:
+        return _legacy_sanitize_for_url(m.group(2))
+    return _legacy_sanitize_for_url(skin_name)
+
+def _legacy_pricempire_url(skin):
+    skin = skin.strip()
+    lower = skin.lower()
+
+    # --- PINS ---
+    parts = lower.split()
+    if parts and parts[-1] == 'pin':
+        slug = _legacy_sanitize_for_url(skin)
+        return f"https://pricempire.com/cs2-items/pin/{slug}"
+
+    # --- GLOVES ---
+    if _legacy_is_glove(skin):
+        name = skin.replace('★', '').replace('StatTrak™', '').replace('Souvenir', '').strip()
+        m = re.match(r'([^\|]+)\s*\|\s*([^(]+(?:\([^)]+\))?)\s*\(([^)]+)\)', name)
+        if m:
+            weapon    = _legacy_sanitize_for_url(m.group(1))
+            skin_name = _legacy_flatten_skin_name(m.group(2))
+            wear      = _legacy_sanitize_for_url(m.group(3))
+            return f"https://pricempire.com/cs2-items/glove/{weapon}-{skin_name}/{wear}"
+        else:
+            return f"https://pricempire.com/cs2-items/glove/{_legacy_sanitize_for_url(name)}"
+
+    # --- CASES & CONTAINERS ---
+    if _legacy_is_case_or_container(skin):
+        return f"https://pricempire.com/cs2-items/container/{_legacy_sanitize_for_url(skin)}"
+
+    # --- STICKERS ---
+    if 'sticker' in lower:
+        # tournament-sticker with finish
+        m = re.match(r'Sticker\s*\|\s*([^(|]+)\s*\(([^)]+)\)\s*\|\s*([^\|]+)', skin, re.IGNORECASE)
+        if m:
+            team       = _legacy_sanitize_for_url(m.group(1))
+            finish     = _legacy_sanitize_for_url(m.group(2))
+            tournament = _legacy_sanitize_for_url(m.group(3))
+            return f"https://pricempire.com/cs2-items/tournament-sticker/sticker-{team}-{tournament}/{finish}"
+        # tournament-sticker without finish
+        m = re.match(r'Sticker\s*\|\s*([^\|]+)\|\s*([^\|]+)', skin, re.IGNORECASE)
+        if m:
+            team       = _legacy_sanitize_for_url(m.group(1))
+            tournament = _legacy_sanitize_for_url(m.group(2))
+            return f"https://pricempire.com/cs2-items/tournament-sticker/sticker-{team}-{tournament}"
+        # plain sticker with subtype
+        m = re.match(r'Sticker\s*\|\s*([^\(]+)\(([^)]+)\)', skin, re.IGNORECASE)
+        if m:
+            main = _legacy_sanitize_for_url(m.group(1))
+            sub  = _legacy_sanitize_for_url(m.group(2))
+            return f"https://pricempire.com/cs2-items/sticker/sticker-{main}/{sub}"
+        # tournament-autograph sticker
+        m = re.match(r'Sticker\s*\|\s*([^(|]+)\s*\(([^)]+)\)\s*\|\s*([^\|]+)', skin, re.IGNORECASE)
+        if m:
+            player     = _legacy_sanitize_for_url(m.group(1))
+            team       = _legacy_sanitize_for_url(m.group(2))
+            tournament = _legacy_sanitize_for_url(m.group(3))
+            return f"https://pricempire.com/cs2-items/tournament-autograph/sticker-{player}-{team}-{tournament}"
+        # fallback
+        return f"https://pricempire.com/cs2-items/sticker/{_legacy_sanitize_for_url(skin)}"
+
+    # --- STANDARD SKINS ---
+    is_stattrak = 'stattrak' in lower
+    is_souvenir = 'souvenir' in lower
+    name = skin.replace('★', '').replace('StatTrak™', '').replace('Souvenir', '').strip()
+    m = re.match(r'([^\|]+)\|\s*([^(]+(?:\([^)]+\))?)\s*\(([^)]+)\)', name)
+    if m:
+        weapon    = _legacy_sanitize_for_url(m.group(1))
+        skin_name = _legacy_flatten_skin_name(m.group(2))
+        wear      = _legacy_sanitize_for_url(m.group(3))
+        base      = f"https://pricempire.com/cs2-items/skin/{weapon}-{skin_name}"
+        if is_stattrak:
+            return f"{base}/stattrak-{wear}"
+        elif is_souvenir:
+            return f"{base}/souvenir-{wear}"
+        else:
+            return f"{base}/{wear}"
+    else:
+        return f"https://pricempire.com/cs2-items/skin/{_legacy_sanitize_for_url(name)}"
+
+def check(names):
+    mismatches = [(n, _legacy_pricempire_url(n), pe_utils.pricempire_url(n))
+                  for n in names if _legacy_pricempire_url(n) != pe_utils.pricempire_url(n)]
+    for name, old, new in mismatches[:20]:
+        print(f"[MISMATCH] {name!r}\n    legacy: {old}\n    new:    {new}")
+    print(f"Golden check: {len(names) - len(mismatches)}/{len(names)} URLs identical")
+    return not mismatches
+
+def bench(names):
+    def timed(fn, setup=lambda: None, repeat=5):
+        best = float('inf')
+        for _ in range(repeat):
+            setup()
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    t_legacy = timed(lambda: [_legacy_pricempire_url(n) for n in names])
+    t_cold = timed(lambda: pe_utils.parse_many(names), setup=pe_utils.parse_skin_name.cache_clear)
+    t_warm = timed(lambda: pe_utils.parse_many(names))
+    n = len(names)
+    print(f"legacy pricempire_url : {t_legacy*1000:8.1f} ms ({t_legacy/n*1e6:.1f} µs/name)")
+    print(f"parse_many (cold)     : {t_cold*1000:8.1f} ms ({t_cold/n*1e6:.1f} µs/name)")
+    print(f"parse_many (cached)   : {t_warm*1000:8.1f} ms ({t_warm/n*1e6:.1f} µs/name)")
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--json', default=SNAPSHOT_JSON, help='JSON object whose keys are market_hash_names')
+    args = parser.parse_args()
+
+    with open(args.json, encoding='utf-8') as f:
+        names = list(json.load(f))
+    ok = check(names)
+    bench(names)
+    sys.exit(0 if ok else 1)
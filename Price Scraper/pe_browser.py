@@ -0,0 +1,143 @@
+# pe_browser.py
+#
+# How scraping browsers are launched. The lean profile (on by default, set
+# PE_LEAN_BROWSER=0 to turn it off) only fetches what the price lookups read:
+#
+#   * images are disabled, and images, fonts, media and known ad / analytics
+#     hosts are blocked through the DevTools protocol (Network.setBlockedURLs)
+#   * page load strategy 'eager': driver.get returns at DOMContentLoaded
+#     instead of waiting for every subresource, and wait_until_ready() polls
+#     until the variant tiles and deal links are in the DOM with their prices
+#
+# wait_until_ready() also hands back the page's own resource timing (bytes
+# transferred, request count, time to DOMContentLoaded), which is recorded in
+# the profiler so the savings show up in --profile reports.
+#
+# undetected_chromedriver (and Selenium under it) is only imported when a
+# browser is actually launched, so code that merely imports the scraper -
+# a cache hit, the CSV valuation, bot.js's one-shot CLI - starts quickly.
+#
+#   python pe_browser.py URL [URL ...]    # load each page lean and full, compare
+import os
+import time
+
+from pe_profile import PROFILE
+
+# ---- CONFIG ----
+LEAN = os.getenv('PE_LEAN_BROWSER', '1') != '0'
+PAGE_LOAD_STRATEGY = 'eager'
+READY_POLL_SECONDS = 0.1
+BLOCKED_URLS = [
+    # images, fonts, media
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+    # ads and analytics
+    '*google-analytics.com*', '*googletagmanager.com*', '*googlesyndication.com*',
+    '*doubleclick.net*', '*adservice.google.*', '*facebook.net*', '*connect.facebook.*',
+    '*hotjar.com*', '*clarity.ms*', '*segment.io*', '*cdn.segment.com*', '*mixpanel.com*',
+    '*sentry.io*', '*intercom.io*', '*crisp.chat*', '*tiktok.com*', '*twitter.com/i/adsct*',
+]
+
+# Returns null until a variant tile and a deal box both show a price, then
+# the navigation's resource timing. With arguments[0] set (the last poll,
+# once the timeout is up) a fully loaded document is accepted instead, for
+# pages that really lack one of the sections. transferSize is 0 for
+# cross-origin resources without Timing-Allow-Origin, so bytes are a lower
+# bound.
+READY_SCRIPT = """
+const priced = (sel, box) => Array.from(document.querySelectorAll(sel)).some(a => {
+    const root = box ? a.closest(box) : a;
+    return root && Array.from(root.querySelectorAll('span')).some(s => /\\$\\s*\\d/.test(s.textContent));
+});
+const ready = priced('a[role="listitem"]') && priced('a[rel="nofollow noopener"]', 'div.flex-col');
+if (!ready && !(arguments[0] && document.readyState === 'complete')) return null;
+const nav = performance.getEntriesByType('navigation')[0];
+const res = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const r of res) bytes += r.transferSize || 0;
+return {bytes: bytes, requests: res.length + 1,
+        dcl_ms: nav ? nav.domContentLoadedEventEnd : 0, complete: ready};
+"""
+
+_uc = None
+
+def chrome_module():
+    """undetected_chromedriver, imported on first use."""
+    global _uc
+    if _uc is None:
+        import undetected_chromedriver as uc
+        # ---- SUPPRESS CHROME __del__ ERRORS ----
+        uc.Chrome.__del__ = lambda self: None
+        _uc = uc
+    return _uc
+
+def chrome_options(lean=LEAN):
+    uc = chrome_module()
+    options = uc.ChromeOptions()
+    if lean:
+        options.page_load_strategy = PAGE_LOAD_STRATEGY
+        options.add_argument('--blink-settings=imagesEnabled=false')
+    return options
+
+def launch(lean=LEAN):
+    """Start a scraping Chrome, lean unless told otherwise."""
+    uc = chrome_module()
+    if not lean:
+        return uc.Chrome()
+    driver = uc.Chrome(options=chrome_options(lean))
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+    except Exception as e:
+        # still usable, just heavier
+        print(f"[BROWSER] Couldn't set up request blocking: {e}")
+    return driver
+
+def wait_until_ready(driver, timeout):
+    """
+    Poll until both price sections have rendered (at least once, at most
+    `timeout` seconds); at the timeout a fully loaded page is accepted as is.
+    Returns the page's timing dict (complete=False for that fallback), or
+    None if it never got ready.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        last = time.monotonic() >= deadline
+        try:
+            stats = driver.execute_script(READY_SCRIPT, last)
+        except Exception:
+            stats = None
+        if stats:
+            if not stats.get('complete', True):
+                PROFILE.fail('ready_on_load')
+            PROFILE.count('page_bytes', stats.get('bytes') or 0)
+            PROFILE.count('page_requests', stats.get('requests') or 0)
+            PROFILE.record('dom_ready', (stats.get('dcl_ms') or 0) / 1000)
+            return stats
+        if last:
+            PROFILE.fail('not_ready')
+            return None
+        time.sleep(READY_POLL_SECONDS)
+
+def compare(urls, timeout=10):
+    """Load each URL with the lean and the default profile and print bytes and load time."""
+    for lean in (True, False):
+        driver = launch(lean)
+        try:
+            for url in urls:
+                t0 = time.perf_counter()
+                driver.get(url)
+                stats = wait_until_ready(driver, timeout) or {}
+                elapsed = time.perf_counter() - t0
+                print(f"[BROWSER] {'lean' if lean else 'full':<4} {elapsed:6.2f}s "
+                      f"{(stats.get('bytes') or 0) / 1024:9.0f} KiB {stats.get('requests', '?'):>4} requests  {url}")
+        finally:
+            driver.quit()
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        print("usage: python pe_browser.py URL [URL ...]")
+        sys.exit(1)
+    compare(sys.argv[1:])
@@ -0,0 +1,196 @@
+# pe_driver_pool.py
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from pe_browser import launch
+from pe_profile import PROFILE
+
+# ---- CONFIG ----
+MAX_PAGES_PER_DRIVER = 40     # recycle a browser after this many page loads
+MAX_RSS_MB_PER_DRIVER = 1500  # ...or once its process tree grows past this
+
+# uc patches the chromedriver binary on launch, so launches must not overlap
+_launch_lock = threading.Lock()
+
+def launch_chrome():
+    """Start one scraping Chrome (serialized across threads)."""
+    with _launch_lock:
+        return launch()
+
+def _proc_children(pid):
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    try:
+        for tid in os.listdir(task_dir):
+            with open(f"{task_dir}/{tid}/children") as f:
+                children.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return children
+
+def _proc_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def driver_rss_mb(driver):
+    """Resident memory of a browser and all its child processes, or None if unknown."""
+    pid = getattr(driver, "browser_pid", None)
+    if not pid or not os.path.exists(f"/proc/{pid}"):
+        return None
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        p = stack.pop()
+        total_kb += _proc_rss_kb(p)
+        stack.extend(_proc_children(p))
+    return total_kb / 1024
+
+def is_alive(driver):
+    """Cheap round trip to check the browser session still responds."""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+class DriverPool:
+    """
+    Fixed-size pool of long-lived browsers shared by worker threads.
+
+    Browsers are launched lazily (at most `size` of them), health-checked when
+    handed out, and replaced after `max_pages` uses, once they grow past
+    `max_rss_mb`, or when they stop responding.
+    """
+
+    def __init__(self, size, factory=launch_chrome,
+                 max_pages=MAX_PAGES_PER_DRIVER, max_rss_mb=MAX_RSS_MB_PER_DRIVER):
+        self.size = size
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._closed = False
+        self.launches = 0
+        self.recycled = 0
+        self.crashed = 0
+
+    def _launch(self):
+        try:
+            with PROFILE.stage('launch'):
+                driver = self.factory()
+        except Exception:
+            PROFILE.fail('launch_failed')
+            with self._lock:
+                self._live -= 1
+            if not self._closed:
+                # the slot is free again; wake a waiting worker to retry the launch
+                self._idle.put(None)
+            raise
+        with self._lock:
+            self.launches += 1
+        return _PooledDriver(driver)
+
+    def _retire(self, pd):
+        with self._lock:
+            self._live -= 1
+        try:
+            with PROFILE.stage('quit'):
+                pd.driver.quit()
+        except Exception:
+            pass
+        if not self._closed:
+            # wake a waiting worker so it launches the replacement
+            self._idle.put(None)
+
+    def _acquire(self):
+        while True:
+            try:
+                pd = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_launch = self._live < self.size
+                    if can_launch:
+                        self._live += 1
+                if can_launch:
+                    return self._launch()
+                pd = self._idle.get()
+
+            if pd is None:
+                continue
+            if is_alive(pd.driver):
+                return pd
+            print("[POOL] Driver stopped responding, replacing it.")
+            PROFILE.fail('driver_crashed')
+            with self._lock:
+                self.crashed += 1
+            self._retire(pd)
+
+    def _release(self, pd):
+        pd.pages += 1
+        if self._closed:
+            self._retire(pd)
+            return
+        if not is_alive(pd.driver):
+            PROFILE.fail('driver_crashed')
+            with self._lock:
+                self.crashed += 1
+            self._retire(pd)
+            return
+        rss = driver_rss_mb(pd.driver)
+        if pd.pages >= self.max_pages or (rss is not None and rss > self.max_rss_mb):
+            with self._lock:
+                self.recycled += 1
+            self._retire(pd)
+            return
+        self._idle.put(pd)
+
+    def warm(self, count=None):
+        """Launch browsers up front so the first requests don't pay for cold starts."""
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self._live >= count:
+                    return
+                self._live += 1
+            self._idle.put(self._launch())
+
+    @contextmanager
+    def driver(self):
+        """Borrow a browser for one unit of work."""
+        with PROFILE.stage('acquire'):
+            pd = self._acquire()
+        try:
+            yield pd.driver
+        finally:
+            self._release(pd)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                pd = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if pd is not None:
+                self._retire(pd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
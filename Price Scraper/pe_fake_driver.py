@@ -0,0 +1,207 @@
+# pe_fake_driver.py
+#
+# Stand-in for a Chrome WebDriver that implements just the subset of the
+# Selenium API the scrape path touches (get, page_source, current_url,
+# execute_script for window.open('') and the readiness check, execute_cdp_cmd,
+# window_handles, switch_to.window, close, quit). Pages come from recorded
+# HTML fixtures (saved with PE_SAVE_HTML_DIR) or are synthesised in
+# pricempire's markup, with configurable latency and failure injection.
+# Used by bot/bench_pipeline.py to benchmark offline.
+import os
+import random
+import sys
+import threading
+import time
+import types
+import zlib
+
+WEARS = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+MARKETS = ["Buff163", "Skinport", "CSFloat", "Steam", "DMarket", "Youpin898"]
+
+class FakeTimeout(Exception):
+    """Raised by FakeDriver.get() for injected page-load failures."""
+
+def _slug(url):
+    return url.split("/cs2-items/", 1)[-1].replace("/", "__")
+
+def synth_page(url, padding_kb=0):
+    """A pricempire-shaped item page with prices derived from the URL."""
+    seed = zlib.crc32(url.encode())
+    base = 0.05 + (seed % 500000) / 100
+    tiles = []
+    for i, wear in enumerate(WEARS):
+        for prefix in ("", "StatTrak™ "):
+            p = base * (1.6 - 0.15 * i) * (2.2 if prefix else 1.0)
+            tiles.append(
+                f'<a role="listitem" href="#"><div>{prefix}{wear}</div>'
+                f'<span class="font-bold text-theme-200">${p:,.2f}</span></a>'
+            )
+    # plus a tile for the variant in the URL itself (sticker finishes,
+    # graffiti colours, ...) so every synthetic page has a matching price;
+    # the slug drops punctuation, so spell it "gold champion" and
+    # "gold, champion" as well, for variants like "(Gold, Champion)"
+    tail = url.rstrip("/").rsplit("/", 1)[-1]
+    words = tail.split("-")
+    tiles.append(
+        f'<a role="listitem" href="#"><div>{" ".join(words)} / {", ".join(words)} / {tail}</div>'
+        f'<span class="font-bold text-theme-200">${base:,.2f}</span></a>'
+    )
+    deals = []
+    for j, market in enumerate(MARKETS):
+        p = base * (0.92 + 0.03 * ((seed >> j) % 5))
+        deals.append(
+            f'<div class="flex flex-col gap-2"><img alt="{market}" src="/m/{j}.png">'
+            f'<span class="text-2xl font-bold">${p:,.2f}</span>'
+            f'<a rel="nofollow noopener" href="https://example.invalid/{j}">Buy</a></div>'
+        )
+    filler = ""
+    if padding_kb:
+        row = '<div class="card"><span class="muted">listing</span><img src="/x.png"></div>'
+        filler = row * (padding_kb * 1024 // len(row))
+    return (f"<html><head><script>window.__NUXT__={{}}</script></head><body>"
+            f"<nav>{filler}</nav><div>{''.join(tiles)}</div><section>{''.join(deals)}</section>"
+            f"</body></html>")
+
+class FixturePages:
+    """
+    Recorded pages by slug; a URL with no recording gets a recorded page
+    chosen by hash (so prices parse the same way) or, with no fixtures at
+    all, a synthesised one.
+    """
+    def __init__(self, fixture_dir=None, padding_kb=0):
+        self.pages = {}
+        if fixture_dir:
+            for name in sorted(os.listdir(fixture_dir)):
+                if name.endswith(".html"):
+                    with open(os.path.join(fixture_dir, name), encoding="utf-8") as f:
+                        self.pages[name[:-5]] = f.read()
+        self._recorded = list(self.pages.values())
+        self.padding_kb = padding_kb
+
+    def page_for(self, url):
+        slug = _slug(url)
+        page = self.pages.get(slug)
+        if page is not None:
+            return page
+        if self._recorded:
+            return self._recorded[zlib.crc32(slug.encode()) % len(self._recorded)]
+        return synth_page(url, self.padding_kb)
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def window(self, handle):
+        if handle not in self._driver.window_handles:
+            raise RuntimeError(f"no such window: {handle}")
+        self._driver._current = handle
+
+class FakeDriver:
+    def __init__(self, pages, latency_ms=0.0, jitter=0.5, fail_rate=0.0, blank_rate=0.0, seed=None):
+        self.pages = pages
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.blank_rate = blank_rate
+        self._rng = random.Random(seed)
+        self._next_handle = 1
+        self._current = "w0"
+        self.window_handles = ["w0"]
+        self.switch_to = _SwitchTo(self)
+        self.current_url = "about:blank"
+        self.page_source = "<html></html>"
+        self.browser_pid = None
+        self.loads = 0
+        self.cdp = []
+        self._load_ms = 0.0
+
+    def get(self, url):
+        self._load_ms = 0.0
+        if self.latency_ms:
+            # log-normal around the configured mean, like real page loads
+            delay = self.latency_ms * self._rng.lognormvariate(0, self.jitter) / 1000
+            time.sleep(delay)
+            self._load_ms = delay * 1000
+        self.loads += 1
+        if self._rng.random() < self.fail_rate:
+            raise FakeTimeout(f"timeout loading {url}")
+        self.current_url = url
+        if self._rng.random() < self.blank_rate:
+            self.page_source = "<html><body>Just a moment...</body></html>"
+        else:
+            self.page_source = self.pages.page_for(url)
+
+    def execute_script(self, script, *args):
+        if "window.open" in script:
+            handle = f"w{self._next_handle}"
+            self._next_handle += 1
+            self.window_handles.append(handle)
+        elif "performance.getEntriesByType" in script:
+            # pe_browser's readiness check: ready once both price sections are
+            # in; on the last poll (args[0]) a loaded page will do
+            ready = 'role="listitem"' in self.page_source and 'rel="nofollow noopener"' in self.page_source
+            if not ready and not (args and args[0]):
+                return None
+            return {"bytes": len(self.page_source.encode()), "requests": 1,
+                    "dcl_ms": self._load_ms, "complete": ready}
+        return None
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp.append((cmd, params))
+        return {}
+
+    def close(self):
+        if self._current in self.window_handles:
+            self.window_handles.remove(self._current)
+
+    def quit(self):
+        self.window_handles = []
+
+class FakeChromeFactory:
+    """Callable that hands out FakeDrivers sharing one fixture set (thread-safe)."""
+    def __init__(self, pages, launch_ms=0.0, **driver_kw):
+        self.pages = pages
+        self.launch_ms = launch_ms
+        self.driver_kw = driver_kw
+        self._lock = threading.Lock()
+        self.launched = 0
+        self.drivers = []
+
+    def __call__(self, *args, **kwargs):
+        if self.launch_ms:
+            time.sleep(self.launch_ms / 1000)
+        with self._lock:
+            self.launched += 1
+            seed = self.launched
+        driver = FakeDriver(self.pages, seed=seed, **self.driver_kw)
+        with self._lock:
+            self.drivers.append(driver)
+        return driver
+
+    def page_loads(self):
+        with self._lock:
+            return sum(d.loads for d in self.drivers)
+
+def install(factory):
+    """
+    Make `undetected_chromedriver.Chrome` return fake drivers, so every
+    launch path (driver pool, update_inventory's LazyDriver, a bare
+    get_pe_price_for_item) gets one. Chrome itself doesn't have to exist.
+    """
+    try:
+        import undetected_chromedriver as uc
+    except ImportError:
+        uc = types.ModuleType("undetected_chromedriver")
+        sys.modules["undetected_chromedriver"] = uc
+    uc.Chrome = type("FakeChrome", (), {"__new__": lambda cls, *a, **kw: factory(*a, **kw)})
+    if not hasattr(uc, "ChromeOptions"):
+        uc.ChromeOptions = _FakeOptions
+    return uc
+
+class _FakeOptions:
+    def __init__(self):
+        self.arguments = []
+        self.page_load_strategy = "normal"
+
+    def add_argument(self, arg):
+        self.arguments.append(arg)
@@ -0,0 +1,235 @@
+# pe_page.py
+#
+# Offline extraction of prices from a pricempire item page. The browser only
+# has to hand over `driver.page_source` once; everything below is pure Python
+# so it can be tested and benchmarked against saved HTML without Chrome.
+import re
+from bisect import bisect_left
+from collections import namedtuple
+from html.parser import HTMLParser
+
+_VOID_TAGS = frozenset([
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+])
+_SKIP_TEXT_TAGS = frozenset(["script", "style", "noscript", "template"])
+_WS = re.compile(r"\s+")
+
+# One market's listing for the item: where, how much (as shown, e.g. "$1.23"), and the deal link
+Listing = namedtuple("Listing", "market price link")
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent", "index")
+
+    def __init__(self, tag, attrs, parent, index):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+        self.index = index
+
+    def get(self, attr, default=""):
+        return self.attrs.get(attr) or default
+
+    def classes(self):
+        return self.get("class").split()
+
+    def iter(self):
+        """All descendant elements in document order."""
+        stack = list(reversed(self.children))
+        while stack:
+            child = stack.pop()
+            if isinstance(child, Node):
+                yield child
+                stack.extend(reversed(child.children))
+
+    def text(self):
+        """Whitespace-normalised text content, roughly what WebElement.text gives."""
+        parts = []
+        stack = list(reversed(self.children))
+        while stack:
+            child = stack.pop()
+            if isinstance(child, str):
+                parts.append(child)
+            elif child.tag not in _SKIP_TEXT_TAGS:
+                stack.extend(reversed(child.children))
+        return _WS.sub(" ", "".join(parts)).strip()
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#root", {}, None, 0)
+        self.stack = [self.root]
+        self.count = 1
+        self.imgs = []  # every <img>, in document order
+
+    def handle_starttag(self, tag, attrs):
+        parent = self.stack[-1]
+        node = Node(tag, dict(attrs), parent, self.count)
+        self.count += 1
+        parent.children.append(node)
+        if tag == "img":
+            self.imgs.append(node)
+        if tag not in _VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        # tolerate sloppy markup: close up to the nearest matching open tag
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+class Page:
+    """A parsed page plus the indexes the price lookups need."""
+
+    def __init__(self, html):
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        self.root = builder.root
+        self.imgs = builder.imgs
+        self._img_index = [img.index for img in self.imgs]
+
+    def find_all(self, pred):
+        return [n for n in self.root.iter() if pred(n)]
+
+    def preceding_img(self, node):
+        """Equivalent of the XPath `preceding::img[1]` (images are never ancestors)."""
+        i = bisect_left(self._img_index, node.index)
+        return self.imgs[i - 1] if i else None
+
+def _ancestor_flex_col(node):
+    p = node.parent
+    while p is not None:
+        if p.tag == "div" and "flex-col" in p.get("class"):
+            return p
+        p = p.parent
+    return None
+
+def _first_text(nodes):
+    for n in nodes:
+        return n.text()
+    return ""
+
+def read_variants(page):
+    """(label, price) for every wear/StatTrak variant tile on the page."""
+    variants = []
+    for el in page.find_all(lambda n: n.tag == "a" and n.get("role") == "listitem"):
+        label = el.text().lower().replace("\r", "").strip()
+        price = None
+        for span in el.iter():
+            if span.tag == "span":
+                cls = span.classes()
+                if "font-bold" in cls and "text-theme-200" in cls:
+                    price = span.text()
+                    break
+        variants.append((label, price))
+    return variants
+
+def _deal_links(page):
+    """(link node, market_name, market_price) for every outbound deal link, in page order."""
+    for link in page.find_all(lambda n: n.tag == "a" and n.get("rel") == "nofollow noopener"):
+        img = page.preceding_img(link)
+        name = img.get("alt") if img is not None else ""
+
+        price = ""
+        box = _ancestor_flex_col(link)
+        if box is not None:
+            price = _first_text(
+                n for n in box.iter() if n.tag == "span" and "text-2xl" in n.get("class")
+            )
+            if not price:
+                for b in box.iter():
+                    if b.tag == "span" and "font-bold" in b.classes():
+                        t = b.text()
+                        if t.startswith("$") and len(t) > 1:
+                            price = t
+                            break
+        yield link, name, price
+
+def read_market_links(page):
+    """(market_name, market_price) for every outbound deal link, in page order."""
+    return [(name, price) for _, name, price in _deal_links(page)]
+
+def read_market_ladder(page):
+    """Every priced market listing on the page as Listings, in page order."""
+    return [Listing(name, price, link.get("href"))
+            for link, name, price in _deal_links(page) if usd_cents(price) is not None]
+
+def usd_cents(price):
+    """'$1,234.56' -> 123456; None if it isn't a price."""
+    try:
+        return int(round(float(price.replace("$", "").replace(",", "").strip()) * 100))
+    except (AttributeError, ValueError):
+        return None
+
+def cheapest_ask(ladder):
+    """The lowest-priced listing (where to buy), or None."""
+    return min(ladder, key=lambda l: usd_cents(l.price), default=None)
+
+def best_venue(ladder):
+    """The highest-priced listing (where a sale fetches the most), or None."""
+    return max(ladder, key=lambda l: usd_cents(l.price), default=None)
+
+def pick_price_from_variants(variants, variant_name):
+    want = variant_name.lower()
+    for label, price in variants:
+        if price is None:
+            continue
+        if want in label:
+            return price
+    return ""
+
+def first_priced_market(markets):
+    for name, market_price in markets:
+        if market_price:
+            return name, market_price
+    return "", ""
+
+def extract_item_prices(html, variant_name):
+    """
+    Pure-Python version of the scrape: returns (price, market_name, market_price)
+    where price is the matching variant's price and the market is the first
+    deal link that shows a price.
+    """
+    page = Page(html)
+    price = pick_price_from_variants(read_variants(page), variant_name)
+    market_name, market_price = first_priced_market(read_market_links(page))
+    return price, market_name, market_price
+
+def extract_item_ladder(html, variant_name):
+    """(variant price, market ladder) from one page."""
+    page = Page(html)
+    return pick_price_from_variants(read_variants(page), variant_name), read_market_ladder(page)
+
+# Optional CLI: run the extraction (and time it) against a saved page
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("html_file", help="Saved pricempire page (see PE_SAVE_HTML_DIR)")
+    parser.add_argument("variant", nargs="?", default="", help="Wear to pick, e.g. 'Field-Tested'")
+    parser.add_argument("--bench", type=int, default=0, help="Repeat N times and report timing")
+    args = parser.parse_args()
+
+    with open(args.html_file, encoding="utf-8") as f:
+        html = f.read()
+    print(extract_item_prices(html, args.variant))
+    for listing in read_market_ladder(Page(html)):
+        print(f"  {listing.market:<16} {listing.price:>12}  {listing.link}")
+    if args.bench:
+        t0 = time.perf_counter()
+        for _ in range(args.bench):
+            extract_item_prices(html, args.variant)
+        dt = (time.perf_counter() - t0) / args.bench
+        print(f"{len(html)/1024:.0f} KiB page: {dt*1000:.2f} ms per extraction")
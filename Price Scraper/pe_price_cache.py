@@ -0,0 +1,202 @@
+# pe_price_cache.py
+#
+# On-disk price cache shared by every pricempire consumer (GetOrderPrices,
+# update_inventory and the bot.js scraper CLI). SQLite in WAL mode lets
+# several processes and threads read while one writes without corrupting it.
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from pe_page import Listing
+from pe_utils import parse_skin_name
+
+DEFAULT_DB = os.getenv(
+    'PE_PRICE_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_cache.db')
+)
+
+# How long a scraped price stays fresh, per item class (seconds)
+HOUR = 3600
+TTL_BY_CLASS = {
+    'case':    24 * HOUR,
+    'sticker': 12 * HOUR,
+    'pin':     24 * HOUR,
+    'skin':     6 * HOUR,
+    'glove':    2 * HOUR,
+    'knife':    2 * HOUR,
+}
+
+CachedPrice = namedtuple('CachedPrice', 'skin price market market_price fetched_at')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    skin          TEXT PRIMARY KEY,
+    price         TEXT NOT NULL,
+    market        TEXT NOT NULL,
+    market_price  TEXT NOT NULL,
+    fetched_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ladders (
+    skin          TEXT PRIMARY KEY,
+    ladder        TEXT NOT NULL,   -- JSON [[market, price, link], ...]
+    fetched_at    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failures (
+    skin          TEXT PRIMARY KEY,
+    failures      INTEGER NOT NULL,
+    until         REAL NOT NULL
+);
+"""
+
+def item_class(skin):
+    return parse_skin_name(skin).kind
+
+def ttl_for(skin):
+    return TTL_BY_CLASS[item_class(skin)]
+
+class PriceCache:
+    def __init__(self, path=DEFAULT_DB, ttl=None):
+        self.path = path
+        self.ttl = ttl  # override the per-class TTL (seconds), e.g. for tests
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        # one connection per thread; WAL + busy timeout handles cross-process access
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def is_fresh(self, entry, now=None, max_age=None):
+        if max_age is None:
+            max_age = self.ttl if self.ttl is not None else ttl_for(entry.skin)
+        return ((now or time.time()) - entry.fetched_at) <= max_age
+
+    def get_any(self, skin):
+        """Cached entry for `skin`, fresh or not."""
+        row = self._conn().execute(
+            'SELECT skin, price, market, market_price, fetched_at FROM prices WHERE skin = ?',
+            (skin,)
+        ).fetchone()
+        return CachedPrice(*row) if row else None
+
+    def get(self, skin, max_age=None):
+        """Cached entry for `skin` if it is still within its TTL, else None."""
+        entry = self.get_any(skin)
+        if entry and self.is_fresh(entry, max_age=max_age):
+            return entry
+        return None
+
+    def get_many(self, skins, max_age=None):
+        """{skin: entry} for every skin that has a fresh entry."""
+        found = {}
+        skins = list(skins)
+        now = time.time()
+        conn = self._conn()
+        for i in range(0, len(skins), 500):
+            chunk = skins[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            for row in conn.execute(
+                f'SELECT skin, price, market, market_price, fetched_at FROM prices WHERE skin IN ({marks})',
+                chunk
+            ):
+                entry = CachedPrice(*row)
+                if self.is_fresh(entry, now=now, max_age=max_age):
+                    found[entry.skin] = entry
+        return found
+
+    def get_ladders(self, skins, max_age=None):
+        """{skin: [Listing]} for every skin with a fresh market ladder."""
+        found = {}
+        skins = list(skins)
+        now = time.time()
+        conn = self._conn()
+        for i in range(0, len(skins), 500):
+            chunk = skins[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            for skin, ladder, fetched_at in conn.execute(
+                f'SELECT skin, ladder, fetched_at FROM ladders WHERE skin IN ({marks})', chunk
+            ):
+                if self.is_fresh(CachedPrice(skin, '', '', '', fetched_at), now=now, max_age=max_age):
+                    found[skin] = [Listing(*l) for l in json.loads(ladder)]
+        return found
+
+    def last_write(self):
+        """fetched_at of the newest price (0 when empty); changes whenever any price does."""
+        row = self._conn().execute('SELECT MAX(fetched_at), COUNT(*) FROM prices').fetchone()
+        return [row[0] or 0, row[1]]
+
+    def put(self, skin, price, market='', market_price='', fetched_at=None, ladder=None):
+        fetched_at = fetched_at or time.time()
+        with self._conn() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO prices (skin, price, market, market_price, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (skin, price, market or '', market_price or '', fetched_at)
+            )
+            if ladder is not None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO ladders (skin, ladder, fetched_at) VALUES (?, ?, ?)',
+                    (skin, json.dumps([list(l) for l in ladder]), fetched_at)
+                )
+            conn.execute('DELETE FROM failures WHERE skin = ?', (skin,))
+
+    # ---- negative cache: skins that keep failing are skipped for a while ----
+    def failed_recently(self, skin):
+        row = self._conn().execute('SELECT until FROM failures WHERE skin = ?', (skin,)).fetchone()
+        return bool(row) and row[0] > time.time()
+
+    def mark_failed(self, skin, ttl):
+        """Skip `skin` for `ttl` seconds, doubled for every failure already on record."""
+        with self._conn() as conn:
+            row = conn.execute('SELECT failures FROM failures WHERE skin = ?', (skin,)).fetchone()
+            count = (row[0] if row else 0) + 1
+            conn.execute(
+                'INSERT OR REPLACE INTO failures (skin, failures, until) VALUES (?, ?, ?)',
+                (skin, count, time.time() + ttl * 2 ** min(count - 1, 4))
+            )
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def read_through(cache, skin, scrape, max_age=None):
+    """
+    Return (price, market, market_price) from the cache when fresh, otherwise
+    call `scrape(skin)` and store the result if it produced a price.
+    """
+    entry = cache.get(skin, max_age=max_age)
+    if entry:
+        return entry.price, entry.market, entry.market_price
+    price, market, market_price = scrape(skin)
+    if price:
+        cache.put(skin, price, market, market_price)
+    return price, market, market_price
+
+def read_through_ladder(cache, skin, scrape_quote, max_age=None):
+    """
+    Return (price, ladder) from the cache when fresh, otherwise call
+    `scrape_quote(skin)` (-> price, ladder) and store both if it produced a
+    price. An entry cached before ladders were kept yields its one market.
+    """
+    entry = cache.get(skin, max_age=max_age)
+    if entry:
+        ladder = cache.get_ladders([skin], max_age=max_age).get(skin)
+        if ladder is None:
+            ladder = [Listing(entry.market, entry.market_price, '')] if entry.market_price else []
+        return entry.price, ladder
+    price, ladder = scrape_quote(skin)
+    if price:
+        first = ladder[0] if ladder else Listing('', '', '')
+        cache.put(skin, price, first.market, first.price, ladder=ladder)
+    return price, ladder
@@ -0,0 +1,198 @@
+# pe_price_service.py
+#
+# Resident price service: keeps warm browsers and the price cache open so
+# callers (bot.js in particular) can price a whole trade with one request
+# instead of spawning `python pe_scrape_price.py <skin>` per item.
+#
+#   POST /prices   {"skins": [...]}  → {"results": [...]}
+#                  (send "Accept: application/x-ndjson" to stream one line per
+#                  requested item as soon as it is priced; each line carries
+#                  the item's position in "skins" as "index", and a skin listed
+#                  twice is scraped once but answered on two lines)
+#   GET  /stats    latency percentiles, queue depth, cache hits, pool counters
+#   GET  /health   "ok"
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pe_driver_pool import DriverPool
+from pe_price_cache import PriceCache
+from pe_scrape_price import get_pe_price_for_item
+
+# ---- CONFIG ----
+HOST    = os.getenv('PE_SERVICE_HOST', '127.0.0.1')
+PORT    = int(os.getenv('PE_SERVICE_PORT', '3334'))
+WORKERS = int(os.getenv('PE_SERVICE_WORKERS', '3'))
+
+def parse_usd(s):
+    try:
+        return float(s.replace('$', '').replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+
+class PriceService:
+    def __init__(self, workers=WORKERS, pool=None, cache=None):
+        self.pool = pool or DriverPool(workers)
+        self.cache = cache or PriceCache()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self.queued = 0        # items submitted but not finished
+        self.served = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.item_latency = deque(maxlen=2000)     # seconds per item
+        self.request_latency = deque(maxlen=500)   # seconds per /prices call
+
+    def price_one(self, skin):
+        t0 = time.perf_counter()
+        cached = True
+        try:
+            entry = self.cache.get(skin)
+            if entry:
+                price, market, market_price = entry.price, entry.market, entry.market_price
+            else:
+                cached = False
+                with self.pool.driver() as driver:
+                    price, market, market_price = get_pe_price_for_item(skin, driver)
+                if price:
+                    self.cache.put(skin, price, market, market_price)
+        except Exception as e:
+            print(f"[SERVICE] {skin}: {e}")
+            cached = False
+            price, market, market_price = "", "", ""
+
+        with self._lock:
+            self.queued -= 1
+            self.served += 1
+            self.cache_hits += cached
+            self.failures += not price
+            self.item_latency.append(time.perf_counter() - t0)
+        return {
+            'skin': skin,
+            'price': price,
+            'usd': parse_usd(price),
+            'market': market,
+            'market_price': market_price,
+            'cached': cached,
+        }
+
+    def submit_many(self, skins):
+        """One future per requested skin; duplicates in a batch share a scrape."""
+        unique = list(dict.fromkeys(skins))
+        with self._lock:
+            self.queued += len(unique)
+        futures = {s: self.executor.submit(self.price_one, s) for s in unique}
+        return [futures[s] for s in skins]
+
+    def stats(self):
+        def pct(samples, q):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        with self._lock:
+            items = list(self.item_latency)
+            reqs = list(self.request_latency)
+            return {
+                'queue_depth': self.queued,
+                'served': self.served,
+                'cache_hits': self.cache_hits,
+                'failures': self.failures,
+                'item_latency_s': {'p50': pct(items, 0.5), 'p95': pct(items, 0.95), 'p99': pct(items, 0.99)},
+                'request_latency_s': {'p50': pct(reqs, 0.5), 'p95': pct(reqs, 0.95), 'p99': pct(reqs, 0.99)},
+                'pool': {
+                    'size': self.pool.size,
+                    'launches': self.pool.launches,
+                    'recycled': self.pool.recycled,
+                    'crashed': self.pool.crashed,
+                },
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, code, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, 'ok')
+            elif self.path == '/stats':
+                self._send_json(200, service.stats())
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/prices':
+                return self._send_json(404, {'error': 'not found'})
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                skins = body['skins'] if isinstance(body, dict) else body
+                if not isinstance(skins, list) or not all(isinstance(s, str) for s in skins):
+                    raise ValueError
+            except (ValueError, KeyError):
+                return self._send_json(400, {'error': 'expected {"skins": [names...]}'})
+
+            t0 = time.perf_counter()
+            futures = service.submit_many(skins)
+            if 'application/x-ndjson' in self.headers.get('Accept', ''):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.end_headers()
+                # duplicates share a future; as_completed yields it once
+                positions = {}
+                for i, fut in enumerate(futures):
+                    positions.setdefault(fut, []).append(i)
+                for fut in as_completed(positions):
+                    lines = [json.dumps(dict(fut.result(), index=i)) + '\n' for i in positions[fut]]
+                    self.wfile.write(''.join(lines).encode('utf-8'))
+                    self.wfile.flush()
+                self.close_connection = True
+            else:
+                self._send_json(200, {'results': [f.result() for f in futures]})
+            with service._lock:
+                service.request_latency.append(time.perf_counter() - t0)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+def serve(host=HOST, port=PORT, workers=WORKERS, warm=True):
+    service = PriceService(workers)
+    if warm:
+        print(f"[SERVICE] Warming {workers} browsers…")
+        service.pool.warm()
+    httpd = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"[SERVICE] Listening on http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Warm browsers to keep')
+    parser.add_argument('--no-warm', action='store_true', help='Launch browsers on first use')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, warm=not args.no_warm)
@@ -0,0 +1,132 @@
+# pe_profile.py
+#
+# Process-wide timing for the scrape path. Every phase (browser launch,
+# driver.get, waiting for the prices to render, page_source, parsing, variant
+# and deal-link extraction, quit) is timed into a log-bucketed histogram, and
+# failures are counted by cause; byte and request totals per page go into
+# counters. Recording is cheap and always on; `--profile FILE` in
+# GetOrderPrices / update_inventory dumps report() as JSON.
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# buckets grow by 5%, so reported percentiles are within ~2.5% of the true value
+_GROWTH = 1.05
+_LOG_GROWTH = math.log(_GROWTH)
+_MIN_MS = 0.01
+
+class Histogram:
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, ms):
+        k = int(math.log(max(ms, _MIN_MS) / _MIN_MS) / _LOG_GROWTH)
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen >= rank:
+                # geometric middle of the bucket, clamped to what was actually seen
+                return max(self.min, min(_MIN_MS * _GROWTH ** (k + 0.5), self.max))
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_s': round(self.total / 1000, 3),
+            'mean_ms': round(self.total / self.count, 2) if self.count else None,
+            'p50_ms': _round(self.percentile(0.50)),
+            'p95_ms': _round(self.percentile(0.95)),
+            'p99_ms': _round(self.percentile(0.99)),
+            'max_ms': _round(self.max),
+        }
+
+def _round(v):
+    return None if v is None else round(v, 2)
+
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.failures = {}
+            self.counters = {}
+            self.extra = {}
+            self.started = time.time()
+
+    def record(self, name, seconds):
+        with self._lock:
+            h = self.stages.get(name)
+            if h is None:
+                h = self.stages[name] = Histogram()
+            h.add(seconds * 1000)
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def fail(self, cause):
+        with self._lock:
+            self.failures[cause] = self.failures.get(cause, 0) + 1
+
+    def count(self, name, amount):
+        """Add to a running total (bytes, requests, ...); reported as count / total / mean."""
+        with self._lock:
+            c = self.counters.setdefault(name, [0, 0])
+            c[0] += 1
+            c[1] += amount
+
+    def note(self, key, value):
+        """Attach run-level context (pool counters, scheduler stats, ...) to the report."""
+        with self._lock:
+            self.extra[key] = value
+
+    def report(self):
+        with self._lock:
+            stages = {name: h.summary() for name, h in self.stages.items()}
+            return {
+                'wall_s': round(time.time() - self.started, 3),
+                'stages': dict(sorted(stages.items(), key=lambda kv: -kv[1]['total_s'])),
+                'failures': dict(sorted(self.failures.items(), key=lambda kv: -kv[1])),
+                'counters': {name: {'count': n, 'total': total, 'mean': round(total / n, 1)}
+                             for name, (n, total) in sorted(self.counters.items())},
+                **self.extra,
+            }
+
+    def write(self, path):
+        rep = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(rep, f, indent=2)
+        print(f"[PROFILE] Wrote {path}")
+        for name, s in rep['stages'].items():
+            print(f"[PROFILE] {name:<12} n={s['count']:<6} total={s['total_s']:>9.1f}s "
+                  f"p50={s['p50_ms']}ms p95={s['p95_ms']}ms p99={s['p99_ms']}ms")
+        for name, c in rep['counters'].items():
+            print(f"[PROFILE] {name:<12} n={c['count']:<6} total={c['total']} mean={c['mean']}")
+        for cause, n in rep['failures'].items():
+            print(f"[PROFILE] failure {cause}: {n}")
+        return rep
+
+PROFILE = Profiler()
@@ -0,0 +1,218 @@
+# pe_scheduler.py
+#
+# Adaptive work scheduler for scraping:
+#   * AIMD concurrency - the number of pages in flight grows by ~1 per
+#     window of fast successes and halves when a window has too many
+#     failures or slow pages
+#   * a token bucket per host caps the request rate whatever the concurrency
+#   * failed items go straight back into the live queue with jittered
+#     exponential backoff instead of waiting for a second pass
+#   * items that keep failing are put in a negative cache for a while
+import heapq
+import itertools
+import random
+import threading
+import time
+
+# ---- DEFAULTS ----
+RATE_PER_HOST   = 2.0    # requests per second per host
+BURST_PER_HOST  = 4
+MAX_ATTEMPTS    = 3
+BASE_BACKOFF    = 2.0    # seconds before the first retry
+MAX_BACKOFF     = 60.0
+SLOW_LATENCY    = 20.0   # a page slower than this counts as congestion
+MAX_BAD_RATE    = 0.25   # cut concurrency when more of a window fails or is slow
+NEGATIVE_TTL    = 3600   # skip repeat offenders for this long
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+
+    def try_take(self, now=None):
+        """Take a token if available; returns 0, or seconds until one will be."""
+        now = now or time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class AIMD:
+    """
+    Additive increase, multiplicative decrease. Every fast success raises the
+    limit by increase/limit (about +1 per window); at the end of each window
+    (as many completions as the limit allows in flight) the limit is cut if
+    too many of them failed or were slow. Judging a window rather than each
+    failure keeps a few unlucky pages from collapsing concurrency.
+    """
+    def __init__(self, initial, maximum, minimum=1, increase=1.0, decrease=0.5,
+                 slow_latency=SLOW_LATENCY, max_bad_rate=MAX_BAD_RATE):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.max_bad_rate = max_bad_rate
+        self._done = 0
+        self._bad = 0
+
+    @property
+    def current(self):
+        return max(self.minimum, min(self.maximum, int(self.limit)))
+
+    def record(self, ok, latency):
+        slow = self.slow_latency and latency > self.slow_latency
+        self._done += 1
+        if ok and not slow:
+            self.limit = min(self.maximum, self.limit + self.increase / max(self.limit, 1))
+        else:
+            self._bad += 1
+        if self._done >= self.current:
+            if self._bad / self._done > self.max_bad_rate:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            self._done = self._bad = 0
+
+class NegativeCache:
+    """In-memory negative cache; PriceCache offers the same two methods on disk."""
+    def __init__(self):
+        self._until = {}
+
+    def failed_recently(self, key):
+        return self._until.get(key, 0) > time.time()
+
+    def mark_failed(self, key, ttl=NEGATIVE_TTL):
+        self._until[key] = time.time() + ttl
+
+def pricempire_host(skin):
+    from pe_utils import pricempire_url
+    return pricempire_url(skin).split('/', 3)[2]  # netloc, without pulling in urllib
+
+class Scheduler:
+    """
+    work(item) -> result, is_ok(result) -> bool. Call run(items) to drain.
+
+    on_result(item, result, ok) fires once per item when its outcome is final:
+    success, attempts exhausted, or skipped because of the negative cache
+    (result None). Items not started before `deadline` (a time.monotonic()
+    value) are returned by run() untouched.
+    """
+
+    def __init__(self, work, is_ok, max_workers, key_of=lambda x: x, host_of=None,
+                 initial=None, rate=RATE_PER_HOST, burst=BURST_PER_HOST,
+                 max_attempts=MAX_ATTEMPTS, base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF,
+                 slow_latency=SLOW_LATENCY, negative_cache=None, negative_ttl=NEGATIVE_TTL,
+                 deadline=None, on_result=None):
+        self.work = work
+        self.is_ok = is_ok
+        self.max_workers = max_workers
+        self.key_of = key_of
+        self.host_of = host_of or (lambda item: '')
+        self.aimd = AIMD(initial or max(1, max_workers // 2), max_workers, slow_latency=slow_latency)
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.negative = negative_cache if negative_cache is not None else NegativeCache()
+        self.negative_ttl = negative_ttl
+        self.deadline = deadline
+        self.on_result = on_result or (lambda item, result, ok: None)
+
+        self._cv = threading.Condition()
+        self._queue = []        # (ready_at, seq, attempt, item)
+        self._seq = itertools.count()
+        self._inflight = 0
+        self.stats = {'ok': 0, 'failed': 0, 'retries': 0, 'skipped': 0, 'peak_concurrency': 0}
+
+    def _backoff(self, attempt):
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.5)
+
+    def _bucket(self, host):
+        b = self.buckets.get(host)
+        if b is None:
+            b = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return b
+
+    def _finish(self, item, attempt, started, fut):
+        latency = time.monotonic() - started
+        try:
+            result = fut.result()
+            ok = self.is_ok(result)
+        except Exception as e:
+            print(f"[SCHED] {self.key_of(item)}: {e}")
+            result, ok = None, False
+
+        final = True
+        with self._cv:
+            self._inflight -= 1
+            self.aimd.record(ok, latency)
+            if ok:
+                self.stats['ok'] += 1
+            else:
+                if attempt < self.max_attempts:
+                    final = False
+                    self.stats['retries'] += 1
+                    ready = time.monotonic() + self._backoff(attempt)
+                    heapq.heappush(self._queue, (ready, next(self._seq), attempt + 1, item))
+                else:
+                    self.stats['failed'] += 1
+            self._cv.notify_all()
+
+        if final:
+            if not ok:
+                self.negative.mark_failed(self.key_of(item), self.negative_ttl)
+            self.on_result(item, result, ok)
+
+    def run(self, items):
+        for item in items:
+            if self.negative.failed_recently(self.key_of(item)):
+                self.stats['skipped'] += 1
+                self.on_result(item, None, False)
+                continue
+            heapq.heappush(self._queue, (0.0, next(self._seq), 1, item))
+
+        from concurrent.futures import ThreadPoolExecutor  # deferred: ~10ms of imports
+        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+            with self._cv:
+                while self._queue or self._inflight:
+                    now = time.monotonic()
+                    if self.deadline is not None and now >= self.deadline:
+                        if not self._inflight:
+                            break
+                        self._cv.wait(0.5)
+                        continue
+
+                    wait = 1.0
+                    if self._queue and self._inflight < self.aimd.current:
+                        ready_at, _, attempt, item = self._queue[0]
+                        if ready_at <= now:
+                            token_wait = self._bucket(self.host_of(item)).try_take(now)
+                            if token_wait == 0:
+                                heapq.heappop(self._queue)
+                                self._inflight += 1
+                                self.stats['peak_concurrency'] = max(self.stats['peak_concurrency'], self._inflight)
+                                fut = ex.submit(self.work, item)
+                                fut.add_done_callback(
+                                    lambda f, item=item, attempt=attempt, t=now: self._finish(item, attempt, t, f))
+                                continue
+                            wait = token_wait
+                        else:
+                            wait = ready_at - now
+                    self._cv.wait(min(wait, 1.0))
+
+        leftover = [item for _, _, _, item in sorted(self._queue)]
+        self._queue = []
+        return leftover
+
+    def summary(self):
+        s = self.stats
+        return (f"[SCHED] ok={s['ok']} failed={s['failed']} retries={s['retries']} "
+                f"skipped(negative cache)={s['skipped']} peak concurrency={s['peak_concurrency']} "
+                f"final limit={self.aimd.current}")
@@ -1,10 +1,15 @@
 # pe_scrape_price.py
-import re
+import os
 import time
-import undetected_chromedriver as uc
-from pe_utils import pricempire_url  # Assuming you have this already
+from pe_browser import launch, wait_until_ready
+from pe_utils import parse_skin_name
+from pe_price_cache import PriceCache, read_through
+from pe_profile import PROFILE
+from pe_page import Page, read_variants, read_market_ladder, pick_price_from_variants
 
 DEBUG_MODE = False  # ← Enable detailed logging
+SAVE_HTML_DIR = os.getenv('PE_SAVE_HTML_DIR')  # dump every page here for offline fixtures
+SETTLE_SECONDS = 3  # longest wait for the prices to render after driver.get (returns as soon as they do)
 
 def get_cs2_wear_order():
     return [
@@ -12,110 +17,114 @@ def get_cs2_wear_order():
     ]
 
 def parse_wear(skin):
-    matches = re.findall(r'\(([^)]+)\)', skin)
-    if matches:
-        return matches[-1]
-    return ""
-
-def pick_price_from_variants(elements, want_stattrak, variant_name):
-    for el in elements:
-        label = el.text.lower().replace('\r', '').strip()
-        try:
-            price = el.find_element("css selector", "span.font-bold.text-theme-200").text.strip()
-        except Exception as e:
-            if DEBUG_MODE:
-                print(f"[DEBUG] Could not find price in variant: {label}, error: {e}")
-            continue
-
-        if variant_name.lower() in label:
-            if DEBUG_MODE:
-                print(f"[DEBUG] Selected variant '{label}' → ${price}")
-            return price
-
-    if DEBUG_MODE:
-        print(f"[DEBUG] No matching variant '{variant_name}' found. Returning empty price.")
-    return ""
+    return parse_skin_name(skin).variant
+
+def save_page(html, url):
+    os.makedirs(SAVE_HTML_DIR, exist_ok=True)
+    slug = url.split("/cs2-items/", 1)[-1].replace("/", "__")
+    with open(os.path.join(SAVE_HTML_DIR, f"{slug}.html"), "w", encoding="utf-8") as f:
+        f.write(html)
 
 def get_pe_price_for_item(skin, driver=None):
+    """(variant price, first market with a price, its price) from one page load."""
+    price, ladder = get_pe_quote_for_item(skin, driver)
+    if ladder:
+        return price, ladder[0].market, ladder[0].price
+    return price, "", ""
+
+def get_pe_quote_for_item(skin, driver=None):
+    """
+    (variant price, ladder) from one page load, where the ladder is every
+    priced market listing on the page (pe_page.Listing), in page order.
+    """
     skin = skin.replace("&", "-")
     created_driver = False
+    t0 = time.perf_counter()
     if driver is None:
-        driver = uc.Chrome()
+        with PROFILE.stage('launch'):
+            driver = launch()
         created_driver = True
 
+    phase = 'setup'
     try:
-        want_stattrak = 'stattrak' in skin.lower()
-        variant_name = parse_wear(skin)
-        url = pricempire_url(skin)
+        parsed = parse_skin_name(skin)
+        want_stattrak = parsed.stattrak
+        variant_name = parsed.variant
+        url = parsed.url
 
         if DEBUG_MODE:
             print(f"[DEBUG] Loading URL: {url}")
             print(f"[DEBUG] Target wear: '{variant_name}' (StatTrak: {want_stattrak})")
 
-        driver.get(url)
-        time.sleep(1)
-
-        elements = driver.find_elements("css selector", "a[role='listitem']")
+        phase = 'get'
+        with PROFILE.stage('get'):
+            driver.get(url)
+        with PROFILE.stage('ready'):
+            stats = wait_until_ready(driver, SETTLE_SECONDS)
+        if DEBUG_MODE and stats:
+            print(f"[DEBUG] {stats['bytes'] / 1024:.0f} KiB in {stats['requests']} requests, "
+                  f"DOMContentLoaded at {stats['dcl_ms']:.0f} ms")
+
+        # one round trip: pull the whole DOM and parse it locally
+        phase = 'page_source'
+        with PROFILE.stage('page_source'):
+            html = driver.page_source
+        if SAVE_HTML_DIR:
+            save_page(html, url)
+
+        phase = 'parse'
+        with PROFILE.stage('parse'):
+            page = Page(html)
+        with PROFILE.stage('variants'):
+            variants = read_variants(page)
+            price = pick_price_from_variants(variants, variant_name)
         if DEBUG_MODE:
-            print(f"[DEBUG] Found {len(elements)} variant entries.")
-
-        price = pick_price_from_variants(elements, want_stattrak, variant_name)
+            print(f"[DEBUG] Found {len(variants)} variant entries.")
+            for label, vprice in variants:
+                print(f"[DEBUG] Variant '{label}' → {vprice}")
 
-        market_name = ""
-        market_price = ""
-
-        deal_links = driver.find_elements("css selector", "a[rel='nofollow noopener']")
+        with PROFILE.stage('markets'):
+            ladder = read_market_ladder(page)
         if DEBUG_MODE:
-            print(f"[DEBUG] Found {len(deal_links)} market listings.")
-
-        for link in deal_links:
-            this_market_name = ""
-            try:
-                img = link.find_element("xpath", ".//preceding::img[1]")
-                this_market_name = img.get_attribute("alt")
-            except:
-                pass
-
-            this_market_price = ""
-            try:
-                price_span = link.find_element("xpath", ".//ancestor::div[contains(@class,'flex-col')][1]//span[contains(@class,'text-2xl')]")
-                this_market_price = price_span.text.strip()
-            except:
-                pass
-
-            if not this_market_price:
-                try:
-                    ancestor = link.find_element("xpath", ".//ancestor::div[contains(@class,'flex-col')][1]")
-                    bolds = ancestor.find_elements("css selector", "span.font-bold")
-                    for b in bolds:
-                        t = b.text.strip()
-                        if t.startswith("$") and len(t) > 1:
-                            this_market_price = t
-                            break
-                except:
-                    pass
-
-            if this_market_price:
-                market_name = this_market_name
-                market_price = this_market_price
-                break
+            print(f"[DEBUG] Found {len(ladder)} priced market listings.")
+
+        if not variants:
+            PROFILE.fail('no_variants')
+        elif not price:
+            PROFILE.fail('variant_not_found')
+        if not ladder:
+            PROFILE.fail('no_market_price')
 
         if DEBUG_MODE:
-            print(f"[DEBUG] Final price: {price}, Market: {market_name}, Market price: {market_price}")
+            print(f"[DEBUG] Final price: {price}, Markets: {ladder}")
 
-        return price, market_name, market_price
+        return price, ladder
 
     except Exception as e:
+        PROFILE.fail(f"{phase}:{type(e).__name__}")
         print(f"[ERROR] Exception scraping '{skin}': {e}")
-        return "", "", ""
+        return "", []
 
     finally:
         if created_driver:
-            driver.quit()
+            with PROFILE.stage('quit'):
+                driver.quit()
+        PROFILE.record('scrape', time.perf_counter() - t0)
+
+def get_pe_price_cached(skin, driver=None, cache=None, max_age=None):
+    """Like get_pe_price_for_item, but served from the shared price cache when fresh."""
+    if cache is None:
+        cache = PriceCache()
+    return read_through(cache, skin, lambda s: get_pe_price_for_item(s, driver), max_age=max_age)
 
 # Optional CLI test
 if __name__ == "__main__":
     import sys
-    name = " ".join(sys.argv[1:]) if len(sys.argv) > 1 else None
+    args = sys.argv[1:]
+    use_cache = "--no-cache" not in args
+    name = " ".join(a for a in args if a != "--no-cache") or None
     if name:
-        print(get_pe_price_for_item(name))
+        if use_cache:
+            print(get_pe_price_cached(name))
+        else:
+            print(get_pe_price_for_item(name))
@@ -1,22 +1,39 @@
 import re
+from collections import namedtuple
+from functools import lru_cache
+
+BASE_URL = "https://pricempire.com/cs2-items"
+
+# ---- PRECOMPILED PATTERNS ----
+_RE_NOT_SLUG     = re.compile(r'[^a-z0-9-]')
+_RE_DASH_RUN     = re.compile(r'-{2,}')
+_RE_NOT_CASE     = re.compile(r'[^a-z0-9 ]')
+_RE_SPACES       = re.compile(r'\s+')
+_RE_PAREN_GROUPS = re.compile(r'\(([^)]+)\)')
+_RE_PAREN_TAIL   = re.compile(r'^(.*)\s+\(([^()]*)\)\s*$')
+_RE_GLOVE        = re.compile(r'([^\|]+)\s*\|\s*([^(]+(?:\([^)]+\))?)\s*\(([^)]+)\)')
+_RE_SKIN         = re.compile(r'([^\|]+)\|\s*([^(]+(?:\([^)]+\))?)\s*\(([^)]+)\)')
+# Sticker | <team> (<finish>) | <tournament>
+_RE_STICKER_TOURNAMENT_FINISH = re.compile(r'Sticker\s*\|\s*([^(|]+)\s*\(([^)]+)\)\s*\|\s*([^\|]+)', re.IGNORECASE)
+# Sticker | <team> | <tournament>
+_RE_STICKER_TOURNAMENT = re.compile(r'Sticker\s*\|\s*([^\|]+)\|\s*([^\|]+)', re.IGNORECASE)
+# Sticker | <name> (<subtype>)
+_RE_STICKER_SUBTYPE = re.compile(r'Sticker\s*\|\s*([^\(]+)\(([^)]+)\)', re.IGNORECASE)
 
 def sanitize_for_url(text):
-    text = text.lower()
-    text = text.replace('★ ', '')
-    text = text.replace('stattrak™', 'stattrak')
-    text = text.replace(' | ', '-')
-    text = text.replace(' ', '-')
-    text = text.replace('&', 'and')
-    text = text.replace('(', '').replace(')', '')
-    text = re.sub(r'[^a-z0-9-]', '', text)
-    while '--' in text:
-        text = text.replace('--', '-')
+    # '★', '™', '|' and parentheses are dropped by the character filter and any
+    # doubled dashes they leave behind are collapsed, so only spaces and '&'
+    # need explicit handling
+    text = text.lower().replace(' ', '-').replace('&', 'and')
+    text = _RE_NOT_SLUG.sub('', text)
+    if '--' in text:
+        text = _RE_DASH_RUN.sub('-', text)
     return text.strip('-')
 
 def normalize_case_name(name):
     name = name.lower()
-    name = re.sub(r'[^a-z0-9 ]', '', name)
-    name = re.sub(r'\s+', ' ', name)
+    name = _RE_NOT_CASE.sub('', name)
+    name = _RE_SPACES.sub(' ', name)
     return name.strip()
 
 _CASE_CONTAINER_NAMES = set([
@@ -38,92 +55,124 @@ def is_case_or_container(skin):
         return True
     return skin_norm in _CASE_CONTAINER_NAMES
 
+_GLOVE_TYPES = (
+    'hand wraps', 'moto gloves', 'specialist gloves', 'sport gloves', 'driver gloves',
+    'hydra gloves', 'broken fang gloves', 'bloodhound gloves'
+)
+_RE_GLOVE_TYPE = re.compile('|'.join(re.escape(gt) for gt in _GLOVE_TYPES))
+
 def is_glove(skin):
-    glove_types = [
-        'hand wraps', 'moto gloves', 'specialist gloves', 'sport gloves', 'driver gloves',
-        'hydra gloves', 'broken fang gloves', 'bloodhound gloves'
-    ]
-    lower = skin.lower()
-    return any(gt in lower for gt in glove_types)
+    return _RE_GLOVE_TYPE.search(skin.lower()) is not None
 
 def flatten_skin_name(skin_name):
-    m = re.match(r'^(.*)\s+\(([^()]*)\)\s*$', skin_name)
+    m = _RE_PAREN_TAIL.match(skin_name)
     if m:
         return sanitize_for_url(m.group(2))
     return sanitize_for_url(skin_name)
 
-def pricempire_url(skin):
+def _strip_prefixes(skin):
+    return skin.replace('★', '').replace('StatTrak™', '').replace('Souvenir', '').strip()
+
+# ---- STRUCTURED NAMES ----
+class SkinName(namedtuple('SkinName', [
+    'name',      # market_hash_name as given (stripped)
+    'kind',      # 'pin' | 'glove' | 'case' | 'sticker' | 'knife' | 'skin'
+    'weapon',    # e.g. 'AK-47', 'Sport Gloves' (★/StatTrak™/Souvenir stripped); None if n/a
+    'finish',    # e.g. 'Redline', sticker team/finish; None if n/a
+    'wear',      # exterior in parentheses, e.g. 'Field-Tested'; None if n/a
+    'variant',   # last parenthesised group (what the page's variant tiles show), or ''
+    'stattrak',
+    'souvenir',
+    'slug',      # path under /cs2-items/, e.g. 'skin/ak-47-redline/field-tested'
+])):
+    __slots__ = ()
+
+    @property
+    def url(self):
+        return f"{BASE_URL}/{self.slug}"
+
+@lru_cache(maxsize=65536)
+def parse_skin_name(skin):
+    """Parse a market_hash_name into an immutable SkinName (memoized)."""
     skin = skin.strip()
     lower = skin.lower()
+    stattrak = 'stattrak' in lower
+    souvenir = 'souvenir' in lower
+    groups = _RE_PAREN_GROUPS.findall(skin)
+    variant = groups[-1] if groups else ""
+
+    def make(kind, slug, weapon=None, finish=None, wear=None):
+        return SkinName(skin, kind, weapon, finish, wear, variant, stattrak, souvenir, slug)
 
     # --- PINS ---
     parts = lower.split()
     if parts and parts[-1] == 'pin':
-        slug = sanitize_for_url(skin)
-        return f"https://pricempire.com/cs2-items/pin/{slug}"
+        return make('pin', f"pin/{sanitize_for_url(skin)}")
 
     # --- GLOVES ---
     if is_glove(skin):
-        name = skin.replace('★', '').replace('StatTrak™', '').replace('Souvenir', '').strip()
-        m = re.match(r'([^\|]+)\s*\|\s*([^(]+(?:\([^)]+\))?)\s*\(([^)]+)\)', name)
+        name = _strip_prefixes(skin)
+        m = _RE_GLOVE.match(name)
         if m:
             weapon    = sanitize_for_url(m.group(1))
             skin_name = flatten_skin_name(m.group(2))
             wear      = sanitize_for_url(m.group(3))
-            return f"https://pricempire.com/cs2-items/glove/{weapon}-{skin_name}/{wear}"
-        else:
-            return f"https://pricempire.com/cs2-items/glove/{sanitize_for_url(name)}"
+            return make('glove', f"glove/{weapon}-{skin_name}/{wear}",
+                        m.group(1).strip(), m.group(2).strip(), m.group(3))
+        return make('glove', f"glove/{sanitize_for_url(name)}")
 
     # --- CASES & CONTAINERS ---
     if is_case_or_container(skin):
-        return f"https://pricempire.com/cs2-items/container/{sanitize_for_url(skin)}"
+        return make('case', f"container/{sanitize_for_url(skin)}")
 
     # --- STICKERS ---
     if 'sticker' in lower:
         # tournament-sticker with finish
-        m = re.match(r'Sticker\s*\|\s*([^(|]+)\s*\(([^)]+)\)\s*\|\s*([^\|]+)', skin, re.IGNORECASE)
+        m = _RE_STICKER_TOURNAMENT_FINISH.match(skin)
         if m:
             team       = sanitize_for_url(m.group(1))
             finish     = sanitize_for_url(m.group(2))
             tournament = sanitize_for_url(m.group(3))
-            return f"https://pricempire.com/cs2-items/tournament-sticker/sticker-{team}-{tournament}/{finish}"
+            return make('sticker', f"tournament-sticker/sticker-{team}-{tournament}/{finish}",
+                        None, m.group(2))
         # tournament-sticker without finish
-        m = re.match(r'Sticker\s*\|\s*([^\|]+)\|\s*([^\|]+)', skin, re.IGNORECASE)
+        m = _RE_STICKER_TOURNAMENT.match(skin)
         if m:
             team       = sanitize_for_url(m.group(1))
             tournament = sanitize_for_url(m.group(2))
-            return f"https://pricempire.com/cs2-items/tournament-sticker/sticker-{team}-{tournament}"
+            return make('sticker', f"tournament-sticker/sticker-{team}-{tournament}")
         # plain sticker with subtype
-        m = re.match(r'Sticker\s*\|\s*([^\(]+)\(([^)]+)\)', skin, re.IGNORECASE)
+        m = _RE_STICKER_SUBTYPE.match(skin)
         if m:
             main = sanitize_for_url(m.group(1))
             sub  = sanitize_for_url(m.group(2))
-            return f"https://pricempire.com/cs2-items/sticker/sticker-{main}/{sub}"
-        # tournament-autograph sticker
-        m = re.match(r'Sticker\s*\|\s*([^(|]+)\s*\(([^)]+)\)\s*\|\s*([^\|]+)', skin, re.IGNORECASE)
-        if m:
-            player     = sanitize_for_url(m.group(1))
-            team       = sanitize_for_url(m.group(2))
-            tournament = sanitize_for_url(m.group(3))
-            return f"https://pricempire.com/cs2-items/tournament-autograph/sticker-{player}-{team}-{tournament}"
+            return make('sticker', f"sticker/sticker-{main}/{sub}", None, m.group(2))
+        # (the old tournament-autograph branch used the same pattern as the
+        # first one above, so it could never match and has been dropped)
         # fallback
-        return f"https://pricempire.com/cs2-items/sticker/{sanitize_for_url(skin)}"
+        return make('sticker', f"sticker/{sanitize_for_url(skin)}")
 
     # --- STANDARD SKINS ---
-    is_stattrak = 'stattrak' in lower
-    is_souvenir = 'souvenir' in lower
-    name = skin.replace('★', '').replace('StatTrak™', '').replace('Souvenir', '').strip()
-    m = re.match(r'([^\|]+)\|\s*([^(]+(?:\([^)]+\))?)\s*\(([^)]+)\)', name)
+    kind = 'knife' if '★' in skin else 'skin'
+    name = _strip_prefixes(skin)
+    m = _RE_SKIN.match(name)
     if m:
         weapon    = sanitize_for_url(m.group(1))
         skin_name = flatten_skin_name(m.group(2))
         wear      = sanitize_for_url(m.group(3))
-        base      = f"https://pricempire.com/cs2-items/skin/{weapon}-{skin_name}"
-        if is_stattrak:
-            return f"{base}/stattrak-{wear}"
-        elif is_souvenir:
-            return f"{base}/souvenir-{wear}"
+        base      = f"skin/{weapon}-{skin_name}"
+        if stattrak:
+            slug = f"{base}/stattrak-{wear}"
+        elif souvenir:
+            slug = f"{base}/souvenir-{wear}"
         else:
-            return f"{base}/{wear}"
-    else:
-        return f"https://pricempire.com/cs2-items/skin/{sanitize_for_url(name)}"
+            slug = f"{base}/{wear}"
+        return make(kind, slug, m.group(1).strip(), m.group(2).strip(), m.group(3))
+    return make(kind, f"skin/{sanitize_for_url(name)}")
+
+def parse_many(names):
+    """Parse a batch of names; repeated names are parsed once."""
+    return [parse_skin_name(n) for n in names]
+
+def pricempire_url(skin):
+    return parse_skin_name(skin).url
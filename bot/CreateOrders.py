@@ -1,58 +1,147 @@
 import csv
+import math
 import os
 import sys
 
+from inventory_store import open_store, INVENTORY_CSV
+from portfolio import NEVER, Portfolio, parse_cents
+from rebalance import RebalanceSolver
+
 # -------- CONFIG --------
 MANIFEST_CSV = './Manifests/CombinedManifest.csv'
-INVENTORY_CSV = 'Inventory.csv'
 OUTPUT_CSV = 'OrderLog.csv'
+# total portfolio value to allocate; required (here, in the environment or via --budget)
+BUDGET_USD = float(os.getenv('REBALANCE_BUDGET_USD') or 0) or None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../Price Scraper')))
 
-# load manifest
-manifest = {}
-with open(MANIFEST_CSV, encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        manifest[row['Skin']] = float(row['TotalWeighting'])
-
-# load inventory
-inventory = {}
-try:
-    with open(INVENTORY_CSV, encoding='utf-8') as f:
+def load_manifest(path=MANIFEST_CSV):
+    manifest = {}
+    with open(path, encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
-            inventory[row['Skin']] = int(row['QTY'])
-except FileNotFoundError:
-    print(f"{INVENTORY_CSV} not found, assuming empty inventory.")
-
-# build orders
-orders = []
-
-# First, any SKUs in inventory but not in manifest → SELL all
-for skin, qty in inventory.items():
-    if skin not in manifest and qty > 0:
-        orders.append([skin, qty, 0, -qty, 'SELL'])
-
-# Next, iterate manifest SKUs
-for skin, weight in manifest.items():
-    current = inventory.get(skin, 0)
-    target = 1  # or your proportional target
-    diff = target - current
-    if diff < 0:
-        orders.append([skin, current, target, diff, 'SELL'])
-    elif diff > 0:
-        orders.append([skin, current, target, diff, 'BUY'])
-    # if diff == 0 → skip
-
-# group sells first, then buys
-sells = [o for o in orders if o[4] == 'SELL']
-buys  = [o for o in orders if o[4] == 'BUY']
-ordered = sells + buys
-
-# write out
-with open(OUTPUT_CSV, 'w', encoding='utf-8', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['Skin', 'Current', 'Target', 'Diff', 'Action'])
-    for row in ordered:
-        writer.writerow(row)
-
-print(f"Output written to {OUTPUT_CSV}")
+            manifest[row['Skin']] = float(row['TotalWeighting'])
+    return manifest
+
+def load_lots(path=MANIFEST_CSV):
+    """{skin: minimum lot size} from the manifest's optional MinLot column (lots > 1 only)."""
+    lots = {}
+    with open(path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            lot = int(row.get('MinLot') or 1)
+            if lot > 1:
+                lots[row['Skin']] = lot
+    return lots
+
+def load_inventory():
+    """The inventory as a Portfolio (quantities, prices, timestamps in columns)."""
+    book = Portfolio.from_store(open_store())
+    if not len(book):
+        print("Inventory store is empty, assuming empty inventory.")
+    return book
+
+def _usd(s):
+    cents = parse_cents(s)
+    return cents / 100 if cents else None
+
+def load_prices(skins, book=None):
+    """
+    Best known USD price per skin from data we already have, no scraping:
+    Skinport snapshot, shared price cache and inventory (`book`, loaded from
+    the store if not given), whichever was fetched most recently. A NEVER
+    (pinned) inventory price always wins; on equal times the later source in
+    that list does. BuyOrders.csv is deliberately not read: it is written by
+    the next pipeline stage, and what GetOrderPrices scrapes lands in the
+    price cache anyway.
+    """
+    skins = list(skins)
+    best = {}  # skin -> (fetched at, USD)
+
+    def offer(skin, usd, ts):
+        if usd and (skin not in best or ts >= best[skin][0]):
+            best[skin] = (ts, usd)
+
+    try:
+        from price_oracle import PriceOracle
+        oracle = PriceOracle.load()
+        ts = oracle.snapshot_time or 0
+        for skin, usd in oracle.lookup_many(skins).items():
+            offer(skin, usd, ts)
+    except (OSError, ValueError) as e:
+        print(f"[PRICES] Skinport snapshot unavailable: {e}")
+
+    try:
+        from pe_price_cache import PriceCache
+        for skin, entry in PriceCache().get_many(skins, max_age=float('inf')).items():
+            offer(skin, _usd(entry.price), entry.fetched_at)
+    except Exception as e:
+        print(f"[PRICES] Price cache unavailable: {e}")
+
+    if book is None:
+        book = Portfolio.from_store(open_store())
+    for skin, cents, ts in zip(book.skins, book.cents, book.updated):
+        if cents > 0:
+            offer(skin, cents / 100, math.inf if ts == NEVER else (0 if ts != ts else ts))
+    return {skin: usd for skin, (_, usd) in best.items()}
+
+def build_orders(manifest, inventory, prices, budget=None, lots=None):
+    lots = lots or {}
+    solver = RebalanceSolver(manifest, prices, inventory, budget=budget, lots=lots)
+    ordered = solver.orders()
+
+    # skins we have no price for yet can't be sized; fall back to one lot so
+    # GetOrderPrices prices them and the next rebalance can size them properly
+    unpriced = solver.unpriced()
+    legacy = []
+    for skin in unpriced:
+        current = inventory.get(skin, 0)
+        lot = lots.get(skin, 1)
+        if current < lot:
+            legacy.append([skin, current, lot, lot - current, 'BUY'])
+    if unpriced:
+        print(f"[REBALANCE] {len(unpriced)} manifest skins have no known price; targeting one lot each")
+
+    print(f"[REBALANCE] Budget ${solver.budget:,.2f}, allocated ${solver.spent:,.2f}, "
+          f"tracking error {solver.tracking_error():.2e}")
+
+    # group sells first, then buys
+    sells = [o for o in ordered if o[4] == 'SELL']
+    buys  = [o for o in ordered if o[4] == 'BUY'] + legacy
+    return sells + buys
+
+def write_orders(ordered, path=OUTPUT_CSV):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Skin', 'Current', 'Target', 'Diff', 'Action'])
+        for row in ordered:
+            writer.writerow(row)
+
+def main(manifest=None, inventory=None, budget=None):
+    # manifest/inventory can be handed over in memory by the pipeline runner
+    budget = budget if budget is not None else BUDGET_USD
+    if not budget or budget <= 0:
+        print(f"[ERROR] No rebalancing budget (got {budget!r}); pass --budget USD "
+              f"or set REBALANCE_BUDGET_USD.")
+        sys.exit(1)
+    if manifest is None:
+        manifest = load_manifest()
+    # holdings and manifest weights in one columnar book
+    handed_over = inventory is not None
+    book = Portfolio.from_rows({'Skin': s, 'QTY': q} for s, q in inventory.items()) \
+        if handed_over else load_inventory()
+    book.set_weights(manifest)
+    inventory = book.quantities()
+    # a handed-over inventory has no prices; take them from the store then
+    prices = load_prices(book.skins, book=None if handed_over else book)
+    ordered = build_orders(manifest, inventory, prices, budget, lots=load_lots())
+    write_orders(ordered)
+    print(f"Output written to {OUTPUT_CSV}")
+    return ordered
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=float, default=BUDGET_USD,
+                        help='Total USD to allocate across the manifest (default: $REBALANCE_BUDGET_USD)')
+    args = parser.parse_args()
+    main(budget=args.budget)
@@ -3,6 +3,10 @@ import os
 import re
 from collections import defaultdict
 
+MANIFEST_DIR = "./Manifests"  # Directory containing all pool CSVs
+COMBINED_CSV = "./Manifests/CombinedManifest.csv"
+VERIFY_MAX_WORK = 5_000_000  # check against the reference loop while skins x pool entries stays below this
+
 def extract_pool_name_and_weight(filename):
     # Matches something like "Liquid30.csv" -> ("Liquid", 30)
     m = re.match(r"(.+?)(\d+)\.csv$", filename)
@@ -21,12 +25,34 @@ def read_manifest(filepath):
             skins[skin] = weight
     return skins
 
-def combine_manifests(manifest_dir):
-    # Scan directory for all pool manifests
-    pool_files = [
+def read_lots(filepath):
+    # optional MinLot column: skins that can only be bought in multiples
+    lots = {}
+    with open(filepath, newline='', encoding='utf-8-sig') as csvfile:
+        for row in csv.DictReader(csvfile):
+            lot = int(row.get('MinLot') or 1)
+            if lot > 1:
+                lots[row['Skin']] = lot
+    return lots
+
+def combined_lots(pool_skins):
+    """A skin listed with lot sizes in several pools takes the largest."""
+    lots = {}
+    for pool in pool_skins.values():
+        for skin, lot in pool.get('lots', {}).items():
+            lots[skin] = max(lot, lots.get(skin, 1))
+    return lots
+
+def pool_manifest_files(manifest_dir=MANIFEST_DIR):
+    # sorted so pools (and so float sums and tie order) don't depend on listdir order
+    return sorted(
         f for f in os.listdir(manifest_dir)
         if f.endswith('.csv') and f.lower() != 'combinedmanifest.csv'
-    ]
+    )
+
+def combine_manifests(manifest_dir):
+    # Scan directory for all pool manifests
+    pool_files = pool_manifest_files(manifest_dir)
     pool_specs = []
     for fname in pool_files:
         pool_name, pool_weight = extract_pool_name_and_weight(fname)
@@ -39,18 +65,59 @@ def combine_manifests(manifest_dir):
     # Read all manifests
     pool_skins = {}
     for fname, pool_name, pool_weight in pool_specs:
-        skins = read_manifest(os.path.join(manifest_dir, fname))
+        path = os.path.join(manifest_dir, fname)
         pool_skins[pool_name] = {
             'weight': pool_weight,
-            'skins': skins
+            'skins': read_manifest(path),
+            'lots': read_lots(path),
         }
 
-    # Collect all unique skins
+    combined = combine_pools(pool_skins, total_pool_weight)
+    return combined, pool_skins
+
+def build_weight_matrix(pool_skins):
+    """
+    Sparse skin × pool weight matrix, stored column-wise in plain lists (numpy
+    isn't a dependency): a skin index plus, for every pool, the row indices
+    of its skins and their raw weights. Skins are numbered in first-seen
+    order so output is deterministic.
+    """
+    skin_index = {}
+    columns = []
+    for pool in pool_skins.values():
+        rows = []
+        for skin in pool['skins']:
+            i = skin_index.get(skin)
+            if i is None:
+                i = skin_index[skin] = len(skin_index)
+            rows.append(i)
+        columns.append((rows, list(pool['skins'].values())))
+    return skin_index, columns
+
+def combine_pools(pool_skins, total_pool_weight):
+    """
+    Per-skin global weighting: sum over pools of
+    pool_weight/total_pool_weight * skin_weight/sum(pool weights).
+
+    Each pool column is normalised once and scattered into the totals, so the
+    cost is O(total entries) rather than O(skins × pools × pool size). Pools are
+    accumulated in the same order as the original per-skin loop, which keeps
+    every float sum bit-for-bit identical.
+    """
+    skin_index, columns = build_weight_matrix(pool_skins)
+    totals = [0.0] * len(skin_index)
+    for pool, (rows, weights) in zip(pool_skins.values(), columns):
+        pool_percent = pool['weight'] / total_pool_weight
+        pool_skin_sum = sum(weights) or 1
+        for i, w in zip(rows, weights):
+            totals[i] += pool_percent * (w / pool_skin_sum)
+    return dict(zip(skin_index, totals))
+
+def _combine_pools_reference(pool_skins, total_pool_weight):
+    # Original nested-loop implementation, kept for --bench equivalence checks
     all_skins = set()
     for pool in pool_skins.values():
         all_skins.update(pool['skins'].keys())
-
-    # Calculate per-skin global weighting
     combined = {}
     for skin in all_skins:
         total = 0
@@ -58,22 +125,79 @@ def combine_manifests(manifest_dir):
             pool_percent = pool['weight'] / total_pool_weight
             skin_weight = pool['skins'].get(skin, 0)
             pool_skin_sum = sum(pool['skins'].values()) or 1
-            # Weighting for this skin in this pool, normalized to pool allocation
             total += pool_percent * (skin_weight / pool_skin_sum)
         combined[skin] = total
+    return combined
 
-    return combined, pool_skins
+def verify_combined(combined, pool_skins, total_pool_weight):
+    """Raise if `combined` differs in any bit from the original nested loop."""
+    ref = _combine_pools_reference(pool_skins, total_pool_weight)
+    bad = [s for s in ref.keys() | combined.keys() if ref.get(s) != combined.get(s)]
+    if bad:
+        raise ValueError(f"combined weights differ from the reference for {len(bad)} skins, e.g. {bad[0]!r}")
+
+def synthetic_pools(n_pools, n_skins, pool_size, seed=0):
+    """Random pools drawing `pool_size` skins each from a universe of `n_skins`."""
+    import random
+    rng = random.Random(seed)
+    universe = [f"Synthetic Skin {i:06d}" for i in range(n_skins)]
+    pools = {}
+    for p in range(n_pools):
+        picked = rng.sample(universe, min(pool_size, n_skins))
+        pools[f"Pool{p}"] = {
+            'weight': rng.randint(1, 100),
+            'skins': {s: float(rng.randint(1, 10)) for s in picked},
+        }
+    return pools
+
+def bench():
+    import time
+
+    def timed(fn, *a):
+        t0 = time.perf_counter()
+        out = fn(*a)
+        return out, time.perf_counter() - t0
 
-def write_combined_manifest(combined, out_file):
+    print(f"{'pools':>6} {'skins':>7} {'pool size':>9} {'matrix':>10} {'reference':>10}")
+    for n_pools, n_skins, pool_size in [(2, 400, 300), (10, 2000, 1000), (20, 5000, 2000), (50, 20000, 20000)]:
+        pools = synthetic_pools(n_pools, n_skins, pool_size)
+        total = sum(p['weight'] for p in pools.values())
+        fast, t_fast = timed(combine_pools, pools, total)
+        if n_pools * n_skins * pool_size <= 2e8:
+            _, t_ref = timed(verify_combined, fast, pools, total)
+            ref_s = f"{t_ref:9.3f}s"
+        else:
+            ref_s = "   (skip)"
+        print(f"{n_pools:>6} {n_skins:>7} {pool_size:>9} {t_fast:9.3f}s {ref_s}")
+
+def sort_combined(combined):
+    return dict(sorted(combined.items(), key=lambda x: -x[1]))
+
+def write_combined_manifest(combined, out_file, lots=None):
     with open(out_file, 'w', newline='', encoding='utf-8') as f:  # Specify utf-8 here!
         writer = csv.writer(f)
-        writer.writerow(['Skin', 'TotalWeighting'])
-        for skin, weight in sorted(combined.items(), key=lambda x: -x[1]):
-            writer.writerow([skin, weight])
+        if lots:
+            writer.writerow(['Skin', 'TotalWeighting', 'MinLot'])
+            for skin, weight in sort_combined(combined).items():
+                writer.writerow([skin, weight, lots.get(skin, 1)])
+        else:
+            writer.writerow(['Skin', 'TotalWeighting'])
+            for skin, weight in sort_combined(combined).items():
+                writer.writerow([skin, weight])
 
-# USAGE
-manifest_dir = "./manifests"  # Directory containing all pool CSVs
-combined, pools = combine_manifests(manifest_dir)
-write_combined_manifest(combined, "./Manifests/CombinedManifest.csv")
+def main(manifest_dir=MANIFEST_DIR, out_file=COMBINED_CSV):
+    combined, pools = combine_manifests(manifest_dir)
+    entries = sum(len(p['skins']) for p in pools.values())
+    if len(combined) * entries <= VERIFY_MAX_WORK:
+        verify_combined(combined, pools, sum(p['weight'] for p in pools.values()))
+    combined = sort_combined(combined)
+    write_combined_manifest(combined, out_file, combined_lots(pools))
+    print("Combined manifest written to CombinedManifest.csv")
+    return combined  # in file order, same as CreateOrders.load_manifest()
 
-print("Combined manifest written to CombinedManifest.csv")
+if __name__ == "__main__":
+    import sys
+    if "--bench" in sys.argv:
+        bench()
+    else:
+        main()
@@ -1,100 +1,149 @@
 import csv
 import os
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import undetected_chromedriver as uc
-import threading
-
-# ---- PATCH OUT BAD DESTRUCTOR LOGGING ----
-uc.Chrome.__del__ = lambda self: None
+import time
+import zlib
 
 # Add the Price Scraper folder to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../Price Scraper')))
-from pe_scrape_price import get_pe_price_for_item
+from pe_scrape_price import get_pe_quote_for_item
+from pe_driver_pool import DriverPool
+from pe_price_cache import PriceCache, read_through_ladder, ttl_for
+from pe_page import cheapest_ask, best_venue
+from pe_scheduler import Scheduler, NegativeCache, pricempire_host
+from pe_profile import PROFILE
+from price_oracle import load_fresh_oracle
+from order_journal import OrderJournal, read_journal, completed, FIELDS, JOURNAL_FILE
+from order_queue import OrderQueue, worker_name
+from portfolio import Portfolio
 
 # ---- CONFIG ----
 INFILE = "OrderLog.csv"
 OUTFILE = "BuyOrders.csv"
-MAX_WORKERS = 6
+SELL_OUTFILE = "SellOrders.csv"
+MAX_WORKERS = 6  # ceiling; the scheduler finds the rate the site tolerates
+USE_CACHE = True  # serve fresh prices from the shared price cache
+USE_ORACLE = True  # price from the Skinport snapshot first when it is fresh
+PROFILE_FILE = None  # write per-stage timings here as JSON (--profile)
+QUEUE_IDLE_SECONDS = 5  # --queue: how often an idle worker looks for expired leases
 
-# lock to serialize Chrome unpack/install
-driver_lock = threading.Lock()
+def set_quote(row, price_usd, ladder):
+    """
+    Fill the price columns from one page's market ladder: a BUY row takes the
+    cheapest ask, a SELL row the venue with the highest listed price.
+    """
+    pick = best_venue(ladder) if row.get('Action', '').upper() == 'SELL' else cheapest_ask(ladder)
+    row['PriceUSD'] = price_usd
+    row['RecommendedMarket'] = pick.market if pick else ''
+    row['RecommendedMarketPrice'] = pick.price if pick else ''
+    return row
 
-def fetch_price(row):
+def fetch_price(row, pool, cache=None):
     skin = row['Skin']
-    with driver_lock:
-        driver = uc.Chrome()
+
+    def scrape(name):
+        with pool.driver() as driver:
+            return get_pe_quote_for_item(name, driver)
+
     try:
-        price_usd, market_name, market_price = get_pe_price_for_item(skin, driver)
+        if cache is not None:
+            price_usd, ladder = read_through_ladder(cache, skin, scrape)
+        else:
+            price_usd, ladder = scrape(skin)
     except Exception as e:
         print(f"[ERROR] {skin}: {e}")
-        price_usd, market_name, market_price = "", "", ""
-    finally:
-        try:
-            driver.quit()
-        except:
-            pass
+        price_usd, ladder = "", []
+    return set_quote(row, price_usd, ladder)
 
-    row['PriceUSD'] = price_usd
-    row['RecommendedMarket'] = market_name
-    row['RecommendedMarketPrice'] = market_price
-    return row
+def scrape_rows(rows, pool, cache=None, on_result=None, initial=None):
+    """
+    Price `rows` through the adaptive scheduler: concurrency follows page
+    latency and failures up to MAX_WORKERS, and failed rows are retried in the
+    same run with backoff. `on_result(row)` fires as soon as each row's outcome
+    is final. Returns the concurrency the scheduler ended on, so a caller
+    pricing in batches can start the next batch there (`initial`).
+    """
+    on_result = on_result or (lambda r: None)
 
-def main():
-    if not os.path.exists(INFILE):
-        print(f"[ERROR] {INFILE} not found.")
-        sys.exit(1)
-
-    # only BUY orders
-    with open(INFILE, encoding="utf-8") as f:
-        buy_rows = [r for r in csv.DictReader(f) if r.get('Action','').upper()=='BUY']
-
-    # --- FIRST PASS ---
-    results = []
-    failed_rows = []
-
-    print(f"Starting first pass on {len(buy_rows)} skins…")
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-        futures = { ex.submit(fetch_price, row): row for row in buy_rows }
-        for fut in as_completed(futures):
-            r = fut.result()
-            if r.get('PriceUSD'):
-                results.append(r)
-                print(f"[DONE]  {r['Skin']} → {r['RecommendedMarketPrice']} via {r['RecommendedMarket']}")
-            else:
-                failed_rows.append(r)
-                print(f"[FAILED] {r['Skin']} (will retry later)")
-
-    # --- SECOND PASS (retry failures once) ---
-    if failed_rows:
-        print(f"\nRetrying {len(failed_rows)} failed skins…\n")
-        retry_results = []
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-            futures = { ex.submit(fetch_price, row): row for row in failed_rows }
-            for fut in as_completed(futures):
-                r = fut.result()
-                retry_results.append(r)
-                if r.get('PriceUSD'):
-                    print(f"[RETRY DONE]  {r['Skin']} → {r['RecommendedMarketPrice']} via {r['RecommendedMarket']}")
-                else:
-                    print(f"[FAILED AGAIN] {r['Skin']}")
-        # extend main results with the retry results (whether empty or not)
-        results.extend(retry_results)
-
-    # --- SORT CHEAPEST → MOST EXPENSIVE ---
-    def price_key(r):
-        try:
-            s = r.get('RecommendedMarketPrice','')
-            return float(s.replace('$','').replace(',',''))
-        except:
-            return float('inf')
+    def done(row, r, ok):
+        r = r or row
+        on_result(r)
+        if ok:
+            print(f"[DONE]  {r['Skin']} → {r['RecommendedMarketPrice']} via {r['RecommendedMarket']}")
+        else:
+            print(f"[FAILED] {r['Skin']}")
+
+    sched = Scheduler(
+        lambda row: fetch_price(row, pool, cache),
+        is_ok=lambda r: bool(r.get('PriceUSD')),
+        max_workers=MAX_WORKERS,
+        initial=initial,
+        key_of=lambda r: r['Skin'],
+        host_of=lambda r: pricempire_host(r['Skin']),
+        negative_cache=cache if cache is not None else NegativeCache(),
+        on_result=done,
+    )
+    print(f"Scraping {len(rows)} skins (up to {MAX_WORKERS} browsers)…")
+    sched.run(rows)
+    print(sched.summary())
+    PROFILE.note('scheduler', dict(sched.stats, final_limit=sched.aimd.current))
+    return sched.aimd.current
+
+FIELDNAMES = FIELDS
 
-    results.sort(key=price_key)
+ACTIONS = ('BUY', 'SELL')
 
-    # --- WRITE OUT ---
-    fieldnames = ['Skin','Diff','Action','PriceUSD','RecommendedMarket','RecommendedMarketPrice']
-    with open(OUTFILE,'w',encoding='utf-8',newline='') as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
+def load_order_rows(path=INFILE):
+    # BUY and SELL orders; both are priced from the same page load
+    with open(path, encoding="utf-8") as f:
+        return [r for r in csv.DictReader(f) if r.get('Action','').upper() in ACTIONS]
+
+def load_previous_results(path=JOURNAL_FILE, now=None):
+    """
+    Priced rows from the last run's journal, keyed by skin, that are still
+    within their price cache TTL. The journal's timestamp is when the price
+    was obtained, so a price carried over run after run still ages out.
+    """
+    now = now or time.time()
+    return {skin: rec for skin, rec in read_journal(path).items()
+            if rec.get('PriceUSD') and now - rec.get('ts', 0) <= ttl_for(skin)}
+
+def parse_shard(spec):
+    """'2/4' -> (2, 4); shards are numbered from 1."""
+    try:
+        i, n = (int(x) for x in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"shard must look like I/N, got {spec!r}")
+    if not 1 <= i <= n:
+        raise ValueError(f"shard {i}/{n} out of range")
+    return i, n
+
+def shard_of(skin, n):
+    """1-based shard for `skin`; stable across processes, hosts and runs."""
+    return zlib.crc32(skin.encode('utf-8')) % n + 1
+
+def shard_rows(rows, i, n):
+    return [r for r in rows if shard_of(r['Skin'], n) == i]
+
+def shard_path(path, i, n):
+    """'BuyOrders.csv' -> 'BuyOrders.shard2of4.csv'"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.shard{i}of{n}{ext}"
+
+def split_unchanged(rows, previous):
+    """Rows whose order is identical to last run's keep their price; the rest need pricing."""
+    reused, todo = [], []
+    for r in rows:
+        old = previous.get(r['Skin'])
+        if old and old.get('Diff') == r.get('Diff') and old.get('Action') == r.get('Action'):
+            reused.append(dict(r, ts=old['ts'], **{k: old[k] for k in FIELDNAMES[3:]}))
+        else:
+            todo.append(r)
+    return reused, todo
+
+def write_buy_orders(results, path=OUTFILE):
+    with open(path,'w',encoding='utf-8',newline='') as f:
+        w = csv.DictWriter(f, fieldnames=FIELDNAMES)
         w.writeheader()
         for r in results:
             w.writerow({
@@ -106,12 +155,259 @@ def main():
                 'RecommendedMarketPrice': r.get('RecommendedMarketPrice',''),
             })
 
-    print(f"\nWrote {len(results)} buy orders (with retries) sorted by market price (cheapest→expensive) to {OUTFILE}")
+def write_outputs(records, wanted, buy_path=OUTFILE, sell_path=SELL_OUTFILE):
+    """
+    Sort the priced records - buys cheapest first, sells most valuable first,
+    unpriced rows last - and write the two order files. Returns buys + sells.
+    """
+    results = [records[skin] for skin in wanted if skin in records]
+    # prices are parsed once into integer cents
+    buys = [r for r in results if r.get('Action', '').upper() != 'SELL']
+    sells = [r for r in results if r.get('Action', '').upper() == 'SELL']
+    buys = [buys[i] for i in Portfolio.from_orders(buys).argsort('price')]
+    sells = [sells[i] for i in Portfolio.from_orders(sells).argsort('price', reverse=True)]
+
+    write_buy_orders(buys, buy_path)
+    write_buy_orders(sells, sell_path)
+    print(f"\nWrote {len(buys)} buy orders sorted by market price (cheapest→expensive) to {buy_path}")
+    print(f"Wrote {len(sells)} sell orders sorted by best venue price (highest first) to {sell_path}")
+    return buys + sells
+
+def price_rows(rows, on_result, oracle=None, cache=None, pool=None, initial=None):
+    """
+    Price `rows` through the tiers - Skinport snapshot, fresh cache entries,
+    then the browsers - calling `on_result(row)` as each one is final. A
+    `pool` handed in is reused and left open; otherwise one is started for
+    the rows that need scraping and closed afterwards. Returns the scheduler's
+    final concurrency (`initial` when nothing was scraped).
+    """
+    reused = []
+
+    # --- FIRST TIER: bulk snapshot, no browser needed ---
+    if oracle is not None:
+        known = oracle.lookup_many(r['Skin'] for r in rows)
+        for r in rows:
+            if r['Skin'] in known:
+                price = f"${known[r['Skin']]:.2f}"
+                r['PriceUSD'] = price
+                r['RecommendedMarket'] = 'Skinport'
+                r['RecommendedMarketPrice'] = price
+                r['ts'] = oracle.snapshot_time
+                reused.append(r)
+        rows = [r for r in rows if r['Skin'] not in known]
+        print(f"[ORACLE] {len(known)} skins priced from snapshot, {len(rows)} left to scrape")
+
+    # --- SECOND TIER: fresh cache hits never take a scheduler slot ---
+    if cache is not None and rows:
+        with PROFILE.stage('cache'):
+            hits = cache.get_many(r['Skin'] for r in rows)
+            ladders = cache.get_ladders(hits)
+        for r in rows:
+            entry = hits.get(r['Skin'])
+            if entry:
+                ladder = ladders.get(r['Skin'])
+                if ladder is not None:
+                    set_quote(r, entry.price, ladder)
+                else:  # cached before ladders were kept
+                    r['PriceUSD'] = entry.price
+                    r['RecommendedMarket'] = entry.market
+                    r['RecommendedMarketPrice'] = entry.market_price
+                r['ts'] = entry.fetched_at
+                reused.append(r)
+        rows = [r for r in rows if r['Skin'] not in hits]
+        print(f"[CACHE] {len(hits)} skins priced from cache, {len(rows)} left to scrape")
+
+    for r in reused:
+        on_result(r)
+
+    if rows:
+        # one browser per worker slot, reused across retries
+        own_pool = pool is None
+        if own_pool:
+            pool = DriverPool(MAX_WORKERS)
+        try:
+            initial = scrape_rows(rows, pool, cache, on_result=on_result, initial=initial)
+        finally:
+            if own_pool:
+                close_pool(pool)
+    return initial
+
+def close_pool(pool):
+    pool.close()
+    print(f"[POOL] {pool.launches} browser launches, {pool.recycled} recycled, {pool.crashed} crashed")
+    PROFILE.note('pool', {'launches': pool.launches, 'recycled': pool.recycled, 'crashed': pool.crashed})
+
+def open_tiers(rows):
+    """The Skinport snapshot and price cache, each only if enabled and there is work."""
+    with PROFILE.stage('oracle'):
+        oracle = load_fresh_oracle() if USE_ORACLE and rows else None
+    cache = PriceCache() if USE_CACHE and rows else None
+    return oracle, cache
+
+def main(order_rows=None, incremental=False, resume=False, shard=None):
+    """
+    Price BUY and SELL rows and write BuyOrders.csv and SellOrders.csv. The
+    pipeline runner passes the OrderLog rows in memory and sets `incremental`
+    so that only rows that changed since the last run are repriced.
+
+    Unchanged rows only keep their price while it is within the cache TTL.
+    Every finished row is appended to the journal straight away and the CSV
+    is built from the journal at the end; with `resume` the journal from an
+    interrupted run is kept and its fresh rows are not scraped again.
+
+    With `shard=(i, n)` only the rows in shard i of n are priced, and the
+    journal and outputs get a .shardIofN suffix for merge_shards() to combine.
+    """
+    if order_rows is None:
+        if not os.path.exists(INFILE):
+            print(f"[ERROR] {INFILE} not found.")
+            sys.exit(1)
+        rows = load_order_rows()
+    else:
+        rows = [dict(r) for r in order_rows if r.get('Action','').upper() in ACTIONS]
+    journal_path, buy_path, sell_path = JOURNAL_FILE, OUTFILE, SELL_OUTFILE
+    if shard:
+        rows = shard_rows(rows, *shard)
+        journal_path, buy_path, sell_path = (shard_path(p, *shard) for p in (journal_path, buy_path, sell_path))
+        print(f"[SHARD] {shard[0]}/{shard[1]}: {len(rows)} rows")
+    wanted = list(dict.fromkeys(r['Skin'] for r in rows))  # one journal record per skin
+
+    # read before the journal is reset for this run
+    previous = load_previous_results(journal_path) if incremental else {}
+    journal = OrderJournal(journal_path, resume=resume)
+    try:
+        if resume:
+            done = completed(read_journal(journal_path))
+            before = len(rows)
+            rows = [r for r in rows
+                        if not (r['Skin'] in done and done[r['Skin']].get('Diff') == r.get('Diff'))]
+            print(f"[RESUME] {before - len(rows)} rows already in journal, {len(rows)} to price")
+
+        reused = []
+        if incremental:
+            reused, rows = split_unchanged(rows, previous)
+            print(f"[INCREMENTAL] {len(reused)} unchanged rows reused, {len(rows)} to price")
+
+        for r in reused:
+            journal.append(r)
+        oracle, cache = open_tiers(rows)
+        price_rows(rows, journal.append, oracle, cache)
+    finally:
+        journal.close()
+
+    # --- BUILD RESULTS FROM THE JOURNAL ---
+    results = write_outputs(read_journal(journal_path), wanted, buy_path, sell_path)
+    if PROFILE_FILE:
+        PROFILE.note('rows', {'wanted': len(wanted), 'written': len(results),
+                              'priced': sum(1 for r in results if r.get('PriceUSD'))})
+        PROFILE.write(PROFILE_FILE)
+    return results
+
+def merge_shards(n):
+    """Combine the outputs of shards 1..n into BuyOrders.csv and SellOrders.csv."""
+    records, missing = {}, []
+    for i in range(1, n + 1):
+        paths = [shard_path(p, i, n) for p in (OUTFILE, SELL_OUTFILE)]
+        if not all(os.path.exists(p) for p in paths):
+            missing.append(i)
+        for path in paths:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for r in csv.DictReader(f):
+                        records[r['Skin']] = r
+    if missing:
+        print(f"[MERGE] WARNING: no output from shard(s) {', '.join(map(str, missing))} of {n}")
+    print(f"[MERGE] {len(records)} rows from {n - len(missing)}/{n} shards")
+    return write_outputs(records, list(records))
+
+def fill_queue(queue, order_rows=None):
+    """Load the OrderLog's BUY and SELL rows into `queue`, replacing whatever was there."""
+    rows = load_order_rows() if order_rows is None else \
+        [dict(r) for r in order_rows if r.get('Action','').upper() in ACTIONS]
+    n = queue.fill(rows)
+    print(f"[QUEUE] {n} rows queued in {queue.path}")
+    return n
+
+def work_queue(queue, batch=None, worker=None):
+    """
+    Drain `queue` alongside any other workers: claim a batch, price it with
+    this process's browsers, repeat. Once nothing is left to claim, wait for
+    the other workers' rows to finish or their leases to expire (and take
+    those over) before returning. Returns the number of rows priced here.
+    """
+    worker = worker or worker_name()
+    batch = batch or 4 * MAX_WORKERS  # keeps every browser busy; small enough to share out
+    oracle, cache = open_tiers(True)
+    pool = DriverPool(MAX_WORKERS)
+    done = 0
+    limit = None  # concurrency carries over from one batch to the next
+    try:
+        while True:
+            rows = queue.claim(worker, batch)
+            if not rows:
+                if not queue.outstanding():
+                    break
+                time.sleep(QUEUE_IDLE_SECONDS)
+                continue
+            limit = price_rows(rows, queue.complete, oracle, cache, pool, limit)
+            done += len(rows)
+    finally:
+        released = queue.release(worker)
+        if released:
+            print(f"[QUEUE] Released {released} unfinished rows")
+        close_pool(pool)
+    print(f"[QUEUE] {worker} priced {done} rows")
+    return done
+
+def collect_queue(queue):
+    """Write BuyOrders.csv and SellOrders.csv from everything the queue's workers finished."""
+    counts = queue.counts()
+    if counts['todo'] or counts['taken']:
+        print(f"[QUEUE] WARNING: {counts['todo'] + counts['taken']} rows not finished yet")
+    return write_outputs(queue.results(), queue.skins())
 
 if __name__=='__main__':
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='Max parallel threads')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='Max parallel browsers')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore cached prices and scrape everything')
+    parser.add_argument('--no-oracle', action='store_true', help='Skip the Skinport snapshot tier')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run, skipping rows already in the journal')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Write per-stage latency percentiles and failure counts as JSON')
+    parser.add_argument('--shard', metavar='I/N',
+                        help='Price only shard I of N (split by skin) into BuyOrders.shardIofN.csv etc.')
+    parser.add_argument('--merge', type=int, metavar='N',
+                        help='Combine the outputs of shards 1..N into BuyOrders.csv / SellOrders.csv')
+    parser.add_argument('--queue', metavar='FILE',
+                        help='Work on a shared SQLite queue (run any number of these, on any box)')
+    parser.add_argument('--fill', action='store_true', help='--queue: load OrderLog.csv into the queue')
+    parser.add_argument('--collect', action='store_true',
+                        help='--queue: write BuyOrders.csv / SellOrders.csv from the finished queue')
     args = parser.parse_args()
     MAX_WORKERS = args.workers
-    main()
+    PROFILE_FILE = args.profile
+    USE_CACHE = not args.no_cache
+    USE_ORACLE = not args.no_oracle
+    if args.merge:
+        merge_shards(args.merge)
+    elif args.queue:
+        queue = OrderQueue(args.queue)
+        if args.fill:
+            fill_queue(queue)
+        elif args.collect:
+            collect_queue(queue)
+        else:
+            try:
+                work_queue(queue)
+            except KeyboardInterrupt:
+                print("[QUEUE] Stopped.")
+            if PROFILE_FILE:
+                PROFILE.write(PROFILE_FILE)
+    else:
+        try:
+            shard = parse_shard(args.shard) if args.shard else None
+        except ValueError as e:
+            parser.error(str(e))
+        main(resume=args.resume, shard=shard)
@@ -3,8 +3,8 @@
 // ========== CONFIG ==========
 const config = require('../config.json');
 const PORT = 3333;
-const INVENTORY_CSV = './Inventory.csv';
 const QUEUE_FILE    = './pending_trades.json';
+const PRICE_SERVICE_URL = process.env.PE_SERVICE_URL || 'http://127.0.0.1:3334';
 
 const { ethers } = require('ethers');
 const fs        = require('fs');
@@ -61,43 +61,52 @@ function getPriceForSkin(skin) {
   });
 }
 
-// ========== FULL-PYTHON UPDATER ==========
-function runPythonUpdater() {
-  const updater = path.resolve(__dirname, '..', 'update_inventory.py');
-  const cwd     = path.dirname(updater);
-  const py = spawn('python', [ updater ], { cwd, stdio:['ignore','pipe','pipe'] });
-  py.stdout.on('data', d => console.log(`Python stdout: ${d}`));
-  py.stderr.on('data', d => console.error(`Python stderr: ${d}`));
-  py.on('close', code => {
-    if (code !== 0) console.error(`update_inventory.py exited with code ${code}`);
-  });
-}
-
-// ========== INVENTORY CSV HANDLING ==========
-if (!fs.existsSync(INVENTORY_CSV)) {
-  fs.writeFileSync(INVENTORY_CSV, "Skin,QTY,Price,LastUpdated\n");
-}
-function updateInventoryCSV(skin, qtyDelta, price = "") {
-  const lines = fs.readFileSync(INVENTORY_CSV, 'utf8').split('\n').slice(1);
-  const inv = {};
-  for (const line of lines) {
-    if (!line.trim()) continue;
-    const [name, qtyStr, val, last] = line.split(',');
-    inv[name] = { qty: parseInt(qtyStr), price: val, lastUpdated: last || "" };
-  }
-  if (!inv[skin]) {
-    inv[skin] = { qty: 0, price, lastUpdated: new Date().toISOString() };
+// Price a whole trade with one call to the resident price service
+// (pe_price_service.py); falls back to one scraper process per item if the
+// service isn't running.
+async function getPricesForSkins(names) {
+  const prices = {};
+  if (names.length === 0) return prices;
+  try {
+    const r = await axios.post(`${PRICE_SERVICE_URL}/prices`, { skins: names }, { timeout: 10 * 60 * 1000 });
+    for (const res of r.data.results) {
+      if (res.usd != null && !isNaN(res.usd)) prices[res.skin] = res.usd;
+    }
+    return prices;
+  } catch (e) {
+    if (e.response) throw new Error(`price service error ${e.response.status}`);
+    console.error(`[PRICE] service unavailable (${e.code || e.message}), spawning scraper per item`);
   }
-  inv[skin].qty += qtyDelta;
-  if (price) inv[skin].price = price;
-  if (inv[skin].qty <= 0) delete inv[skin];
-
-  const out = ["Skin,QTY,Price,LastUpdated"];
-  for (const k of Object.keys(inv)) {
-    const e = inv[k];
-    out.push(`${k},${e.qty},${e.price},${e.lastUpdated}`);
+  for (const name of names) {
+    try {
+      prices[name] = await getPriceForSkin(name);
+    } catch (e) {
+      console.error(`[PRICE] failed for ${name}:`, e.message);
+    }
   }
-  safeWriteFile(INVENTORY_CSV, out.join('\n'));
+  return prices;
+}
+
+// ========== INVENTORY REVALUATION ==========
+// Quantities live in the SQLite store shared with update_inventory.py. Each
+// trade goes to `update_inventory.py --trade -`, which applies it in one
+// transaction, prices only the received SKUs that are new or stale, and
+// updates the running NAV (and setValSkins) in O(items in the trade) rather
+// than re-scraping the whole inventory.
+function revalueTrade(changes) {
+  return new Promise((resolve, reject) => {
+    const updater = path.resolve(__dirname, '..', 'update_inventory.py');
+    const py = spawn('python', [ updater, '--trade', '-' ], { cwd: path.dirname(updater), stdio: ['pipe', 'pipe', 'pipe'] });
+
+    let err = '';
+    py.stdout.on('data', d => console.log(`Python stdout: ${d}`));
+    py.stderr.on('data', d => err += d.toString());
+    py.on('close', code => {
+      if (code !== 0) return reject(new Error(`update_inventory --trade exited ${code}: ${err.trim()}`));
+      resolve();
+    });
+    py.stdin.end(JSON.stringify(changes));
+  });
 }
 
 // ========== QUEUE MANAGEMENT ==========
@@ -172,18 +181,16 @@ async function processQueue() {
 }
 
 async function handleTrade(event) {
-  // 1) scrape USD price for each received item
+  // 1) scrape USD price for each received item (one batch for the whole trade)
   let totalUsd = 0;
-  const prices = {};
-  for (const item of event.itemsToReceive || []) {
-    const name = item.market_hash_name;
-    try {
-      const usd = await getPriceForSkin(name);
-      prices[name] = usd;
-      totalUsd += usd;
-      console.log(`[PRICE] ${name} → $${usd.toFixed(2)}`);
-    } catch (e) {
-      console.error(`[PRICE] failed for ${name}:`, e.message);
+  const received = (event.itemsToReceive || []).map(item => item.market_hash_name);
+  const prices = await getPricesForSkins([...new Set(received)]);
+  for (const name of received) {
+    if (name in prices) {
+      totalUsd += prices[name];
+      console.log(`[PRICE] ${name} → $${prices[name].toFixed(2)}`);
+    } else {
+      console.error(`[PRICE] failed for ${name}`);
     }
   }
 
@@ -205,27 +212,76 @@ async function handleTrade(event) {
     }
   }
 
-  // 3) update CSV with scraped prices & quantities
+  // 3) apply the trade to the inventory store and revalue incrementally
+  const changes = [];
   for (const item of event.itemsToReceive || []) {
-    updateInventoryCSV(item.market_hash_name, 1, prices[item.market_hash_name]?.toFixed(2) || "");
+    changes.push({ skin: item.market_hash_name, delta: 1, price: prices[item.market_hash_name]?.toFixed(2) || "" });
   }
   for (const item of event.itemsToGive || []) {
-    updateInventoryCSV(item.market_hash_name, -1);
+    changes.push({ skin: item.market_hash_name, delta: -1 });
+  }
+  if (changes.length) {
+    try {
+      await revalueTrade(changes);
+    } catch (e) {
+      // don't requeue: the mint above has already happened
+      console.error(`[INVENTORY] ${e.message}; changes: ${JSON.stringify(changes)}`);
+    }
   }
-
-  // 4) run full Python inventory/history updater
-  runPythonUpdater();
 }
 
 // helper to fetch ETH/USD
-async function getEthPriceUSD() {
+// ========== ETH/USD QUOTE ==========
+// Shares eth_quote.py's on-disk quote with the Python scripts: a fresh quote is
+// read straight from the file, a stale one is used while eth_quote.py refreshes
+// it in the background, and only a missing or very old one waits for a fetch.
+// If every source is down the last known quote is used; with none at all the
+// trade is retried rather than minted at a made-up price.
+const ETH_QUOTE_FILE = process.env.ETH_QUOTE_CACHE || path.resolve(__dirname, '..', 'eth_quote.json');
+const ETH_QUOTE_TTL_MS   = 60 * 1000;        // keep in step with eth_quote.py
+const ETH_QUOTE_STALE_MS = 30 * 60 * 1000;
+let ethQuoteRefresh = null;
+
+function readEthQuote() {
   try {
-    const r = await axios.get('https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd');
-    return r.data.ethereum.usd;
+    const q = JSON.parse(fs.readFileSync(ETH_QUOTE_FILE));
+    return q.usd > 0 ? q : null;
   } catch (e) {
-    console.error(e);
-    return 3500;
+    return null;
+  }
+}
+
+function refreshEthQuote() {
+  // one refresh at a time; concurrent trades share it
+  if (!ethQuoteRefresh) {
+    ethQuoteRefresh = new Promise(resolve => {
+      const script = path.resolve(__dirname, '..', 'eth_quote.py');
+      const py = spawn('python', [ script, '--refresh' ], { cwd: path.dirname(script), stdio: ['ignore', 'pipe', 'pipe'] });
+      let err = '';
+      py.stderr.on('data', d => err += d.toString());
+      py.on('close', code => {
+        if (code !== 0) console.error(`[ETH] quote refresh failed: ${err.trim()}`);
+        resolve(readEthQuote());
+      });
+      py.on('error', e => {
+        console.error(`[ETH] quote refresh failed: ${e.message}`);
+        resolve(readEthQuote());
+      });
+    }).finally(() => { ethQuoteRefresh = null; });
+  }
+  return ethQuoteRefresh;
+}
+
+async function getEthPriceUSD() {
+  let quote = readEthQuote();
+  const age = quote ? Date.now() - quote.fetched_at * 1000 : Infinity;
+  if (age > ETH_QUOTE_TTL_MS && age <= ETH_QUOTE_STALE_MS) {
+    refreshEthQuote();
+  } else if (age > ETH_QUOTE_STALE_MS) {
+    quote = (await refreshEthQuote()) || quote;
   }
+  if (!quote) throw new Error('no ETH/USD quote available');
+  return quote.usd;
 }
 
 // ========== API ==========
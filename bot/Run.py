@@ -1,14 +1,77 @@
-import subprocess
+import argparse
+import os
 import sys
 
-def run(cmd):
-    print(f"\n==== Running: {cmd} ====")
-    r = subprocess.run(cmd, shell=True)
-    if r.returncode != 0:
-        print(f"ERROR running: {cmd}")
-        sys.exit(r.returncode)
-
-run("python GenerateManifest.py")
-run("python CreateOrders.py")
-run("python GetOrderPrices.py")
-print("\nAll scripts executed successfully.")
+import GenerateManifest
+import CreateOrders
+from inventory_store import open_store
+from pipeline import Stage, Pipeline, print_timings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../Price Scraper')))
+from pe_price_cache import TTL_BY_CLASS, PriceCache
+from price_oracle import SNAPSHOT_JSON
+
+# order prices are repriced once the shortest-lived ones could have gone stale
+REPRICE_AFTER = min(TTL_BY_CLASS.values())
+
+def price_cache_stamp():
+    # newest cached price and entry count: moves whenever a price is scraped
+    return PriceCache().last_write()
+
+def order_rows(ordered):
+    header = ['Skin', 'Current', 'Target', 'Diff', 'Action']
+    return [dict(zip(header, map(str, row))) for row in ordered]
+
+def generate_manifest(ctx):
+    return GenerateManifest.main()
+
+def create_orders(ctx, budget=None):
+    return CreateOrders.main(manifest=ctx.get('GenerateManifest'), budget=budget)
+
+def get_order_prices(ctx, workers, incremental):
+    import GetOrderPrices  # pulls in the browser stack, only when pricing runs
+    GetOrderPrices.MAX_WORKERS = workers
+    rows = ctx.get('CreateOrders')
+    return GetOrderPrices.main(
+        order_rows=order_rows(rows) if rows is not None else None,
+        incremental=incremental,
+    )
+
+def build_stages(workers=6, force=False, budget=None):
+    return [
+        Stage('GenerateManifest',
+              inputs=[lambda: [os.path.join(GenerateManifest.MANIFEST_DIR, f)
+                               for f in GenerateManifest.pool_manifest_files()]],
+              outputs=[GenerateManifest.COMBINED_CSV],
+              run=generate_manifest),
+        # order sizes depend on prices too: the Skinport snapshot and the
+        # shared price cache that CreateOrders.load_prices reads
+        Stage('CreateOrders',
+              inputs=[CreateOrders.MANIFEST_CSV, CreateOrders.INVENTORY_CSV, SNAPSHOT_JSON],
+              outputs=[CreateOrders.OUTPUT_CSV],
+              run=lambda ctx: create_orders(ctx, budget),
+              stamps={'price_cache': price_cache_stamp,
+                      'budget': lambda: budget or CreateOrders.BUDGET_USD}),
+        Stage('GetOrderPrices',
+              inputs=['OrderLog.csv'],
+              outputs=['BuyOrders.csv', 'SellOrders.csv'],
+              run=lambda ctx: get_order_prices(ctx, workers, incremental=not force),
+              max_age=REPRICE_AFTER),
+    ]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='Run every stage and reprice every row')
+    parser.add_argument('--workers', type=int, default=6, help='Browsers for GetOrderPrices')
+    parser.add_argument('--budget', type=float,
+                        help='USD to allocate in CreateOrders (default: $REBALANCE_BUDGET_USD)')
+    args = parser.parse_args()
+
+    # the store is the source of truth; refresh the CSV export so the
+    # CreateOrders hash notices trades since the last run
+    open_store().export_csv()
+
+    stages = build_stages(args.workers, args.force, args.budget)
+    timings = Pipeline(stages).run(force=args.force)
+    print_timings(timings)
+    print("\nAll stages completed successfully.")
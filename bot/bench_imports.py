@@ -0,0 +1,159 @@
+# bench_imports.py
+#
+# Import-time benchmark for the entry points. Each module is imported in a
+# fresh interpreter under `python -X importtime`, a few times, keeping the
+# fastest run; the report shows its cumulative import time, the whole
+# process's wall time, and any heavy dependency (Chrome driver, Selenium,
+# web3, requests) that got pulled in. Those are only meant to be imported
+# once a code path needs a browser, a chain or the network, so finding one
+# after a bare import is a failure, as is going over the module's budget.
+#
+#   python bench_imports.py                          # every entry point
+#   python bench_imports.py update_inventory pe_scrape_price -v   # slowest imports too
+#   python bench_imports.py --json out.json --baseline last.json  # exit 1 on a regression
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_DIR = os.path.abspath(os.path.join(HERE, '../Price Scraper'))
+
+# ---- DEFAULTS ----
+REPEAT    = 5
+TOLERANCE = 0.50   # --baseline: fail if an import gets this much slower (they are noisy)
+HEAVY     = ['undetected_chromedriver', 'selenium', 'web3', 'eth_account', 'requests', 'urllib3']
+
+# (module, budget in ms of cumulative import time). The per-trade subprocesses
+# bot.js spawns (update_inventory --trade, eth_quote --refresh, the scraper
+# CLI) and the pure helpers get the tight budgets.
+ENTRY_POINTS = [
+    ('update_inventory', 60),
+    ('eth_quote',        30),
+    ('pe_scrape_price',  50),
+    ('update_token',     40),
+    ('inventory_store',  40),
+    ('GetOrderPrices',   80),
+    ('CreateOrders',     40),
+    ('Run',              60),
+    ('tx_submitter',     20),
+    ('order_queue',      30),
+    ('pe_utils',         20),   # pricempire_url
+    ('portfolio',        30),   # CSV valuation
+    ('nav_history',      30),   # history append
+    ('price_oracle',     20),
+]
+
+_CHILD = """
+import sys, json
+import {module}
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{'heavy': heavy, 'modules': len(sys.modules)}}))
+"""
+
+def parse_importtime(stderr):
+    """[(self_us, cumulative_us, name)] from -X importtime output, in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cum_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(self_us), int(cum_us), name.strip()))
+    return rows
+
+def measure(module, repeat=REPEAT):
+    """Fastest of `repeat` cold imports: {'module', 'import_ms', 'wall_ms', 'heavy', 'slowest'}."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (HERE, SCRAPER_DIR, env.get('PYTHONPATH')) if p)
+    code = _CHILD.format(module=module, heavy=HEAVY)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=HERE,
+                              env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+        if proc.returncode != 0:
+            err = [l for l in proc.stderr.splitlines() if not l.startswith('import time:')]
+            return {'module': module, 'error': (err or ['?'])[-1]}
+        times = parse_importtime(proc.stderr)
+        total = next((cum for _, cum, name in times if name == module), 0)
+        if best is None or total < best['import_ms'] * 1000:
+            out = json.loads(proc.stdout.strip().splitlines()[-1])
+            best = {
+                'module': module,
+                'import_ms': round(total / 1000, 1),
+                'wall_ms': round(wall * 1000, 1),
+                'heavy': out['heavy'],
+                'modules': out['modules'],
+                'slowest': [(name, round(s / 1000, 1))
+                            for s, _, name in sorted(times, reverse=True)[:5]],
+            }
+    return best
+
+def run_suite(entry_points, repeat, verbose=False):
+    results = []
+    print(f"{'module':<18} {'import ms':>9} {'budget':>7} {'wall ms':>8} {'modules':>8}  heavy")
+    for module, budget in entry_points:
+        r = measure(module, repeat)
+        r['budget_ms'] = budget
+        results.append(r)
+        if 'error' in r:
+            print(f"{module:<18} [ERROR] {r['error']}")
+            continue
+        flag = ' OVER' if r['import_ms'] > budget else ''
+        print(f"{module:<18} {r['import_ms']:>9.1f} {budget:>7} {r['wall_ms']:>8.1f} {r['modules']:>8}  "
+              f"{', '.join(r['heavy']) or '-'}{flag}")
+        if verbose:
+            for name, ms in r['slowest']:
+                print(f"{'':<20}{ms:>7.1f} ms  {name}")
+    return results
+
+def failures(results):
+    """Entry points that errored, imported a heavy dependency or went over budget."""
+    return [r for r in results
+            if 'error' in r or r['heavy'] or r['import_ms'] > r['budget_ms']]
+
+def compare(results, baseline, tolerance):
+    """Regressions against a previous --json output: [(module, old ms, new ms)]."""
+    old = {b['module']: b for b in baseline if 'error' not in b}
+    regressions = []
+    for r in results:
+        b = old.get(r['module'])
+        if b is None or 'error' in r:
+            continue
+        if r['import_ms'] > b['import_ms'] * (1 + tolerance):
+            regressions.append((r['module'], b['import_ms'], r['import_ms']))
+    return regressions
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('modules', nargs='*', help='Entry points to measure (default: all)')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Cold imports per module; the fastest counts')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show the slowest imports of each module')
+    parser.add_argument('--json', help='Write results here')
+    parser.add_argument('--baseline', help='Earlier --json output to compare import times against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    budgets = dict(ENTRY_POINTS)
+    entry_points = [(m, budgets.get(m, 100)) for m in args.modules] if args.modules else ENTRY_POINTS
+    results = run_suite(entry_points, args.repeat, args.verbose)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    failed = failures(results)
+    for r in failed:
+        if 'error' not in r and r['heavy']:
+            print(f"[HEAVY] importing {r['module']} pulls in {', '.join(r['heavy'])}")
+        elif 'error' not in r:
+            print(f"[BUDGET] {r['module']}: {r['import_ms']} ms > {r['budget_ms']} ms")
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for module, old, new in regressions:
+            print(f"[REGRESSION] {module}: {old} → {new} ms")
+    sys.exit(1 if failed or regressions else 0)
@@ -0,0 +1,329 @@
+# bench_pipeline.py
+#
+# Offline end-to-end benchmark of the scraping path. Runs the real
+# GetOrderPrices.main and update_inventory refresh loop over synthetic
+# OrderLog.csv / Inventory.csv files, with Chrome replaced by the replaying
+# fake driver in pe_fake_driver, and reports rows/s and peak RSS per size.
+#
+#   python bench_pipeline.py                             # 100, 1k, 10k rows, both pipelines
+#   python bench_pipeline.py --sizes 100 1000 --latency-ms 50 --fail-rate 0.05
+#   python bench_pipeline.py --fixtures ./pages          # replay pages saved with PE_SAVE_HTML_DIR
+#   python bench_pipeline.py --json out.json --baseline last.json   # exit 1 on a regression
+#   python bench_pipeline.py --pipelines queue --sizes 1000      # queue scaling: x1/x2/x4 workers
+#
+# Every (pipeline, size) runs in its own subprocess and temp directory, so
+# peak RSS is per run and nothing touches the real CSVs or price cache. The
+# queue pipeline fills an OrderQueue and drains it with --procs worker
+# processes (GetOrderPrices --queue), sharing one price cache; peak RSS is
+# then the largest worker's. With no page latency there is nothing for extra
+# workers to overlap, so queue runs default to QUEUE_LATENCY_MS. Each queue run
+# also reports its speedup over x1, the mean time a queue call took (claims
+# and completions wait on SQLite's single write lock) and how busy the CPUs
+# were, so a flat speedup can be put down to the lock or to the machine.
+import contextlib
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_DIR = os.path.abspath(os.path.join(HERE, '../Price Scraper'))
+SNAPSHOT_JSON = os.path.join(HERE, 'skinport_cache.json')
+
+# ---- DEFAULTS ----
+SIZES      = [100, 1000, 10000]
+PIPELINES  = ['orders', 'inventory']
+PROCS      = [1, 2, 4]  # queue pipeline: worker processes
+QUEUE_LATENCY_MS = 200  # queue pipeline: page load time unless --latency-ms says otherwise
+WORKERS    = 6
+PADDING_KB = 16     # filler markup per synthetic page; raise it to approach real page sizes
+TOLERANCE  = 0.20   # --baseline: fail if rows/s drops by more than this
+
+def skin_names(n, seed=0):
+    """n distinct market_hash_names: real ones from the snapshot when available."""
+    names = []
+    if os.path.exists(SNAPSHOT_JSON):
+        with open(SNAPSHOT_JSON, encoding='utf-8') as f:
+            names = sorted(json.load(f))
+        random.Random(seed).shuffle(names)
+    names = names[:n]
+    for i in range(len(names), n):
+        names.append(f"AK-47 | Bench {i} ({['Factory New', 'Field-Tested', 'Well-Worn'][i % 3]})")
+    return names
+
+def write_order_log(path, names):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Skin', 'Current', 'Target', 'Diff', 'Action'])
+        for i, name in enumerate(names):
+            w.writerow([name, 0, 1 + i % 4, 1 + i % 4, 'BUY'])
+
+def write_inventory(path, names):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Skin', 'QTY', 'Price', 'LastUpdated'])
+        for i, name in enumerate(names):
+            w.writerow([name, 1 + i % 5, f"{1 + i % 97:.2f}", '2020-01-01T00:00:00+00:00'])
+
+# ---- ONE RUN (child process) ----
+def install_fakes(args):
+    """Fake Chrome plus a scheduler that isn't held back by the site's rate limit."""
+    sys.path.insert(0, SCRAPER_DIR)
+    sys.path.insert(0, HERE)
+    import pe_fake_driver
+    pages = pe_fake_driver.FixturePages(args.fixtures, args.padding_kb)
+    factory = pe_fake_driver.FakeChromeFactory(
+        pages, launch_ms=args.launch_ms, latency_ms=args.latency_ms,
+        fail_rate=args.fail_rate, blank_rate=args.blank_rate,
+    )
+    pe_fake_driver.install(factory)
+
+    import functools
+    import pe_scrape_price
+    from pe_scheduler import Scheduler
+    pe_scrape_price.SETTLE_SECONDS = args.settle
+    return factory, functools.partial(Scheduler, rate=args.rate, burst=max(args.rate, 1), base_backoff=0.05)
+
+class TimedQueue:
+    """OrderQueue wrapper that adds up the time spent in claim() and complete()."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.calls = []  # seconds per call; list.append is safe across threads
+
+    def _timed(self, fn, *a):
+        t0 = time.perf_counter()
+        try:
+            return fn(*a)
+        finally:
+            self.calls.append(time.perf_counter() - t0)
+
+    def claim(self, *a):
+        return self._timed(self.queue.claim, *a)
+
+    def complete(self, row):
+        return self._timed(self.queue.complete, row)
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
+
+def queue_worker(path, args):
+    """One GetOrderPrices --queue worker (grandchild of the suite)."""
+    factory, scheduler = install_fakes(args)
+    import GetOrderPrices
+    from order_queue import OrderQueue
+    GetOrderPrices.MAX_WORKERS = args.workers
+    GetOrderPrices.USE_ORACLE = False
+    GetOrderPrices.QUEUE_IDLE_SECONDS = 0.05
+    GetOrderPrices.Scheduler = scheduler
+    queue = TimedQueue(OrderQueue(path))
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        GetOrderPrices.work_queue(queue)
+    with open(f"{path}.{os.getpid()}.calls.json", 'w', encoding='utf-8') as f:
+        json.dump(queue.calls, f)
+
+def run_queue(names, procs, args):
+    """Fill a queue and drain it with `procs` worker processes. Returns (seconds, priced, queue call times)."""
+    import GetOrderPrices
+    from order_queue import OrderQueue
+    write_order_log('OrderLog.csv', names)
+    queue = OrderQueue(os.path.abspath('OrderQueue.db'))
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        GetOrderPrices.fill_queue(queue)
+    argv = [sys.executable, os.path.abspath(__file__), '--queue-worker', queue.path] + fake_argv(args)
+    t0 = time.perf_counter()
+    workers = [subprocess.Popen(argv, stdout=subprocess.DEVNULL) for _ in range(procs)]
+    if any(w.wait() for w in workers):
+        raise RuntimeError('a queue worker failed')
+    elapsed = time.perf_counter() - t0
+    priced = sum(1 for r in queue.results().values() if r.get('PriceUSD'))
+    calls = []
+    for w in workers:
+        with open(f"{queue.path}.{w.pid}.calls.json", encoding='utf-8') as f:
+            calls += json.load(f)
+    return elapsed, priced, calls
+
+def run_one(pipeline, size, args):
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.environ['PE_PRICE_CACHE'] = os.path.join(workdir, 'price_cache.db')
+    os.chdir(workdir)
+    if pipeline == 'queue':
+        sys.path.insert(0, HERE)
+        procs = args.procs[0]
+        elapsed, priced, calls = run_queue(skin_names(size), procs, args)
+        rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = rusage.ru_utime + rusage.ru_stime
+        return {
+            'pipeline': f"queue x{procs}",
+            'rows': size,
+            'priced': priced,
+            'seconds': round(elapsed, 3),
+            'rows_per_s': round(size / elapsed, 2) if elapsed else None,
+            'peak_rss_mb': round(rusage.ru_maxrss / 1024, 1),
+            'latency_ms': args.latency_ms,
+            'queue_call_ms': round(1000 * sum(calls) / len(calls), 2) if calls else None,
+            'cpu_busy': round(cpu / (elapsed * (os.cpu_count() or 1)), 3) if elapsed else None,
+        }
+
+    # the site's rate limit is not what is being measured here
+    factory, scheduler = install_fakes(args)
+
+    names = skin_names(size)
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        if pipeline == 'orders':
+            write_order_log('OrderLog.csv', names)
+            import GetOrderPrices
+            GetOrderPrices.MAX_WORKERS = args.workers
+            GetOrderPrices.USE_ORACLE = False
+            GetOrderPrices.Scheduler = scheduler
+            t0 = time.perf_counter()
+            results = GetOrderPrices.main()
+            elapsed = time.perf_counter() - t0
+            priced = sum(1 for r in results if r.get('PriceUSD'))
+        else:
+            write_inventory('Inventory.csv', names)
+            from datetime import datetime, timezone
+            import update_inventory
+            from pe_price_cache import PriceCache
+            from portfolio import Portfolio
+            update_inventory.Scheduler = scheduler
+            rows = list(Portfolio.from_csv('Inventory.csv'))
+            now = datetime.now(timezone.utc)
+            t0 = time.perf_counter()
+            update_inventory.refresh_with_budget(rows, float('inf'), args.workers,
+                                                 PriceCache(), None, False, now)
+            elapsed = time.perf_counter() - t0
+            # a refreshed row is stamped with its price's fetch time, at or after `now`
+            priced = sum(1 for r in rows if r.updated >= now.timestamp())
+
+    return {
+        'pipeline': pipeline,
+        'rows': size,
+        'priced': priced,
+        'seconds': round(elapsed, 3),
+        'rows_per_s': round(size / elapsed, 2) if elapsed else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'launches': factory.launched,
+        'page_loads': factory.page_loads(),
+    }
+
+# ---- SUITE (parent process) ----
+def child_argv(pipeline, size, args):
+    return [sys.executable, os.path.abspath(__file__), '--run', pipeline, str(size)] + fake_argv(args)
+
+def fake_argv(args):
+    """The fake-browser options, passed on to each child."""
+    argv = ['--workers', str(args.workers), '--latency-ms', str(args.latency_ms or 0),
+            '--fail-rate', str(args.fail_rate), '--blank-rate', str(args.blank_rate),
+            '--settle', str(args.settle), '--launch-ms', str(args.launch_ms),
+            '--padding-kb', str(args.padding_kb), '--rate', str(args.rate)]
+    if args.fixtures:
+        argv += ['--fixtures', os.path.abspath(args.fixtures)]
+    return argv
+
+def run_suite(args):
+    results = []
+    print(f"{'pipeline':<10} {'rows':>6} {'priced':>6} {'seconds':>8} {'rows/s':>9} {'peak RSS':>9}")
+    runs = [(p, p, []) for p in args.pipelines if p != 'queue']
+    if 'queue' in args.pipelines:
+        latency = QUEUE_LATENCY_MS if args.latency_ms is None else args.latency_ms
+        runs += [(f"queue x{n}", 'queue', ['--procs', str(n), '--latency-ms', str(latency)])
+                 for n in args.procs]
+    for name, pipeline, extra in runs:
+        for size in args.sizes:
+            proc = subprocess.run(child_argv(pipeline, size, args) + extra, capture_output=True, text=True)
+            if proc.returncode != 0:
+                err = (proc.stderr.strip().splitlines() or ['?'])[-1]
+                print(f"{name:<10} {size:>6} [ERROR] {err}")
+                results.append({'pipeline': name, 'rows': size, 'error': err})
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(r)
+            print(f"{name:<10} {size:>6} {r['priced']:>6} {r['seconds']:>8.2f} "
+                  f"{r['rows_per_s']:>9.1f} {r['peak_rss_mb']:>7.1f}MB")
+    report_scaling(results)
+    return results
+
+def report_scaling(results):
+    """Queue throughput at each worker count relative to x1, and what held it back."""
+    queue = {}
+    for r in results:
+        if r['pipeline'].startswith('queue x') and 'error' not in r:
+            queue.setdefault(r['rows'], {})[int(r['pipeline'][len('queue x'):])] = r
+    for rows, by_procs in sorted(queue.items()):
+        base = by_procs.get(1)
+        if base is None or len(by_procs) < 2:
+            continue
+        print(f"\n[SCALING] {rows} rows at {base['latency_ms']:.0f}ms per page, {os.cpu_count()} CPU(s)")
+        for procs, r in sorted(by_procs.items()):
+            speedup = r['rows_per_s'] / base['rows_per_s']
+            r['speedup'] = round(speedup, 2)
+            if speedup >= 0.8 * procs:
+                verdict = 'scales'
+            elif r['cpu_busy'] >= 0.8:
+                verdict = 'CPU-bound: more workers than cores'
+            elif base['queue_call_ms'] and r['queue_call_ms'] >= 3 * base['queue_call_ms']:
+                verdict = 'queue-bound: waiting on the SQLite write lock'
+            else:
+                verdict = 'page-bound: too few rows per worker to keep browsers busy'
+            print(f"  x{procs}: {r['rows_per_s']:.1f} rows/s ({speedup:.2f}x), "
+                  f"queue call {r['queue_call_ms']:.1f}ms, CPU {r['cpu_busy']:.0%} busy -> {verdict}")
+
+def compare(results, baseline, tolerance):
+    """Regressions against a previous --json output: [(pipeline, rows, old, new)]."""
+    old = {(b['pipeline'], b['rows']): b for b in baseline if 'error' not in b}
+    regressions = []
+    for r in results:
+        b = old.get((r['pipeline'], r['rows']))
+        if b is None:
+            continue
+        if 'error' in r or r['rows_per_s'] < b['rows_per_s'] * (1 - tolerance):
+            regressions.append((r['pipeline'], r['rows'], b['rows_per_s'], r.get('rows_per_s')))
+    return regressions
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--pipelines', nargs='+', choices=PIPELINES + ['queue'], default=PIPELINES)
+    parser.add_argument('--procs', type=int, nargs='+', default=PROCS, help='Worker processes for the queue pipeline')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Max fake browsers')
+    parser.add_argument('--fixtures', help='Directory of pages saved with PE_SAVE_HTML_DIR')
+    parser.add_argument('--padding-kb', type=int, default=PADDING_KB, help='Filler per synthetic page')
+    parser.add_argument('--latency-ms', type=float,
+                        help=f'Mean page load time (default 0; {QUEUE_LATENCY_MS} for the queue pipeline)')
+    parser.add_argument('--launch-ms', type=float, default=0.0, help='Browser launch time')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of page loads that time out')
+    parser.add_argument('--blank-rate', type=float, default=0.0, help='Share of loads that return a price-less page')
+    parser.add_argument('--settle', type=float, default=0.0, help="Longest wait for a page's prices to render")
+    parser.add_argument('--rate', type=float, default=1e6, help='Per-host request rate for the scheduler')
+    parser.add_argument('--json', help='Write results here')
+    parser.add_argument('--baseline', help='Earlier --json output to compare rows/s against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--run', nargs=2, metavar=('PIPELINE', 'ROWS'), help=argparse.SUPPRESS)
+    parser.add_argument('--queue-worker', metavar='FILE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.queue_worker:
+        queue_worker(args.queue_worker, args)
+        sys.exit(0)
+    if args.run:
+        print(json.dumps(run_one(args.run[0], int(args.run[1]), args)))
+        sys.exit(0)
+
+    results = run_suite(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for pipeline, rows, old, new in regressions:
+            print(f"[REGRESSION] {pipeline} @ {rows} rows: {old} → {new} rows/s")
+        sys.exit(1 if regressions else 0)
+    sys.exit(0 if all('error' not in r for r in results) else 1)
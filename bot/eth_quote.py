@@ -0,0 +1,196 @@
+# eth_quote.py
+#
+# Shared ETH/USD quote for update_inventory, update_token and the trade bot.
+# One keep-alive HTTP session, an in-process quote plus an on-disk one
+# (eth_quote.json) that every script and bot.js read, so back-to-back runs and
+# bursts of trades reuse one quote instead of making a request each:
+#
+#   age <= QUOTE_TTL    served as is
+#   age <= STALE_FOR    served, and refreshed in the background
+#   older / missing     fetched now, trying each source in turn; if every
+#                       source fails the last-known-good quote is used, at
+#                       any age, and only with no quote at all is it an error
+#
+# That is for display (bot.js, status output). Anything written on-chain or
+# into the NAV history uses fresh_eth_usd() instead: a quote older than
+# QUOTE_TTL is fetched again before returning, and if no source answers the
+# caller gets QuoteUnavailable rather than a stale price.
+#
+#   python eth_quote.py              # print the current quote as JSON
+#   python eth_quote.py --refresh    # fetch a new one now (bot.js uses this)
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+# ---- CONFIG ----
+QUOTE_CACHE = os.getenv('ETH_QUOTE_CACHE',
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eth_quote.json'))
+QUOTE_TTL   = 60          # seconds a quote is fresh
+STALE_FOR   = 30 * 60     # seconds a quote may be served while it is refreshed
+TIMEOUT     = 10
+
+Quote = namedtuple('Quote', 'usd fetched_at source')
+
+class QuoteUnavailable(Exception):
+    """No source answered and there is no earlier quote to fall back to."""
+
+# ---- SOURCES ----
+# A source takes the shared requests session and returns ETH in USD.
+def coingecko(session):
+    r = session.get('https://api.coingecko.com/api/v3/simple/price',
+                    params={'ids': 'ethereum', 'vs_currencies': 'usd'}, timeout=TIMEOUT)
+    r.raise_for_status()
+    return float(r.json()['ethereum']['usd'])
+
+def coinbase(session):
+    r = session.get('https://api.coinbase.com/v2/prices/ETH-USD/spot', timeout=TIMEOUT)
+    r.raise_for_status()
+    return float(r.json()['data']['amount'])
+
+def kraken(session):
+    r = session.get('https://api.kraken.com/0/public/Ticker', params={'pair': 'ETHUSD'}, timeout=TIMEOUT)
+    r.raise_for_status()
+    result = r.json()['result']
+    return float(next(iter(result.values()))['c'][0])
+
+SOURCES = [coingecko, coinbase, kraken]
+
+class QuoteClient:
+    def __init__(self, sources=None, cache_path=QUOTE_CACHE, ttl=QUOTE_TTL, stale_for=STALE_FOR):
+        self.sources = list(sources or SOURCES)
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.stale_for = stale_for
+        self._session = None
+        self._quote = None
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._revalidating = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    # ---- cache ----
+    def _load(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                d = json.load(f)
+            return Quote(float(d['usd']), float(d['fetched_at']), d.get('source', '?'))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save(self, quote):
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(quote._asdict(), f)
+        os.replace(tmp, self.cache_path)
+
+    def cached(self):
+        """Newest quote known to this process or on disk, or None."""
+        disk = self._load()
+        with self._lock:
+            if disk and (self._quote is None or disk.fetched_at > self._quote.fetched_at):
+                self._quote = disk
+            return self._quote
+
+    # ---- fetching ----
+    def refresh(self):
+        """Ask each source in turn; the first answer becomes the cached quote."""
+        with self._fetch_lock:
+            errors = []
+            for source in self.sources:
+                try:
+                    usd = source(self.session)
+                except Exception as e:
+                    errors.append(f"{source.__name__}: {e}")
+                    continue
+                if not usd > 0:
+                    errors.append(f"{source.__name__}: bad price {usd!r}")
+                    continue
+                quote = Quote(usd, time.time(), source.__name__)
+                with self._lock:
+                    self._quote = quote
+                try:
+                    self._save(quote)
+                except OSError as e:
+                    print(f"[ETH] Couldn't write {self.cache_path}: {e}")
+                return quote
+            raise QuoteUnavailable('; '.join(errors) or 'no sources configured')
+
+    def _revalidate(self):
+        with self._lock:
+            if self._revalidating is not None and self._revalidating.is_alive():
+                return
+            # not a daemon: a one-shot script finishes the refresh before it exits
+            self._revalidating = threading.Thread(target=self._revalidate_quietly, name='eth-quote')
+            self._revalidating.start()
+
+    def _revalidate_quietly(self):
+        try:
+            self.refresh()
+        except QuoteUnavailable as e:
+            print(f"[ETH] Background refresh failed: {e}")
+
+    def get(self):
+        """The current quote, per the freshness rules at the top of this file."""
+        quote = self.cached()
+        age = time.time() - quote.fetched_at if quote else None
+        if quote and age <= self.ttl:
+            return quote
+        if quote and age <= self.stale_for:
+            self._revalidate()
+            return quote
+        try:
+            return self.refresh()
+        except QuoteUnavailable as e:
+            if quote is None:
+                raise
+            print(f"[ETH] {e}; using last known ${quote.usd:.2f} from {age / 60:.0f} min ago")
+            return quote
+
+    def get_fresh(self):
+        """A quote no older than the TTL, fetched now if need be; never a stale one."""
+        quote = self.cached()
+        if quote and time.time() - quote.fetched_at <= self.ttl:
+            return quote
+        return self.refresh()
+
+_client = None
+_client_lock = threading.Lock()
+
+def client():
+    """Process-wide QuoteClient."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = QuoteClient()
+    return _client
+
+def eth_usd():
+    """ETH price in USD (raises QuoteUnavailable only if there has never been a quote)."""
+    return client().get().usd
+
+def fresh_eth_usd():
+    """ETH price in USD at most QUOTE_TTL old, for on-chain writes (raises QuoteUnavailable)."""
+    return client().get_fresh().usd
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--refresh', action='store_true', help='Fetch a new quote now')
+    args = parser.parse_args()
+
+    c = client()
+    try:
+        quote = c.refresh() if args.refresh else c.get()
+    except QuoteUnavailable as e:
+        print(f"[ETH] {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(dict(quote._asdict(), age=round(time.time() - quote.fetched_at, 1))))
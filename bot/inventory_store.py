@@ -0,0 +1,259 @@
+# inventory_store.py
+#
+# The inventory lives in SQLite (WAL mode) instead of Inventory.csv, so the
+# trade bot and update_inventory can both write it without clobbering each
+# other: quantity changes and price refreshes are single-row transactions
+# touching only their own columns, and every change is appended to a change
+# log. The total value (sum of qty x price) is kept up to date by the same
+# transactions, so revaluing after a trade costs O(items in the trade).
+# Inventory.csv is still written as an export for anything that reads it.
+#
+#   python inventory_store.py export              # refresh Inventory.csv
+#   python inventory_store.py apply < changes.json   # [{"skin", "delta", "price"}], used by bot.js
+#   python inventory_store.py log [N]             # last N changes
+#   python inventory_store.py total               # running total value in USD
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from portfolio import parse_cents
+from sqlite_util import Txn, connect
+
+# ---- CONFIG ----
+INVENTORY_DB  = os.getenv('INVENTORY_DB', 'Inventory.db')
+INVENTORY_CSV = 'Inventory.csv'
+CSV_FIELDS    = ['Skin', 'QTY', 'Price', 'LastUpdated']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inventory (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,  -- keeps CSV row order
+    skin          TEXT NOT NULL UNIQUE,
+    qty           INTEGER NOT NULL,
+    price         TEXT NOT NULL,
+    last_updated  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts         REAL NOT NULL,
+    skin       TEXT NOT NULL,
+    source     TEXT NOT NULL,
+    old_qty    INTEGER,
+    new_qty    INTEGER,
+    old_price  TEXT,
+    new_price  TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_skin ON changes (skin);
+CREATE TABLE IF NOT EXISTS totals (
+    id           INTEGER PRIMARY KEY CHECK (id = 1),
+    value_cents  INTEGER NOT NULL                  -- sum of qty x price
+);
+"""
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+def _cents(price):
+    """Price string -> integer cents for the running total (0 when unpriced)."""
+    return max(parse_cents(price) or 0, 0)
+
+class InventoryStore:
+    def __init__(self, path=INVENTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+        if self._conn().execute('SELECT 1 FROM totals').fetchone() is None:
+            self.recompute_total()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path, timeout=30)
+        return conn
+
+    def _write(self):
+        return Txn(self._conn())
+
+    # ---- reads ----
+    def get(self, skin):
+        """CSV-shaped row for `skin`, or None."""
+        row = self._conn().execute(
+            'SELECT skin, qty, price, last_updated FROM inventory WHERE skin = ?', (skin,)
+        ).fetchone()
+        return _as_row(row) if row else None
+
+    def rows(self):
+        """Every row as {'Skin','QTY','Price','LastUpdated'} strings, in CSV order."""
+        return [_as_row(r) for r in self._conn().execute(
+            'SELECT skin, qty, price, last_updated FROM inventory ORDER BY id')]
+
+    def quantities(self):
+        return dict(self._conn().execute('SELECT skin, qty FROM inventory'))
+
+    def prices(self):
+        """{skin: price string} for rows that have one."""
+        return dict(self._conn().execute("SELECT skin, price FROM inventory WHERE price != ''"))
+
+    def is_empty(self):
+        return self._conn().execute('SELECT 1 FROM inventory LIMIT 1').fetchone() is None
+
+    def total_usd(self):
+        """Running total of qty x price, in O(1)."""
+        row = self._conn().execute('SELECT value_cents FROM totals WHERE id = 1').fetchone()
+        return row[0] / 100 if row else 0.0
+
+    def changes(self, since_id=0, limit=None):
+        sql = ('SELECT id, ts, skin, source, old_qty, new_qty, old_price, new_price '
+               'FROM changes WHERE id > ? ORDER BY id')
+        args = [since_id]
+        if limit:
+            sql = ('SELECT * FROM (SELECT id, ts, skin, source, old_qty, new_qty, old_price, new_price '
+                   'FROM changes WHERE id > ? ORDER BY id DESC LIMIT ?) ORDER BY id')
+            args.append(limit)
+        return self._conn().execute(sql, args).fetchall()
+
+    # ---- writes ----
+    def adjust_qty(self, skin, delta, price=None, source='manual'):
+        """
+        Add `delta` to the quantity of `skin` (creating the row if needed) and
+        optionally set its price. A row whose quantity drops to zero or below
+        is removed. Returns the new quantity.
+        """
+        with self._write() as conn:
+            return self._adjust(conn, skin, delta, price, source)
+
+    def apply(self, changes, source='trade'):
+        """Apply [{'skin', 'delta', 'price'}] in one transaction (a whole trade)."""
+        with self._write() as conn:
+            for c in changes:
+                self._adjust(conn, c['skin'], int(c.get('delta', 0)), c.get('price') or None, source)
+
+    def _adjust(self, conn, skin, delta, price, source):
+        row = conn.execute('SELECT qty, price FROM inventory WHERE skin = ?', (skin,)).fetchone()
+        old_qty, old_price = row if row else (None, None)
+        new_qty = (old_qty or 0) + delta
+        new_price = price if price else (old_price or '')
+        if new_qty <= 0:
+            conn.execute('DELETE FROM inventory WHERE skin = ?', (skin,))
+        elif row and price:
+            # a price that comes with the change was just scraped
+            conn.execute('UPDATE inventory SET qty = ?, price = ?, last_updated = ? WHERE skin = ?',
+                         (new_qty, new_price, _now_iso(), skin))
+        elif row:
+            conn.execute('UPDATE inventory SET qty = ? WHERE skin = ?', (new_qty, skin))
+        else:
+            conn.execute(
+                'INSERT INTO inventory (skin, qty, price, last_updated) VALUES (?, ?, ?, ?)',
+                (skin, new_qty, new_price, _now_iso())
+            )
+        self._bump(conn, max(new_qty, 0) * _cents(new_price) - (old_qty or 0) * _cents(old_price))
+        self._log(conn, skin, source, old_qty, max(new_qty, 0), old_price, new_price)
+        return max(new_qty, 0)
+
+    def set_price(self, skin, price, last_updated=None, source='manual'):
+        self.set_prices([(skin, price, last_updated)], source)
+
+    def set_prices(self, updates, source='update_inventory'):
+        """
+        [(skin, price, last_updated)] in one transaction. Only price columns
+        are written, so a quantity change from a trade that landed meanwhile
+        is kept; skins that have left the inventory are ignored.
+        """
+        with self._write() as conn:
+            for skin, price, last_updated in updates:
+                row = conn.execute('SELECT qty, price FROM inventory WHERE skin = ?', (skin,)).fetchone()
+                if row is None:
+                    continue
+                conn.execute('UPDATE inventory SET price = ?, last_updated = ? WHERE skin = ?',
+                             (price, last_updated or _now_iso(), skin))
+                if row[1] != price:
+                    self._bump(conn, row[0] * (_cents(price) - _cents(row[1])))
+                    self._log(conn, skin, source, row[0], row[0], row[1], price)
+
+    def _bump(self, conn, cents):
+        if cents:
+            conn.execute('UPDATE totals SET value_cents = value_cents + ? WHERE id = 1', (cents,))
+
+    def recompute_total(self):
+        """Rebuild the running total from every row; returns it in USD."""
+        with self._write() as conn:
+            return self._recompute(conn) / 100
+
+    def _recompute(self, conn):
+        cents = sum(qty * _cents(price) for qty, price in conn.execute('SELECT qty, price FROM inventory'))
+        conn.execute('INSERT OR REPLACE INTO totals (id, value_cents) VALUES (1, ?)', (cents,))
+        return cents
+
+    def _log(self, conn, skin, source, old_qty, new_qty, old_price, new_price):
+        conn.execute(
+            'INSERT INTO changes (ts, skin, source, old_qty, new_qty, old_price, new_price) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (time.time(), skin, source, old_qty, new_qty, old_price, new_price)
+        )
+
+    # ---- CSV compatibility ----
+    def import_csv(self, path=INVENTORY_CSV):
+        """Load Inventory.csv into an empty store (one-off migration)."""
+        with open(path, encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        with self._write() as conn:
+            for r in rows:
+                if not r.get('Skin'):
+                    continue
+                conn.execute(
+                    'INSERT OR IGNORE INTO inventory (skin, qty, price, last_updated) VALUES (?, ?, ?, ?)',
+                    (r['Skin'], int(r.get('QTY') or 0), r.get('Price', ''), r.get('LastUpdated', ''))
+                )
+            self._recompute(conn)
+        return len(rows)
+
+    def export_csv(self, path=INVENTORY_CSV):
+        """Write the inventory out as Inventory.csv (atomically)."""
+        rows = self.rows()
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp, path)
+        return len(rows)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+def _as_row(r):
+    return {'Skin': r[0], 'QTY': str(r[1]), 'Price': r[2], 'LastUpdated': r[3]}
+
+def open_store(path=INVENTORY_DB, csv_path=INVENTORY_CSV):
+    """The inventory store, seeded from Inventory.csv the first time it is opened."""
+    store = InventoryStore(path)
+    if store.is_empty() and os.path.exists(csv_path):
+        n = store.import_csv(csv_path)
+        print(f"[INVENTORY] Imported {n} rows from {csv_path} into {path}")
+    return store
+
+if __name__ == '__main__':
+    cmd = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    store = open_store()
+    if cmd == 'export':
+        print(f"[INVENTORY] Exported {store.export_csv()} rows to {INVENTORY_CSV}")
+    elif cmd == 'apply':
+        changes = json.load(sys.stdin)
+        store.apply(changes, source='trade')
+        print(f"[INVENTORY] Applied {len(changes)} changes")
+    elif cmd == 'log':
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        for cid, ts, skin, source, oq, nq, op, np in store.changes(limit=n):
+            when = datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec='seconds')
+            print(f"{cid:>6} {when} {source:<16} {skin}: qty {oq}→{nq}, price {op}→{np}")
+    elif cmd == 'total':
+        print(f"[INVENTORY] Total ${store.total_usd():.2f}")
+    else:
+        print(f"Unknown command {cmd!r}; use export, apply, log or total")
+        sys.exit(1)
@@ -0,0 +1,223 @@
+# nav_history.py
+#
+# Append-only binary time series for NAV snapshots. Every record has the same
+# width, so the latest value is one seek from the end of the file, a time range
+# is a binary search over record offsets, and hourly/daily OHLC rollups are a
+# single pass over that range. The CSV histories are still appended for
+# compatibility; these files sit next to them and are seeded from them once.
+#
+# Layout: 16-byte header (magic, record size), then records of
+#   ts (unix seconds), usd, eth, eth_usd, nav_per_token   as little-endian doubles
+# nav_per_token is NaN for the inventory series.
+#
+#   python nav_history.py latest [inventory|token]
+#   python nav_history.py range  [inventory|token] --since 2025-06-14 --until 2025-06-15
+#   python nav_history.py ohlc   [inventory|token] --bucket day --field eth
+import csv
+import math
+import os
+import struct
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# ---- CONFIG ----
+INVENTORY_HISTORY_CSV = 'InventoryHistory.csv'
+INVENTORY_HISTORY_BIN = 'InventoryHistory.bin'
+TOKEN_HISTORY_CSV     = 'skindex_price_history.csv'
+TOKEN_HISTORY_BIN     = 'skindex_price_history.bin'
+
+_MAGIC  = b'NAVTS001'
+_HEADER = struct.Struct('<8sI4x')
+_RECORD = struct.Struct('<5d')
+BUCKETS = {'hour': 3600, 'day': 86400}
+
+Snapshot = namedtuple('Snapshot', 'ts usd eth eth_usd nav_per_token')
+Candle = namedtuple('Candle', 'start open high low close count')
+
+def to_epoch(when):
+    """ISO-8601 string, datetime or number -> unix seconds."""
+    if isinstance(when, (int, float)):
+        return float(when)
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+class NavSeries:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _RECORD.size))
+        with open(path, 'rb') as f:
+            magic, size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or size != _RECORD.size:
+            raise ValueError(f"{path} is not a NAV series file")
+        self._drop_torn_tail()
+
+    def _drop_torn_tail(self):
+        # a crash mid-append can leave a partial record; cut it off
+        body = os.path.getsize(self.path) - _HEADER.size
+        if body % _RECORD.size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(_HEADER.size + body - body % _RECORD.size)
+
+    def __len__(self):
+        return (os.path.getsize(self.path) - _HEADER.size) // _RECORD.size
+
+    def _read(self, f, i):
+        f.seek(_HEADER.size + i * _RECORD.size)
+        return Snapshot(*_RECORD.unpack(f.read(_RECORD.size)))
+
+    # ---- writes ----
+    def append(self, ts, usd, eth, eth_usd, nav_per_token=math.nan):
+        """
+        Append one snapshot. Timestamps must not go backwards (range() bisects
+        on them), so an older one is logged and skipped. Returns True if written.
+        """
+        ts = to_epoch(ts)
+        with self._lock:
+            last = self.latest()
+            if last is not None and ts < last.ts:
+                print(f"[HISTORY] Skipping snapshot at {_iso(ts)}: older than the latest one "
+                      f"({_iso(last.ts)}) in {self.path}")
+                return False
+            with open(self.path, 'ab') as f:
+                f.write(_RECORD.pack(ts, usd, eth, eth_usd, nav_per_token))
+                f.flush()
+                os.fsync(f.fileno())
+        return True
+
+    # ---- reads ----
+    def latest(self):
+        """Most recent snapshot or None, in O(1)."""
+        n = len(self)
+        if not n:
+            return None
+        with open(self.path, 'rb') as f:
+            return self._read(f, n - 1)
+
+    def _bisect(self, f, n, ts):
+        """Index of the first record with timestamp >= ts."""
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._read(f, mid).ts < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def range(self, since=None, until=None):
+        """Snapshots with since <= ts < until (either bound optional)."""
+        n = len(self)
+        with open(self.path, 'rb') as f:
+            lo = self._bisect(f, n, to_epoch(since)) if since is not None else 0
+            hi = self._bisect(f, n, to_epoch(until)) if until is not None else n
+            if hi <= lo:
+                return []
+            f.seek(_HEADER.size + lo * _RECORD.size)
+            data = f.read((hi - lo) * _RECORD.size)
+        return [Snapshot(*rec) for rec in _RECORD.iter_unpack(data)]
+
+    def rollup(self, bucket='day', field='usd', since=None, until=None):
+        """OHLC candles of `field` per hour or day (UTC), oldest first."""
+        width = BUCKETS[bucket]
+        candles = []
+        cur = None
+        for snap in self.range(since, until):
+            v = getattr(snap, field)
+            if math.isnan(v):
+                continue
+            start = snap.ts - snap.ts % width
+            if cur is None or start != cur[0]:
+                if cur is not None:
+                    candles.append(Candle(*cur))
+                cur = [start, v, v, v, v, 0]
+            cur[2] = max(cur[2], v)
+            cur[3] = min(cur[3], v)
+            cur[4] = v
+            cur[5] += 1
+        if cur is not None:
+            candles.append(Candle(*cur))
+        return candles
+
+    # ---- CSV migration ----
+    def import_csv(self, csv_path, nav_column=None):
+        """
+        Append every row of a history CSV (Date, USD, ETH, ETH/USD columns in
+        that order; `nav_column` names the NAV-per-token column if any). Rows
+        older than the one before them are skipped, as append() would.
+        """
+        with open(csv_path, encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return 0
+            nav_idx = header.index(nav_column) if nav_column else None
+            last = self.latest()
+            last_ts = last.ts if last is not None else -math.inf
+            count = skipped = 0
+            with self._lock, open(self.path, 'ab') as out:
+                for row in reader:
+                    if len(row) < 4:
+                        continue
+                    try:
+                        ts = to_epoch(row[0])
+                        nav = float(row[nav_idx]) if nav_idx is not None else math.nan
+                        rec = _RECORD.pack(ts, float(row[1]), float(row[2]), float(row[3]), nav)
+                    except ValueError:
+                        continue
+                    if ts < last_ts:
+                        skipped += 1
+                        continue
+                    out.write(rec)
+                    last_ts = ts
+                    count += 1
+        if skipped:
+            print(f"[HISTORY] Skipped {skipped} out-of-order rows of {csv_path}")
+        return count
+
+def _open(bin_path, csv_path, nav_column=None):
+    seeded = os.path.exists(bin_path)
+    series = NavSeries(bin_path)
+    if not seeded and os.path.exists(csv_path):
+        n = series.import_csv(csv_path, nav_column)
+        print(f"[HISTORY] Imported {n} snapshots from {csv_path} into {bin_path}")
+    return series
+
+def inventory_history():
+    """USD / ETH value of the skin inventory over time (update_inventory)."""
+    return _open(INVENTORY_HISTORY_BIN, INVENTORY_HISTORY_CSV)
+
+def token_history():
+    """SKINDEX price over time; nav_per_token is the on-chain NAV in ETH (update_token)."""
+    return _open(TOKEN_HISTORY_BIN, TOKEN_HISTORY_CSV, nav_column='Price in ETH')
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec='seconds')
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', choices=['latest', 'range', 'ohlc'])
+    parser.add_argument('series', nargs='?', choices=['inventory', 'token'], default='inventory')
+    parser.add_argument('--since')
+    parser.add_argument('--until')
+    parser.add_argument('--bucket', choices=sorted(BUCKETS), default='day')
+    parser.add_argument('--field', choices=['usd', 'eth', 'eth_usd', 'nav_per_token'], default='usd')
+    args = parser.parse_args()
+
+    series = inventory_history() if args.series == 'inventory' else token_history()
+    if args.command == 'latest':
+        snap = series.latest()
+        print(f"{_iso(snap.ts)} {snap}" if snap else "No snapshots yet.")
+    elif args.command == 'range':
+        for snap in series.range(args.since, args.until):
+            print(f"{_iso(snap.ts)} USD={snap.usd:.2f} ETH={snap.eth:.6f} ETH/USD={snap.eth_usd:.2f}")
+    else:
+        for c in series.rollup(args.bucket, args.field, args.since, args.until):
+            print(f"{_iso(c.start)} O={c.open:.6f} H={c.high:.6f} L={c.low:.6f} C={c.close:.6f} n={c.count}")
@@ -0,0 +1,65 @@
+# order_journal.py
+#
+# Append-only NDJSON journal of priced order rows. GetOrderPrices appends each
+# result the moment it completes, so a crash or Ctrl-C loses at most the rows
+# still in flight; `--resume` then skips everything already journaled.
+# Each record's ts is when its price was obtained (a row carried over from an
+# earlier run keeps its original time), so the next incremental run can tell
+# how old a price it would reuse is; a record is reused for as long as the
+# price cache would serve that skin (pe_price_cache.ttl_for).
+import json
+import os
+import threading
+import time
+
+from pe_price_cache import ttl_for
+
+JOURNAL_FILE = 'BuyOrders.journal'
+
+FIELDS = ['Skin', 'Diff', 'Action', 'PriceUSD', 'RecommendedMarket', 'RecommendedMarketPrice']
+
+class OrderJournal:
+    def __init__(self, path=JOURNAL_FILE, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self._f = open(path, 'a', encoding='utf-8')
+
+    def append(self, row):
+        rec = {k: row.get(k, '') for k in FIELDS}
+        rec['ts'] = row.get('ts') or time.time()  # when the price was obtained
+        line = json.dumps(rec, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_journal(path=JOURNAL_FILE):
+    """Latest journaled record per skin. A torn last line from a crash is ignored."""
+    latest = {}
+    if not os.path.exists(path):
+        return latest
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            latest[rec['Skin']] = rec
+    return latest
+
+def completed(records, now=None):
+    """Skins whose journaled result has a price still within its class TTL."""
+    now = now or time.time()
+    return {skin: rec for skin, rec in records.items()
+            if rec.get('PriceUSD') and now - rec.get('ts', 0) <= ttl_for(skin)}
@@ -0,0 +1,141 @@
+# order_queue.py
+#
+# Shared work queue for GetOrderPrices, kept in one SQLite file (WAL mode) so
+# any number of worker processes - on this box or on others that mount the
+# same volume - can drain one OrderLog between them. Workers claim small
+# batches under a lease; a fast worker simply comes back for more, and rows
+# held by a worker that died are taken over by the others once the lease runs
+# out. Each finished row is recorded the moment it completes, so the queue is
+# also the run's journal.
+#
+#   python order_queue.py status [FILE]
+import json
+import os
+import sys
+import threading
+import time
+
+from order_journal import FIELDS
+from sqlite_util import Txn, connect
+
+# ---- CONFIG ----
+QUEUE_DB      = os.getenv('ORDER_QUEUE', 'OrderQueue.db')
+LEASE_SECONDS = 900    # a claimed row goes back to the pool if not finished by then
+MAX_CLAIMS    = 3      # rows that outlive this many leases are given up on
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,  -- keeps OrderLog order
+    skin         TEXT NOT NULL UNIQUE,
+    row          TEXT NOT NULL,                      -- JSON of the OrderLog row
+    state        TEXT NOT NULL DEFAULT 'todo',       -- todo | taken | done
+    worker       TEXT,
+    lease_until  REAL,
+    claims       INTEGER NOT NULL DEFAULT 0,
+    result       TEXT                                -- JSON of the priced row
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+"""
+
+def worker_name():
+    import socket
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class OrderQueue:
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path, timeout=60)
+        return conn
+
+    def _write(self):
+        return Txn(self._conn())
+
+    def fill(self, rows):
+        """Replace the queue's contents with `rows` (one job per skin). Returns the job count."""
+        with self._write() as conn:
+            conn.execute('DELETE FROM jobs')
+            conn.executemany('INSERT OR IGNORE INTO jobs (skin, row) VALUES (?, ?)',
+                             ((r['Skin'], json.dumps(r, ensure_ascii=False)) for r in rows))
+            return conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+    def claim(self, worker, n, lease=LEASE_SECONDS, now=None):
+        """
+        Up to `n` rows for `worker`: untouched ones first, then ones whose
+        lease has expired. Returns the OrderLog rows.
+        """
+        now = now or time.time()
+        with self._write() as conn:
+            picked = conn.execute(
+                "SELECT id, row FROM jobs WHERE state = 'todo' "
+                "OR (state = 'taken' AND lease_until < ? AND claims < ?) "
+                "ORDER BY state = 'taken', id LIMIT ?", (now, MAX_CLAIMS, n)).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET state = 'taken', worker = ?, lease_until = ?, claims = claims + 1 "
+                "WHERE id = ?", ((worker, now + lease, i) for i, _ in picked))
+        return [json.loads(row) for _, row in picked]
+
+    def complete(self, row):
+        """Record a finished row (priced or not); a late duplicate just overwrites it."""
+        rec = {k: row.get(k, '') for k in FIELDS}
+        rec['ts'] = row.get('ts') or time.time()
+        with self._write() as conn:
+            conn.execute("UPDATE jobs SET state = 'done', lease_until = NULL, result = ? WHERE skin = ?",
+                         (json.dumps(rec, ensure_ascii=False), row['Skin']))
+
+    def release(self, worker):
+        """Hand `worker`'s unfinished rows back, e.g. on Ctrl-C."""
+        with self._write() as conn:
+            return conn.execute("UPDATE jobs SET state = 'todo', lease_until = NULL, "
+                                "claims = MAX(claims - 1, 0) "
+                                "WHERE state = 'taken' AND worker = ?", (worker,)).rowcount
+
+    def outstanding(self, now=None):
+        """Rows not yet done that some worker still can (or will be able to) finish."""
+        now = now or time.time()
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'todo' "
+            "OR (state = 'taken' AND (lease_until >= ? OR claims < ?))", (now, MAX_CLAIMS)).fetchone()[0]
+
+    def counts(self):
+        """{'todo': n, 'taken': n, 'done': n}"""
+        counts = dict.fromkeys(('todo', 'taken', 'done'), 0)
+        counts.update(self._conn().execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+        return counts
+
+    def workers(self):
+        """{worker: rows it currently holds}"""
+        return dict(self._conn().execute(
+            "SELECT worker, COUNT(*) FROM jobs WHERE state = 'taken' GROUP BY worker"))
+
+    def skins(self):
+        """Every queued skin, in OrderLog order."""
+        return [s for (s,) in self._conn().execute('SELECT skin FROM jobs ORDER BY id')]
+
+    def results(self):
+        """Finished records keyed by skin, shaped like read_journal()'s."""
+        return {skin: json.loads(res) for skin, res in self._conn().execute(
+            "SELECT skin, result FROM jobs WHERE state = 'done' ORDER BY id")}
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+if __name__ == '__main__':
+    cmd = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    q = OrderQueue(sys.argv[2] if len(sys.argv) > 2 else QUEUE_DB)
+    if cmd == 'status':
+        c = q.counts()
+        print(f"[QUEUE] {c['done']} done, {c['taken']} in progress, {c['todo']} waiting")
+        for worker, n in q.workers().items():
+            print(f"[QUEUE]   {worker}: {n} rows")
+    else:
+        print("usage: python order_queue.py status [FILE]")
+        sys.exit(1)
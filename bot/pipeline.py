@@ -0,0 +1,153 @@
+# pipeline.py
+#
+# Small in-process DAG runner. Each stage declares the files it reads and
+# writes; a stage is skipped when the content hash of every input matches the
+# last successful run and its outputs are still the ones it produced. A stage
+# whose result goes stale with time (prices) also declares a max_age and
+# reruns once its last run is older than that, inputs changed or not. Inputs
+# that aren't plain files (a database's latest write, say) are declared as
+# stamps: named callables whose values are compared like file hashes.
+# Results of stages that did run are handed to later stages in memory.
+import glob
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+STATE_FILE = '.pipeline_state.json'
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class Stage:
+    """
+    name    : key for state and for the in-memory result handed downstream
+    inputs  : glob patterns and/or callables returning a list of paths
+    outputs : paths this stage writes
+    run     : fn(ctx) -> result, where ctx maps stage names to results of
+              upstream stages that ran in this invocation
+    max_age : seconds after which the last run's result is stale anyway
+    stamps  : {name: fn() -> JSON-able value} for inputs that aren't files
+    """
+
+    def __init__(self, name, inputs, outputs, run, max_age=None, stamps=None):
+        self.name = name
+        self.inputs = inputs
+        self.outputs = outputs
+        self.run = run
+        self.max_age = max_age
+        self.stamps = stamps or {}
+
+    def input_paths(self):
+        paths = set()
+        for spec in self.inputs:
+            if callable(spec):
+                paths.update(spec())
+            elif glob.has_magic(spec):
+                paths.update(glob.glob(spec))
+            else:
+                paths.add(spec)
+        return sorted(os.path.normpath(p) for p in paths)
+
+def _hash_paths(paths):
+    return {p: file_hash(p) if os.path.exists(p) else None for p in paths}
+
+def _fingerprint(stage):
+    """Input hashes plus stamp values: what has to match the last run to skip it."""
+    fp = _hash_paths(stage.input_paths())
+    for name, fn in stage.stamps.items():
+        fp[f"stamp:{name}"] = fn()
+    return fp
+
+def topo_order(stages):
+    """Order stages so that every stage comes after the ones producing its inputs."""
+    producers = {}
+    for s in stages:
+        for out in s.outputs:
+            producers[os.path.normpath(out)] = s.name
+    deps = {s.name: {producers[p] for p in s.input_paths() if p in producers} - {s.name}
+            for s in stages}
+
+    ordered, done = [], set()
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if deps[s.name] <= done]
+        if not ready:
+            raise ValueError(f"Cycle between stages: {[s.name for s in remaining]}")
+        for s in ready:
+            ordered.append(s)
+            done.add(s.name)
+        remaining = [s for s in remaining if s.name not in done]
+    return ordered
+
+class Pipeline:
+    def __init__(self, stages, state_file=STATE_FILE):
+        self.stages = stages
+        self.state_file = state_file
+        self.state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    def is_expired(self, stage, now=None):
+        """True if the stage has a max_age and its last run is older than that."""
+        prev = self.state.get(stage.name)
+        if stage.max_age is None or not prev or 'ran_at' not in prev:
+            return False
+        now = now or datetime.now(timezone.utc)
+        return (now - datetime.fromisoformat(prev['ran_at'])).total_seconds() > stage.max_age
+
+    def is_up_to_date(self, stage, in_hashes):
+        prev = self.state.get(stage.name)
+        if not prev or prev.get('inputs') != in_hashes or self.is_expired(stage):
+            return False
+        out_hashes = _hash_paths(os.path.normpath(p) for p in stage.outputs)
+        return None not in out_hashes.values() and prev.get('outputs') == out_hashes
+
+    def run(self, force=False):
+        """Run stale stages in dependency order; returns {stage: seconds or None if skipped}."""
+        ctx = {}
+        timings = {}
+        for stage in topo_order(self.stages):
+            in_hashes = _fingerprint(stage)
+            if not force and self.is_up_to_date(stage, in_hashes):
+                print(f"\n==== {stage.name}: inputs unchanged, skipping ====")
+                timings[stage.name] = None
+                continue
+
+            if not force and self.is_expired(stage):
+                print(f"\n==== {stage.name}: last run older than {stage.max_age / 3600:g}h ====")
+            print(f"\n==== Running: {stage.name} ====")
+            t0 = time.perf_counter()
+            ctx[stage.name] = stage.run(ctx)
+            elapsed = time.perf_counter() - t0
+            timings[stage.name] = elapsed
+
+            self.state[stage.name] = {
+                'inputs': in_hashes,
+                'outputs': _hash_paths(os.path.normpath(p) for p in stage.outputs),
+                'seconds': round(elapsed, 3),
+                'ran_at': datetime.now(timezone.utc).isoformat(),
+            }
+            self._save_state()
+        return timings
+
+def print_timings(timings):
+    print("\n==== Stage timings ====")
+    for name, secs in timings.items():
+        print(f"  {name:<20} {'skipped' if secs is None else f'{secs:8.2f}s'}")
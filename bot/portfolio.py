@@ -0,0 +1,418 @@
+# portfolio.py
+#
+# One in-memory model of the book shared by the bot scripts. Rows loaded from
+# the inventory store / Inventory.csv, the combined manifest and the order
+# files are parsed once into columns:
+#
+#   skins    : interned market_hash_names, with a name → row index dict
+#   qty      : int64 quantities
+#   cents    : int64 prices in cents (UNPRICED = 0 when unknown or not positive)
+#   updated  : float64 unix timestamps (NaN unknown, NEVER = -inf)
+#   weight   : float64 manifest weights
+#
+# Totals, diffs and sorts run over the arrays, so nothing re-parses a
+# '$1,234.56' string twice. There is no numpy here, so the vector ops are bulk
+# passes of builtins over the columns (sum(map(mul, ...)), compress, sorted
+# keyed on a column) that iterate in C; since an unknown price is 0, sums and
+# filters need no per-row test. Sorting and the stale scan (one comprehension
+# over the zipped columns) are only on par with a dict per row; `python
+# portfolio.py` times every op against that and fails if one is slower.
+# Holding is a __slots__ view of one row; it also answers row['Skin'] /
+# row['Price'] / row['LastUpdated'] like the old CSV dicts.
+#
+#   python portfolio.py              # load / value / sort benchmark, 100k SKUs
+import csv
+import math
+import sys
+from array import array
+from itertools import compress, count, repeat
+from operator import eq, mul, ne, not_, or_, truediv
+from datetime import datetime, timezone
+
+UNPRICED = 0
+NEVER = float('-inf')
+BENCH_NOISE = 0.15  # bench(): columnar ops may not be slower than dict rows by more than this
+
+def parse_cents(s):
+    """'$1,234.56' / '12.3' / 4.5 -> integer cents; None if it isn't a price."""
+    if s is None:
+        return None
+    if isinstance(s, (int, float)):
+        return int(round(s * 100)) if s == s else None
+    s = s.strip().replace('$', '').replace(',', '')
+    if not s:
+        return None
+    try:
+        return int(round(float(s) * 100))
+    except ValueError:
+        return None
+
+def parse_timestamp(s):
+    """LastUpdated string -> unix seconds; NEVER for 'NEVER', NaN if unparseable."""
+    s = (s or '').strip()
+    if not s:
+        return math.nan
+    if s.upper() == 'NEVER':
+        return NEVER
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return math.nan
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def format_timestamp(ts):
+    if ts == NEVER:
+        return 'NEVER'
+    if ts != ts:
+        return ''
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+class Holding:
+    """View of one portfolio row; reads and writes go straight to the columns."""
+    __slots__ = ('_pf', '_i')
+
+    def __init__(self, pf, i):
+        self._pf = pf
+        self._i = i
+
+    @property
+    def skin(self):
+        return self._pf.skins[self._i]
+
+    @property
+    def qty(self):
+        return self._pf.qty[self._i]
+
+    @qty.setter
+    def qty(self, value):
+        self._pf.qty[self._i] = int(value)
+
+    @property
+    def cents(self):
+        return self._pf.cents[self._i]
+
+    @property
+    def priced(self):
+        return self._pf.cents[self._i] > 0
+
+    @property
+    def usd(self):
+        c = self._pf.cents[self._i]
+        return c / 100 if c > 0 else 0.0
+
+    @property
+    def value_usd(self):
+        c = self._pf.cents[self._i]
+        return self._pf.qty[self._i] * c / 100 if c > 0 else 0.0
+
+    @property
+    def weight(self):
+        return self._pf.weight[self._i]
+
+    @property
+    def updated(self):
+        """Last price update as unix seconds; NaN if unknown, NEVER if pinned."""
+        return self._pf.updated[self._i]
+
+    @property
+    def never(self):
+        return self._pf.updated[self._i] == NEVER
+
+    @property
+    def last_updated(self):
+        """Last price update as an aware datetime, or None."""
+        ts = self._pf.updated[self._i]
+        if ts != ts or ts == NEVER:
+            return None
+        return datetime.fromtimestamp(ts, timezone.utc)
+
+    def set_price(self, price, when=None):
+        """Set the price ('$1.23', 1.23 or cents via int) and, optionally, its timestamp."""
+        cents = price if isinstance(price, int) else parse_cents(price)
+        self._pf.cents[self._i] = max(cents or UNPRICED, UNPRICED)
+        if when is not None:
+            self._pf.updated[self._i] = when.timestamp() if isinstance(when, datetime) else float(when)
+        return self.usd
+
+    # CSV-row compatibility
+    def __getitem__(self, key):
+        if key == 'Skin':
+            return self.skin
+        if key == 'QTY':
+            return str(self.qty)
+        if key == 'Price':
+            c = self._pf.cents[self._i]
+            return f"{c / 100:.2f}" if c > UNPRICED else ''
+        if key == 'LastUpdated':
+            return format_timestamp(self._pf.updated[self._i])
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'QTY':
+            self.qty = value
+        elif key == 'Price':
+            self.set_price(value)
+        elif key == 'LastUpdated':
+            self._pf.updated[self._i] = parse_timestamp(value)
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def as_row(self):
+        return {k: self[k] for k in ('Skin', 'QTY', 'Price', 'LastUpdated')}
+
+    def __repr__(self):
+        return f"Holding({self.skin!r}, qty={self.qty}, usd={self.usd:.2f})"
+
+class Portfolio:
+    def __init__(self):
+        self.skins = []
+        self.index = {}
+        self.qty = array('q')
+        self.cents = array('q')
+        self.updated = array('d')
+        self.weight = array('d')
+
+    # ---- building ----
+    def add(self, skin, qty=0, price=None, updated=math.nan, weight=0.0):
+        """Row index of `skin`, appending a row if it is new (existing rows are left as they are)."""
+        i = self.index.get(skin)
+        if i is None:
+            skin = sys.intern(skin)
+            i = self.index[skin] = len(self.skins)
+            self.skins.append(skin)
+            cents = parse_cents(price)
+            self.qty.append(int(qty))
+            self.cents.append(max(cents or UNPRICED, UNPRICED))
+            self.updated.append(updated)
+            self.weight.append(weight)
+        return i
+
+    @classmethod
+    def from_rows(cls, rows):
+        """From CSV-shaped dicts (Skin, QTY, Price, LastUpdated)."""
+        pf = cls()
+        stamps = {}  # a refresh stamps many rows with the same LastUpdated
+        for r in rows:
+            skin = r.get('Skin')
+            if skin:
+                last = r.get('LastUpdated')
+                ts = stamps.get(last)
+                if ts is None:
+                    ts = stamps[last] = parse_timestamp(last)
+                pf.add(skin, int(r.get('QTY') or 0), r.get('Price'), ts)
+        return pf
+
+    @classmethod
+    def from_store(cls, store):
+        return cls.from_rows(store.rows())
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_rows(csv.DictReader(f))
+
+    @classmethod
+    def from_orders(cls, rows, price_field='RecommendedMarketPrice'):
+        """
+        Order rows (OrderLog / BuyOrders): qty is Diff, price is `price_field`.
+        Row i of the portfolio is rows[i], so argsort() indexes `rows`; a skin
+        listed twice would break that and raises ValueError.
+        """
+        pf = cls()
+        for r in rows:
+            if r['Skin'] in pf.index:
+                raise ValueError(f"duplicate order row for {r['Skin']!r}")
+            pf.add(r['Skin'], int(r.get('Diff') or 0), r.get(price_field))
+        return pf
+
+    def set_weights(self, weights):
+        """Manifest {skin: weight}; skins not held yet are added with qty 0."""
+        for skin, w in weights.items():
+            self.weight[self.add(skin)] = w
+
+    def load_manifest(self, path):
+        with open(path, encoding='utf-8') as f:
+            self.set_weights({r['Skin']: float(r['TotalWeighting']) for r in csv.DictReader(f)})
+
+    # ---- access ----
+    def __len__(self):
+        return len(self.skins)
+
+    def __contains__(self, skin):
+        return skin in self.index
+
+    def __iter__(self):
+        return (Holding(self, i) for i in range(len(self.skins)))
+
+    def __getitem__(self, key):
+        """Holding by row index or skin name."""
+        return Holding(self, key if isinstance(key, int) else self.index[key])
+
+    def get(self, skin):
+        i = self.index.get(skin)
+        return Holding(self, i) if i is not None else None
+
+    def quantities(self):
+        """{skin: qty} for rows with a non-zero quantity."""
+        return dict(compress(zip(self.skins, self.qty), self.qty))
+
+    def prices(self):
+        """{skin: USD} for priced rows."""
+        return dict(compress(zip(self.skins, map(truediv, self.cents, repeat(100))), self.cents))
+
+    def weights(self):
+        return dict(compress(zip(self.skins, self.weight), self.weight))
+
+    # ---- vector ops ----
+    def values_cents(self):
+        """qty x price per row, in cents (0 for unpriced rows)."""
+        return array('q', map(mul, self.qty, self.cents))
+
+    def total_cents(self):
+        return sum(map(mul, self.qty, self.cents))
+
+    def total_usd(self):
+        return self.total_cents() / 100
+
+    def argsort(self, key='price', reverse=False):
+        """
+        Row indices ordered by 'price', 'value', 'qty', 'updated' or 'skin';
+        unpriced rows (and unknown timestamps) sort last either way.
+        """
+        rows = range(len(self.skins))
+        if key == 'skin':
+            return sorted(rows, key=self.skins.__getitem__, reverse=reverse)
+        if key in ('price', 'value'):
+            col = self.cents if key == 'price' else self.values_cents()
+            has = self.cents
+        elif key == 'qty':
+            return sorted(rows, key=list(self.qty).__getitem__, reverse=reverse)
+        elif key == 'updated':
+            col = self.updated
+            has = list(map(eq, col, col))  # False only for NaN
+        else:
+            raise ValueError(f"unknown sort key {key!r}")
+        # a list's items are already int/float objects; an array boxes one per key lookup
+        keyed = sorted(compress(rows, has), key=list(col).__getitem__, reverse=reverse)
+        if len(keyed) < len(rows):
+            keyed += compress(rows, map(not_, has))
+        return keyed
+
+    def stale(self, now, max_age):
+        """Row indices whose price is missing or older than `max_age` seconds (NEVER rows excluded)."""
+        cutoff = now - max_age
+        # "not t >= cutoff" is also true for NaN (unknown) timestamps
+        return [i for i, t, c in zip(count(), self.updated, self.cents)
+                if t != NEVER and (not t >= cutoff or not c)]
+
+    def diff(self, target):
+        """
+        [(skin, current, target, diff)] for every skin whose quantity differs
+        from `target` (a Portfolio or {skin: qty}); skins missing on either
+        side count as 0.
+        """
+        want = target.quantities() if isinstance(target, Portfolio) else target
+        out = []
+        for skin, q in zip(self.skins, self.qty):
+            t = want.get(skin, 0)
+            if t != q:
+                out.append((skin, q, t, t - q))
+        for skin, t in want.items():
+            if t and skin not in self.index:
+                out.append((skin, 0, t, t))
+        return out
+
+    def snapshot(self):
+        """Copy of the price and timestamp columns, for changed_since()."""
+        return array('q', self.cents), array('d', self.updated)
+
+    def changed_since(self, snap):
+        """Row indices whose price or timestamp differs from `snap` (new rows included)."""
+        cents, updated = snap
+        n = len(cents)
+        # timestamps are compared bit for bit, so NaN == NaN
+        now_bits, old_bits = array('q', self.updated[:n].tobytes()), array('q', updated.tobytes())
+        changed = map(or_, map(ne, self.cents, cents), map(ne, now_bits, old_bits))
+        return list(compress(range(n), changed)) + list(range(n, len(self.skins)))
+
+    def to_rows(self):
+        return [h.as_row() for h in self]
+
+def bench(n=100_000, seed=0):
+    import gc
+    import random
+    import time
+    import tracemalloc
+    rng = random.Random(seed)
+    now = time.time()
+    rows = [{'Skin': f"Skin {i:06d} | Bench (Field-Tested)", 'QTY': str(rng.randint(1, 9)),
+             'Price': f"${rng.lognormvariate(1, 1.5):,.2f}",
+             'LastUpdated': format_timestamp(now - rng.randint(0, 3 * 86400))}
+            for i in range(n)]
+
+    t0 = time.perf_counter()
+    pf = Portfolio.from_rows(rows)
+    t_load = time.perf_counter() - t0
+    tracemalloc.start()
+    Portfolio.from_rows(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    def best_of(fns, repeat=9):
+        # interleaved best of `repeat` per fn, with the collector off as timeit
+        # does, so a GC pass over the 100k dicts doesn't land on one side
+        times = [[] for _ in fns]
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                for fn, ts in zip(fns, times):
+                    t0 = time.perf_counter()
+                    out = fn()
+                    ts.append(time.perf_counter() - t0)
+        finally:
+            gc.enable()
+        return [min(ts) for ts in times]
+
+    # the same ops over a dict per row (prices and timestamps already parsed)
+    dicts = [{'skin': s, 'qty': q, 'cents': c, 'updated': t}
+             for s, q, c, t in zip(pf.skins, pf.qty, pf.cents, pf.updated)]
+    cutoff = now - 86400
+    ops = [
+        ('total', pf.total_cents,
+         lambda: sum(r['qty'] * r['cents'] for r in dicts if r['cents'] > 0)),
+        ('price sort', lambda: pf.argsort('price'),
+         lambda: sorted((r for r in dicts if r['cents'] > 0), key=lambda r: r['cents'])
+                 + [r for r in dicts if r['cents'] <= 0]),
+        ('stale scan', lambda: pf.stale(now, 86400),
+         lambda: [r for r in dicts if r['updated'] != NEVER
+                  and (r['updated'] != r['updated'] or r['updated'] < cutoff or r['cents'] <= 0)]),
+        ('prices', pf.prices,
+         lambda: {r['skin']: r['cents'] / 100 for r in dicts if r['cents'] > 0}),
+    ]
+    print(f"{n} SKUs: load {t_load*1000:.0f} ms (peak {peak / 2**20:.1f} MB)")
+    print(f"  {'op':<12} {'columns':>9} {'dict rows':>10}")
+    slower = []
+    for name, col_fn, dict_fn in ops:
+        col_out, dict_out = col_fn(), dict_fn()
+        assert col_out == dict_out if name == 'total' else len(col_out) == len(dict_out), name
+        t_col, t_dict = best_of([col_fn, dict_fn])
+        print(f"  {name:<12} {t_col*1000:7.1f}ms {t_dict*1000:8.1f}ms  x{t_dict / t_col:.1f}")
+        if t_col > t_dict * (1 + BENCH_NOISE):
+            slower.append(name)
+    order = pf.argsort('price')
+    priced = [pf.cents[i] for i in order if pf.cents[i] > 0]
+    assert priced == sorted(priced)
+    if slower:
+        print(f"[BENCH] columnar ops slower than dict rows: {', '.join(slower)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    bench()
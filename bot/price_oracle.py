@@ -0,0 +1,255 @@
+# price_oracle.py
+#
+# First-tier price lookups from the Skinport bulk snapshot (skinport_cache.json).
+# The ~2 MB JSON is compiled once into a compact binary index next to it:
+#
+#   header  : magic, item count, source size, source mtime
+#   arrays  : usd cents (int32), eur cents (int32), in name order
+#   names   : '\n'-joined UTF-8 market_hash_names
+#
+# Loading the index is a couple of bulk reads plus one dict build, so startup
+# and lookups stay in the millisecond range instead of a full json.load.
+#
+# Freshness comes from a sidecar (skinport_cache.fetched) written by whatever
+# fetches the snapshot, never from the file's mtime: a git checkout or pull
+# touches the JSON without making its prices any newer. The sidecar records
+# the snapshot's size and CRC, so it only vouches for the file it was written
+# for; with no matching sidecar the snapshot's age is unknown and it is
+# treated as stale.
+#
+#   python price_oracle.py --mark-fetched      # after downloading a new snapshot
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+SNAPSHOT_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skinport_cache.json')
+MAX_AGE       = 24 * 3600   # snapshot older than this is treated as stale
+
+_MAGIC  = b'SPIDX001'
+_HEADER = struct.Struct('<8sIQd')
+_NO_PRICE = -1
+
+def _to_cents(v):
+    if v is None:
+        return _NO_PRICE
+    return int(round(float(v) * 100))
+
+def index_path_for(json_path):
+    return os.path.splitext(json_path)[0] + '.idx'
+
+def fetched_path_for(json_path):
+    return os.path.splitext(json_path)[0] + '.fetched'
+
+def _crc32(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+def mark_fetched(json_path=SNAPSHOT_JSON, fetched_at=None):
+    """Record that the snapshot now at `json_path` was fetched at `fetched_at` (default: now)."""
+    meta = {'fetched_at': fetched_at or time.time(),
+            'size': os.path.getsize(json_path), 'crc32': _crc32(json_path)}
+    path = fetched_path_for(json_path)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+    return meta['fetched_at']
+
+def fetched_at(json_path=SNAPSHOT_JSON):
+    """When the snapshot at `json_path` was fetched, or None if no sidecar vouches for it."""
+    try:
+        with open(fetched_path_for(json_path), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['size'] != os.path.getsize(json_path) or meta['crc32'] != _crc32(json_path):
+            return None
+        return float(meta['fetched_at'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def build_index(json_path, idx_path=None):
+    """Compile the JSON snapshot into the binary index; returns the index path."""
+    idx_path = idx_path or index_path_for(json_path)
+    st = os.stat(json_path)
+    with open(json_path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    names = sorted(data)
+    usd = array('i', (_to_cents(data[n].get('usd')) for n in names))
+    eur = array('i', (_to_cents(data[n].get('eur')) for n in names))
+    if sys.byteorder != 'little':
+        usd.byteswap()
+        eur.byteswap()
+
+    tmp = idx_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(names), st.st_size, st.st_mtime))
+        f.write(usd.tobytes())
+        f.write(eur.tobytes())
+        f.write('\n'.join(names).encode('utf-8'))
+    os.replace(tmp, idx_path)
+    return idx_path
+
+class PriceOracle:
+    """O(1) name → price lookups over an integer-cent snapshot."""
+
+    def __init__(self, names, usd_cents, eur_cents, snapshot_time=None):
+        self.names = names
+        self.usd_cents = usd_cents
+        self.eur_cents = eur_cents
+        self.snapshot_time = snapshot_time  # fetch time; None when unknown
+        self._pos = {n: i for i, n in enumerate(names)}
+
+    @classmethod
+    def load(cls, json_path=SNAPSHOT_JSON):
+        """Load the snapshot, (re)building the binary index if it is missing or out of date."""
+        idx_path = index_path_for(json_path)
+        st = os.stat(json_path)
+        oracle = cls._read_index(idx_path, st)
+        if oracle is None:
+            build_index(json_path, idx_path)
+            oracle = cls._read_index(idx_path, st)
+        oracle.snapshot_time = fetched_at(json_path)
+        return oracle
+
+    @classmethod
+    def _read_index(cls, idx_path, src_stat):
+        try:
+            with open(idx_path, 'rb') as f:
+                blob = f.read()
+        except OSError:
+            return None
+        if len(blob) < _HEADER.size:
+            return None
+        magic, count, src_size, src_mtime = _HEADER.unpack_from(blob)
+        if magic != _MAGIC or src_size != src_stat.st_size or src_mtime != src_stat.st_mtime:
+            return None
+
+        off = _HEADER.size
+        width = 4 * count
+        usd = array('i')
+        usd.frombytes(blob[off:off + width])
+        eur = array('i')
+        eur.frombytes(blob[off + width:off + 2 * width])
+        if sys.byteorder != 'little':
+            usd.byteswap()
+            eur.byteswap()
+        names = blob[off + 2 * width:].decode('utf-8').split('\n') if count else []
+        return cls(names, usd, eur)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._pos
+
+    def age(self, now=None):
+        """Seconds since the snapshot was fetched; infinite when that isn't known."""
+        if self.snapshot_time is None:
+            return float('inf')
+        return (now or time.time()) - self.snapshot_time
+
+    def is_stale(self, max_age=MAX_AGE, now=None):
+        return self.age(now) > max_age
+
+    def lookup_cents(self, name, currency='usd'):
+        i = self._pos.get(name)
+        if i is None:
+            return None
+        cents = (self.usd_cents if currency == 'usd' else self.eur_cents)[i]
+        return None if cents == _NO_PRICE else cents
+
+    def lookup(self, name, currency='usd'):
+        """Price in dollars (or euros), or None if the snapshot has no price."""
+        cents = self.lookup_cents(name, currency)
+        return None if cents is None else cents / 100
+
+    def lookup_many(self, names, currency='usd'):
+        """{name: price} for every requested name the snapshot knows about."""
+        pos = self._pos
+        col = self.usd_cents if currency == 'usd' else self.eur_cents
+        found = {}
+        for n in names:
+            i = pos.get(n)
+            if i is not None:
+                cents = col[i]
+                if cents != _NO_PRICE:
+                    found[n] = cents / 100
+        return found
+
+def load_fresh_oracle(json_path=SNAPSHOT_JSON, max_age=MAX_AGE):
+    """The oracle if a snapshot exists and is recent enough to trust, else None."""
+    if not os.path.exists(json_path):
+        return None
+    try:
+        oracle = PriceOracle.load(json_path)
+    except Exception as e:
+        print(f"[ORACLE] Could not load {json_path}: {e}")
+        return None
+    if oracle.snapshot_time is None:
+        print(f"[ORACLE] No fetch time recorded for {json_path} "
+              f"(python price_oracle.py --mark-fetched), not using it.")
+        return None
+    if oracle.is_stale(max_age):
+        print(f"[ORACLE] Snapshot is {oracle.age()/3600:.1f}h old, not using it.")
+        return None
+    return oracle
+
+def _bench(json_path):
+    import tracemalloc
+
+    def measure(fn):
+        # time and memory in separate runs; tracemalloc skews timings badly
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, dt, peak
+
+    def json_lookup():
+        with open(json_path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data, {n: data[n]['usd'] for n in data}
+
+    (data, _), t_json, m_json = measure(json_lookup)
+    names = list(data)
+    build_index(json_path)
+    oracle, t_load, m_load = measure(lambda: PriceOracle.load(json_path))
+    _, t_many, _ = measure(lambda: oracle.lookup_many(names))
+
+    print(f"{len(names)} items")
+    print(f"json.load + lookups : {t_json*1000:8.1f} ms, peak {m_json/1e6:6.1f} MB")
+    print(f"index load          : {t_load*1000:8.1f} ms, peak {m_load/1e6:6.1f} MB")
+    print(f"lookup_many(all)    : {t_many*1000:8.1f} ms")
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('names', nargs='*', help='market_hash_names to look up')
+    parser.add_argument('--json', default=SNAPSHOT_JSON, help='Snapshot to index')
+    parser.add_argument('--build', action='store_true', help='Rebuild the binary index and exit')
+    parser.add_argument('--bench', action='store_true', help='Compare load time/memory with json.load')
+    parser.add_argument('--mark-fetched', action='store_true',
+                        help='Record the snapshot as fetched now (run after downloading it)')
+    args = parser.parse_args()
+
+    if args.mark_fetched:
+        mark_fetched(args.json)
+        print(f"Wrote {fetched_path_for(args.json)}")
+    elif args.build:
+        print(f"Wrote {build_index(args.json)}")
+    elif args.bench:
+        _bench(args.json)
+    else:
+        oracle = PriceOracle.load(args.json)
+        for name in args.names:
+            print(f"{name}: {oracle.lookup(name)}")
@@ -0,0 +1,170 @@
+# rebalance.py
+#
+# Turns manifest weights, current holdings and prices into integer target
+# quantities. The target value of skin i is budget * w_i; we pick integer
+# quantities (multiples of each skin's lot size) that minimise the tracking
+# error  sum_i (q_i * p_i - budget * w_i)^2  without spending more than the
+# budget:
+#
+#   1. floor every skin to the largest whole lot at or below its target value
+#   2. spend what is left one lot at a time on the skin whose extra lot
+#      reduces the error most (a heap keyed on the change in squared error)
+#
+# Step 1 is a single pass over flat arrays; step 2 only touches skins that are
+# still below target, so a 10k-SKU solve stays in the millisecond range. After
+# set_price()/set_holding() only that skin's floor is recomputed before the
+# (cheap) fill step runs again.
+import heapq
+
+DEFAULT_LOT = 1
+
+class RebalanceSolver:
+    def __init__(self, weights, prices, holdings=None, budget=None, lots=None):
+        """
+        weights  : {skin: manifest weight} (normalised internally)
+        prices   : {skin: USD price}; skins without a price can't be sized
+        holdings : {skin: current qty}
+        budget   : total USD to allocate (default: current value of holdings)
+        lots     : {skin: minimum lot size} (default DEFAULT_LOT)
+        """
+        holdings = holdings or {}
+        lots = lots or {}
+        self.skins = list(weights)
+        self.index = {s: i for i, s in enumerate(self.skins)}
+        total_w = sum(weights.values()) or 1.0
+        self.w = [weights[s] / total_w for s in self.skins]
+        self.p = [float(prices.get(s) or 0.0) for s in self.skins]
+        self.lot = [max(int(lots.get(s, DEFAULT_LOT)), 1) for s in self.skins]
+        self.holdings = dict(holdings)
+        if budget is None:
+            budget = sum(q * float(prices.get(s) or 0.0) for s, q in holdings.items())
+        self.budget = float(budget)
+        self._floor_all()
+
+    # ---- step 1: floors ----
+    def _floor_one(self, i):
+        p, lot = self.p[i], self.lot[i]
+        if p <= 0:
+            return 0
+        return int(self.budget * self.w[i] // (p * lot)) * lot
+
+    def _floor_all(self):
+        self.base = [self._floor_one(i) for i in range(len(self.skins))]
+        self.base_cost = sum(q * p for q, p in zip(self.base, self.p))
+        self._solved = None
+
+    # ---- step 2: greedy fill ----
+    def solve(self):
+        """{skin: target qty} for every priced skin in the manifest."""
+        if self._solved is not None:
+            return self._solved
+        budget, w, p, lot = self.budget, self.w, self.p, self.lot
+        q = list(self.base)
+        remaining = budget - self.base_cost
+
+        heap = []
+        for i, qi in enumerate(q):
+            if p[i] > 0:
+                step = p[i] * lot[i]
+                gain = step * (2 * (qi * p[i] - budget * w[i]) + step)
+                if gain < 0:
+                    heap.append((gain, i))
+        heapq.heapify(heap)
+
+        while heap and remaining > 0:
+            gain, i = heapq.heappop(heap)
+            step = p[i] * lot[i]
+            if step > remaining:
+                continue  # remaining only shrinks, so this skin can never fit
+            q[i] += lot[i]
+            remaining -= step
+            gain = step * (2 * (q[i] * p[i] - budget * w[i]) + step)
+            if gain < 0:
+                heapq.heappush(heap, (gain, i))
+
+        self._solved = {s: q[i] for i, s in enumerate(self.skins) if p[i] > 0}
+        self.spent = budget - remaining
+        return self._solved
+
+    def tracking_error(self):
+        """Root-mean-square gap between held-at-target value weights and manifest weights."""
+        targets = self.solve()
+        if not self.budget:
+            return 0.0
+        err = 0.0
+        for s, i in self.index.items():
+            v = targets.get(s, 0) * self.p[i]
+            err += (v / self.budget - self.w[i]) ** 2
+        return (err / max(len(self.skins), 1)) ** 0.5
+
+    # ---- incremental updates ----
+    def set_price(self, skin, price):
+        i = self.index[skin]
+        old = self.base[i] * self.p[i]
+        self.p[i] = float(price or 0.0)
+        self.base[i] = self._floor_one(i)
+        self.base_cost += self.base[i] * self.p[i] - old
+        self._solved = None
+
+    def set_holding(self, skin, qty):
+        self.holdings[skin] = qty
+        self._solved = None
+
+    def set_budget(self, budget):
+        self.budget = float(budget)
+        self._floor_all()
+
+    # ---- orders ----
+    def orders(self):
+        """
+        [skin, current, target, diff, action] rows, SELLs first then BUYs.
+        Held skins that are not in the manifest are sold down to zero.
+        """
+        targets = self.solve()
+        sells, buys = [], []
+        for skin, qty in self.holdings.items():
+            if skin not in self.index and qty > 0:
+                sells.append([skin, qty, 0, -qty, 'SELL'])
+        for skin in self.skins:
+            if skin not in targets:
+                continue
+            current = self.holdings.get(skin, 0)
+            diff = targets[skin] - current
+            if diff < 0:
+                sells.append([skin, current, targets[skin], diff, 'SELL'])
+            elif diff > 0:
+                buys.append([skin, current, targets[skin], diff, 'BUY'])
+        return sells + buys
+
+    def unpriced(self):
+        return [s for i, s in enumerate(self.skins) if self.p[i] <= 0]
+
+def bench(n=10_000, seed=0):
+    import random
+    import time
+    rng = random.Random(seed)
+    skins = [f"Skin {i}" for i in range(n)]
+    weights = {s: rng.random() for s in skins}
+    prices = {s: round(rng.lognormvariate(1, 1.5), 2) for s in skins}
+    holdings = {s: rng.randint(0, 3) for s in rng.sample(skins, n // 3)}
+
+    t0 = time.perf_counter()
+    solver = RebalanceSolver(weights, prices, holdings, budget=250_000)
+    solver.solve()
+    t_full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    solver.set_price(skins[42], prices[skins[42]] * 1.1)
+    solver.solve()
+    t_inc = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    orders = solver.orders()
+    t_orders = time.perf_counter() - t0
+    print(f"{n} SKUs: full solve {t_full*1000:.1f} ms, re-solve after one price change "
+          f"{t_inc*1000:.1f} ms, orders {t_orders*1000:.1f} ms "
+          f"({len(orders)} orders, spent ${solver.spent:,.2f} of ${solver.budget:,.2f}, "
+          f"tracking error {solver.tracking_error():.2e})")
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,27 @@
+# sqlite_util.py
+#
+# Connection and transaction helpers shared by the SQLite-backed stores
+# (inventory_store, order_queue). Connections are in WAL mode so readers
+# never block the single writer, and in autocommit mode so each store marks
+# its own transactions with Txn.
+import sqlite3
+
+def connect(path, timeout=30):
+    """WAL-mode connection in autocommit mode; open one per thread."""
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+class Txn:
+    """Write transaction; BEGIN IMMEDIATE takes the lock before we read."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
@@ -0,0 +1,305 @@
+# tx_submitter.py
+#
+# Sends contract transactions without blocking the caller:
+#   * one Web3 instance per RPC URL, on a pooled keep-alive HTTP session
+#   * nonces handed out locally, so several transactions can be in flight
+#   * gas price cached for a few seconds
+#   * receipts tracked by a background thread
+#   * a newer update of the same kind (e.g. setValSkins) replaces a still
+#     pending one by reusing its nonce with a higher gas price, and a pending
+#     transaction that sits too long is re-sent with a bumped price
+# Pending transactions are kept in pending_txs.json (shared by every account),
+# so the next run (or `python tx_submitter.py watch`) picks up where a one-shot
+# updater left off. At exit the watcher is stopped and joined, so a poll or
+# re-send in progress finishes and is recorded before the process goes.
+#
+#   python tx_submitter.py watch       # wait for receipts of pending transactions
+#   python tx_submitter.py selftest    # exercise it against an in-process test chain
+import atexit
+import json
+import os
+import threading
+import time
+
+# ---- CONFIG ----
+PENDING_FILE         = 'pending_txs.json'
+GAS_LIMIT            = 100000
+GAS_PRICE_TTL        = 15     # seconds a fetched gas price is reused
+RECEIPT_POLL_SECONDS = 4
+REPLACE_AFTER        = 180    # re-send a pending tx with more gas after this long
+GAS_BUMP             = 1.15   # nodes want >= +10% (geth) / +12.5% to accept a replacement
+
+_web3_by_url = {}
+_web3_lock = threading.Lock()
+
+def get_web3(rpc_url):
+    """Shared Web3 for `rpc_url` on a pooled keep-alive session."""
+    with _web3_lock:
+        w3 = _web3_by_url.get(rpc_url)
+        if w3 is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from web3 import Web3
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}, session=session))
+            _web3_by_url[rpc_url] = w3
+    return w3
+
+def _is_error(e, *needles):
+    msg = str(e).lower()
+    return any(n in msg for n in needles)
+
+class TxSubmitter:
+    def __init__(self, w3, private_key, pending_file=PENDING_FILE, on_receipt=None,
+                 gas_limit=GAS_LIMIT, replace_after=REPLACE_AFTER, poll_seconds=RECEIPT_POLL_SECONDS):
+        self.w3 = w3
+        self.acct = w3.eth.account.from_key(private_key)
+        self.pending_file = pending_file
+        self.on_receipt = on_receipt or (lambda entry, receipt: None)
+        self.gas_limit = gas_limit
+        self.replace_after = replace_after
+        self.poll_seconds = poll_seconds
+        self._lock = threading.RLock()
+        self._nonce = None
+        self._gas = (0.0, None)       # (fetched_at, wei)
+        self._chain_id = None
+        self._watcher = None
+        self._idle = threading.Event()
+        self._stop = threading.Event()
+        self.pending = self._load()   # {nonce: entry}
+        if not self.pending:
+            self._idle.set()
+
+    # ---- state ----
+    def _load(self):
+        try:
+            with open(self.pending_file, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {e['nonce']: e for e in entries if e.get('from') == self.acct.address}
+
+    def _save(self):
+        # other accounts' entries in the file are theirs to settle; keep them
+        try:
+            with open(self.pending_file, encoding='utf-8') as f:
+                others = [e for e in json.load(f) if e.get('from') != self.acct.address]
+        except (OSError, ValueError):
+            others = []
+        entries = others + sorted(self.pending.values(), key=lambda e: e['nonce'])
+        tmp = self.pending_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, self.pending_file)
+
+    # ---- cached chain reads ----
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def gas_price(self):
+        fetched_at, price = self._gas
+        if price is None or time.monotonic() - fetched_at > GAS_PRICE_TTL:
+            price = self.w3.eth.gas_price
+            self._gas = (time.monotonic(), price)
+        return price
+
+    def _next_nonce(self):
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.acct.address, 'pending')
+            if self.pending:
+                self._nonce = max(self._nonce, max(self.pending) + 1)
+        nonce = self._nonce
+        self._nonce += 1
+        return nonce
+
+    # ---- sending ----
+    def _send(self, to, data, nonce, gas_price, kind, note):
+        tx = {
+            'from': self.acct.address, 'to': to, 'data': data, 'value': 0,
+            'gas': self.gas_limit, 'gasPrice': gas_price, 'nonce': nonce, 'chainId': self.chain_id(),
+        }
+        signed = self.acct.sign_transaction(tx)
+        txh = self.w3.to_hex(self.w3.eth.send_raw_transaction(signed.raw_transaction))
+        prev = self.pending.get(nonce)
+        self.pending[nonce] = {
+            'nonce': nonce, 'kind': kind, 'note': note, 'from': self.acct.address,
+            'to': to, 'data': data, 'gas_price': gas_price, 'sent_at': time.time(),
+            'hash': txh,
+            # a replaced tx can still be the one that gets mined, so keep watching it
+            'hashes': (prev['hashes'] if prev else []) + [txh],
+        }
+        self._save()
+        self._idle.clear()
+        self._ensure_watcher()
+        return txh
+
+    def submit(self, contract_fn, kind, note='', supersede=True):
+        """
+        Send `contract_fn` (e.g. contract.functions.setValSkins(wei)) and
+        return its hash without waiting for it to be mined. With `supersede`,
+        a pending transaction of the same kind is replaced rather than queued
+        behind.
+        """
+        built = contract_fn.build_transaction({
+            'from': self.acct.address, 'nonce': 0, 'gas': self.gas_limit,
+            'gasPrice': 0, 'chainId': self.chain_id(),
+        })
+        to, data = built['to'], built['data']
+        with self._lock:
+            older = [e for e in self.pending.values() if e['kind'] == kind] if supersede else []
+            if older:
+                old = max(older, key=lambda e: e['nonce'])
+                gas = max(self.gas_price(), int(old['gas_price'] * GAS_BUMP) + 1)
+                try:
+                    txh = self._send(to, data, old['nonce'], gas, kind, note)
+                    print(f"[TX] {kind} {note} replaces pending nonce {old['nonce']}: {txh}")
+                    return txh
+                except Exception as e:
+                    if not _is_error(e, 'nonce too low'):
+                        raise
+                    # the old one was mined meanwhile; send this as a new transaction
+                    print(f"[TX] nonce {old['nonce']} already used, sending {kind} with a new nonce")
+            try:
+                txh = self._send(to, data, self._next_nonce(), self.gas_price(), kind, note)
+            except Exception as e:
+                if not _is_error(e, 'nonce too low'):
+                    self._nonce = None
+                    raise
+                # someone else used our nonce; resync once and retry
+                self._nonce = None
+                txh = self._send(to, data, self._next_nonce(), self.gas_price(), kind, note)
+            print(f"[TX] {kind} {note} sent: {txh}")
+            return txh
+
+    # ---- receipts ----
+    def _ensure_watcher(self):
+        if self._watcher is None:
+            atexit.register(self.close)
+        if self._watcher is None or not self._watcher.is_alive():
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name='tx-receipts', daemon=True)
+            self._watcher.start()
+
+    def poll_once(self):
+        """Check every pending transaction once; re-send ones that have waited too long."""
+        from web3.exceptions import TransactionNotFound
+        with self._lock:
+            entries = list(self.pending.values())
+        confirmed_nonce = None
+        for entry in entries:
+            receipt = None
+            for h in reversed(entry['hashes']):
+                try:
+                    receipt = self.w3.eth.get_transaction_receipt(h)
+                except TransactionNotFound:
+                    continue
+                if receipt is not None:
+                    break
+            with self._lock:
+                if receipt is not None:
+                    self.pending.pop(entry['nonce'], None)
+                    self._save()
+                    ok = receipt.get('status', 1) == 1
+                    print(f"[TX] {entry['kind']} {entry['note']} nonce {entry['nonce']} "
+                          f"{'confirmed' if ok else 'REVERTED'} in block {receipt['blockNumber']}")
+                    self.on_receipt(entry, receipt)
+                    continue
+                if confirmed_nonce is None:
+                    confirmed_nonce = self.w3.eth.get_transaction_count(self.acct.address, 'latest')
+                if entry['nonce'] < confirmed_nonce:
+                    # mined under a hash we never saw (e.g. sent from elsewhere)
+                    print(f"[TX] nonce {entry['nonce']} was used by another transaction, dropping")
+                    self.pending.pop(entry['nonce'], None)
+                    self._save()
+                elif time.time() - entry['sent_at'] > self.replace_after:
+                    gas = max(self.gas_price(), int(entry['gas_price'] * GAS_BUMP) + 1)
+                    try:
+                        txh = self._send(entry['to'], entry['data'], entry['nonce'], gas,
+                                         entry['kind'], entry['note'])
+                        print(f"[TX] nonce {entry['nonce']} stuck, re-sent at {gas} wei gas: {txh}")
+                    except Exception as e:
+                        print(f"[TX] re-send of nonce {entry['nonce']} failed: {e}")
+        with self._lock:
+            if not self.pending:
+                self._idle.set()
+
+    def _watch(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"[TX] receipt poll failed: {e}")
+            with self._lock:
+                if not self.pending:
+                    return
+            self._stop.wait(self.poll_seconds)
+
+    def close(self, timeout=60):
+        """
+        Stop the receipt watcher and wait for a poll or re-send in progress to
+        finish. Whatever is still pending stays in the pending file.
+        """
+        self._stop.set()
+        watcher = self._watcher
+        if watcher is not None and watcher is not threading.current_thread():
+            watcher.join(timeout)
+
+    def wait(self, timeout=None):
+        """Block until nothing is pending (or `timeout`); True if everything confirmed."""
+        if self.pending:
+            self._ensure_watcher()
+        return self._idle.wait(timeout)
+
+def selftest():
+    """Nonces, replacement and receipts against eth-tester with manual mining."""
+    import tempfile
+    from eth_account import Account
+    from eth_tester import EthereumTester
+    from web3 import Web3, EthereumTesterProvider
+
+    tester = EthereumTester()
+    w3 = Web3(EthereumTesterProvider(tester))
+    acct = Account.create()
+    w3.eth.send_transaction({'from': w3.eth.accounts[0], 'to': acct.address, 'value': 10 ** 20})
+    tester.disable_auto_mine_transactions()
+
+    # a stand-in "contract call": any object with build_transaction works
+    class Call:
+        def __init__(self, to, data):
+            self.to, self.data = to, data
+
+        def build_transaction(self, fields):
+            return dict(fields, to=self.to, data=self.data)
+
+    sink = w3.eth.accounts[1]
+    pending_file = os.path.join(tempfile.mkdtemp(), 'pending_txs.json')
+    sub = TxSubmitter(w3, acct.key, pending_file=pending_file, poll_seconds=0.1, gas_limit=50000)
+    sub.submit(Call(sink, '0x01'), 'ping', 'a', supersede=False)
+    sub.submit(Call(sink, '0x02'), 'ping', 'b', supersede=False)
+    sub.submit(Call(sink, '0x03'), 'setValSkins', 'v1')
+    sub.submit(Call(sink, '0x04'), 'setValSkins', 'v2')   # replaces v1 (same nonce)
+    assert sorted(sub.pending) == [0, 1, 2], sub.pending
+    tester.mine_blocks()
+    assert sub.wait(10), sub.pending
+    assert w3.eth.get_transaction_count(acct.address) == 3
+    print("[TX] selftest passed")
+
+if __name__ == '__main__':
+    import sys
+    cmd = sys.argv[1] if len(sys.argv) > 1 else 'watch'
+    if cmd == 'selftest':
+        selftest()
+    elif cmd == 'watch':
+        from dotenv import load_dotenv
+        load_dotenv()
+        sub = TxSubmitter(get_web3(os.getenv('ETH_RPC_URL')), os.getenv('PRIVATE_KEY'))
+        print(f"[TX] {len(sub.pending)} pending transaction(s)")
+        sub.wait()
+    else:
+        print(f"Unknown command {cmd!r}; use watch or selftest")
+        sys.exit(1)
@@ -1,11 +1,9 @@
 import csv
+import json
 import os
 import sys
-import requests
-import undetected_chromedriver as uc
+import time
 from datetime import datetime, timedelta, timezone
-from web3 import Web3
-from web3.exceptions import TimeExhausted
 import argparse
 from dotenv import load_dotenv
 
@@ -16,12 +14,7 @@ load_dotenv()
 if hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(encoding="utf-8")
 
-# ---- SUPPRESS CHROME __del__ ERRORS ----
-uc.Chrome.__del__ = lambda self: None
-
 # -------- CONFIG --------
-INVENTORY_CSV    = 'Inventory.csv'
-HISTORY_CSV      = 'InventoryHistory.csv'
 CONTRACT_ADDRESS = '0xb730CFc309AD720E9184C9F8BDb0A10874587d1e'
 CONTRACT_ABI     = [
     {"inputs":[{"internalType":"uint256","name":"skinsValue","type":"uint256"}],
@@ -29,69 +22,217 @@ CONTRACT_ABI     = [
 ]
 ETH_RPC_URL      = os.getenv('ETH_RPC_URL')
 PRIVATE_KEY      = os.getenv('PRIVATE_KEY')
+STALE_AFTER      = timedelta(days=1)
 
 # import scraper
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../Price Scraper')))
 from pe_scrape_price import get_pe_price_for_item
+from pe_browser import launch as launch_browser
+from pe_price_cache import PriceCache, read_through
+from pe_scheduler import Scheduler, NegativeCache, pricempire_host
+from pe_profile import PROFILE
+from price_oracle import load_fresh_oracle
+from inventory_store import open_store, INVENTORY_DB, INVENTORY_CSV
+from nav_history import inventory_history, INVENTORY_HISTORY_CSV as HISTORY_CSV
+from tx_submitter import TxSubmitter, get_web3
+from eth_quote import fresh_eth_usd, QuoteUnavailable
+from portfolio import Portfolio, parse_cents
+
+class LazyDriver:
+    """Launches Chrome only if some price actually has to be scraped."""
+    def __init__(self):
+        self.driver = None
+
+    def get(self):
+        if self.driver is None:
+            with PROFILE.stage('launch'):
+                self.driver = launch_browser()
+        return self.driver
+
+    def scrape(self, skin):
+        driver = self.get()
+        driver.execute_script("window.open('');")
+        driver.switch_to.window(driver.window_handles[-1])
+        result = get_pe_price_for_item(skin, driver)
+        driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+        return result
+
+    def quit(self):
+        if self.driver is not None:
+            with PROFILE.stage('quit'):
+                self.driver.quit()
+
+def fetch_price(skin, scrape, cache, oracle=None, force=False):
+    """(price string or None, unix time the price was fetched)."""
+    price_str, fetched_at = cached_price(skin, cache, oracle, force)
+    if (parse_cents(price_str) or 0) > 0:
+        return price_str, fetched_at
+    # --force still writes through the cache, it just never trusts it
+    price_str, _, _ = read_through(cache, skin, scrape, max_age=0)
+    return price_str, time.time()
+
+# The helpers below take portfolio Holding rows: prices and timestamps are
+# already parsed into the portfolio's columns.
+def needs_refresh(row, now, force):
+    if force:
+        return True
+    if row.never:
+        return False
+    ts = row.updated
+    return ts != ts or now.timestamp() - ts > STALE_AFTER.total_seconds() or not row.priced
+
+def apply_price(row, price_str, fetched_at):
+    """
+    Set the row's price, stamped with when it was fetched so a cached one
+    ages from then. Returns the USD price, or None (row untouched) if
+    `price_str` isn't a usable price.
+    """
+    cents = parse_cents(price_str)
+    if (cents or 0) <= 0:
+        return None
+    return row.set_price(cents, fetched_at)
+
+def row_value(row):
+    return row.value_usd
+
+def value_at_risk(row, now):
+    """qty × last price × hours since last refresh; unpriced rows come first."""
+    ts = row.updated
+    value = row.value_usd
+    if value <= 0 or ts != ts or row.never:
+        return float('inf')
+    return value * max((now.timestamp() - ts) / 3600, 0.0)
+
+def cached_price(skin, cache, oracle=None, force=False):
+    """
+    (price, fetch time) from the snapshot or a fresh cache entry, or
+    (None, None); never opens a browser.
+    """
+    if force:
+        return None, None
+    if oracle is not None:
+        usd = oracle.lookup(skin)
+        if usd is not None:
+            return f"${usd:.2f}", oracle.snapshot_time
+    entry = cache.get(skin)
+    return (entry.price, entry.fetched_at) if entry else (None, None)
+
+def refresh_rows(due, scrape, cache, oracle, force, workers=1, deadline=None):
+    """
+    Price `due` rows: snapshot and cache hits straight away, the rest through
+    the adaptive scheduler (failures are retried with backoff in the same run,
+    repeat offenders are skipped via the cache's negative entries unless
+    forced). Returns (refreshed rows, rows left unvisited at the deadline).
+    """
+    refreshed = []
+    todo = []
+    for row in due:
+        price_str, fetched_at = cached_price(row['Skin'], cache, oracle, force)
+        price = apply_price(row, price_str, fetched_at)
+        if price is not None:
+            refreshed.append(row)
+            print(f"[DONE]  {row['Skin']} → ${price:.2f} (cached)")
+        else:
+            todo.append(row)
 
-def get_eth_usd_price():
+    def done(row, result, ok):
+        price = apply_price(row, *result) if ok else None
+        if price is not None:
+            refreshed.append(row)
+            print(f"[DONE]  {row['Skin']} → ${price:.2f}")
+        else:
+            print(f"[FAILED] {row['Skin']} (keeping existing price)")
+
+    sched = Scheduler(
+        lambda row: fetch_price(row['Skin'], scrape, cache, oracle, force),
+        is_ok=lambda result: (parse_cents(result[0]) or 0) > 0,  # retry unparsable scrapes
+        max_workers=workers,
+        key_of=lambda r: r['Skin'],
+        host_of=lambda r: pricempire_host(r['Skin']),
+        negative_cache=NegativeCache() if force else cache,
+        deadline=deadline,
+        on_result=done,
+    )
+    left = sched.run(todo) if todo else []
+    if todo:
+        print(sched.summary())
+    PROFILE.note('rows', {'due': len(due), 'cached': len(due) - len(todo),
+                          'refreshed': len(refreshed), 'unvisited': len(left)})
+    PROFILE.note('scheduler', dict(sched.stats, final_limit=sched.aimd.current))
+    return refreshed, left
+
+def refresh_with_budget(rows, budget, workers, cache, oracle, force, now):
+    """
+    Refresh due rows in order of value at risk across up to `workers` browsers
+    until `budget` seconds have elapsed. Returns True if any price changed.
+    """
+    from pe_driver_pool import DriverPool
+
+    t0 = time.monotonic()
+    due = [r for r in rows if needs_refresh(r, now, force)]
+    due.sort(key=lambda r: value_at_risk(r, now), reverse=True)
+    pool = DriverPool(workers)
+
+    def scrape(skin):
+        with pool.driver() as driver:
+            return get_pe_price_for_item(skin, driver)
+
+    print(f"Refreshing {len(due)} due items by value at risk, budget {budget:g}s, up to {workers} workers…")
     try:
-        r = requests.get(
-            'https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd',
-            timeout=10
-        )
-        return float(r.json()['ethereum']['usd'])
-    except:
-        print("[ERROR] Couldn't fetch ETH price, assuming $3500.")
-        return 3500.0
+        refreshed, left = refresh_rows(due, scrape, cache, oracle, force,
+                                       workers=workers, deadline=t0 + budget)
+    finally:
+        pool.close()
+
+    total     = sum(row_value(r) for r in rows)
+    refreshed_value = sum(row_value(r) for r in refreshed)
+    cutoff = (now - STALE_AFTER).timestamp()
+    fresh_value = sum(r.value_usd for r in rows if r.updated >= cutoff)
+    share = refreshed_value / total if total else 0.0
+    fresh_share = fresh_value / total if total else 0.0
+    print(f"\n[BUDGET] {len(refreshed)}/{len(due)} due rows refreshed in {time.monotonic() - t0:.0f}s, "
+          f"{len(left)} left unvisited")
+    print(f"[BUDGET] Refreshed ${refreshed_value:.2f} of ${total:.2f} NAV ({share:.1%}); "
+          f"{fresh_share:.1%} of NAV now priced within {STALE_AFTER.total_seconds() / 3600:.0f}h")
+    return bool(refreshed)
+
+def get_eth_usd_price():
+    # the NAV goes on-chain, so never price it with a stale quote
+    return fresh_eth_usd()
 
 def get_last_eth_value():
-    if not os.path.exists(HISTORY_CSV):
-        return None
-    with open(HISTORY_CSV, encoding='utf-8') as f:
-        lines = f.readlines()
-    if len(lines) < 2:
-        return None
-    last = lines[-1].strip().split(',')
-    try:
-        return float(last[2])
-    except:
-        return None
+    # O(1) read of the newest snapshot; the CSV no longer has to be scanned
+    last = inventory_history().latest()
+    return last.eth if last else None
 
 def set_val_skins_onchain(total_eth):
-    w3 = Web3(Web3.HTTPProvider(ETH_RPC_URL))
+    """
+    Send setValSkins and return as soon as it is broadcast; receipts are
+    tracked in the background and by the next run (see tx_submitter.py).
+    A previous update that is still pending is replaced, not queued behind.
+    """
+    w3 = get_web3(ETH_RPC_URL)
     if not w3.is_connected():
         print("[ERROR] Could not connect to Ethereum RPC.")
         return False
 
-    acct = w3.eth.account.from_key(PRIVATE_KEY)
     contract = w3.eth.contract(
         address=w3.to_checksum_address(CONTRACT_ADDRESS),
         abi=CONTRACT_ABI
     )
     wei = w3.to_wei(total_eth, 'ether')
-    tx = contract.functions.setValSkins(wei).build_transaction({
-        'from': acct.address,
-        'nonce': w3.eth.get_transaction_count(acct.address),
-        'gas': 100000,
-        'gasPrice': w3.eth.gas_price,
-    })
-    signed = acct.sign_transaction(tx)
-    txh = w3.eth.send_raw_transaction(signed.raw_transaction)
-    print(f"[CONTRACT] tx sent: {txh.hex()}")
-
     try:
-        receipt = w3.eth.wait_for_transaction_receipt(txh, timeout=120)
-        print(f"[CONTRACT] Confirmed in block {receipt.blockNumber}")
+        submitter = TxSubmitter(w3, PRIVATE_KEY)
+        submitter.poll_once()  # settle what earlier runs left pending
+        submitter.submit(contract.functions.setValSkins(wei), 'setValSkins', f"{total_eth:.6f} ETH")
         return True
-    except TimeExhausted:
-        print(f"[ERROR] Transaction {txh.hex()} not confirmed within timeout.")
-        return False
     except Exception as e:
-        print(f"[ERROR] Unexpected error waiting for receipt: {e}")
+        print(f"[ERROR] setValSkins not sent: {e}")
         return False
 
 def save_history(date, usd, eth, eth_price):
+    inventory_history().append(date, usd, eth, eth_price)
     existed = os.path.exists(HISTORY_CSV)
     with open(HISTORY_CSV, 'a', newline='') as f:
         writer = csv.writer(f)
@@ -100,118 +241,14 @@ def save_history(date, usd, eth, eth_price):
         writer.writerow([date, f"{usd:.2f}", f"{eth:.6f}", f"{eth_price:.2f}"])
     print(f"[HISTORY] {date} USD={usd:.2f}, ETH={eth:.6f}")
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--force', action='store_true', help='Force update all items')
-    parser.add_argument('--no-update', action='store_true',
-                        help='Only refresh prices in CSV; skip any on-chain update')
-    args = parser.parse_args()
-    force     = args.force
-    no_update = args.no_update
-
-    if not os.path.exists(INVENTORY_CSV):
-        print(f"[ERROR] {INVENTORY_CSV} not found.")
-        sys.exit(1)
-
-    # Load inventory
-    with open(INVENTORY_CSV, encoding='utf-8') as f:
-        rows = list(csv.DictReader(f))
-    fieldnames = rows[0].keys()
-
-    failed_rows = []
-    updated_any = False
-    now = datetime.now(timezone.utc)
-
-    driver = uc.Chrome()
-
-    # --- FIRST PASS ---
-    print(f"Starting first pass on {len(rows)} inventory items…")
-    for row in rows:
-        skin     = row['Skin']
-        qty      = int(row.get('QTY', 0))
-        last_str = row.get('LastUpdated','').strip().upper()
-
-        # parse existing price
-        try:
-            price_exist = float(row.get('Price','').replace('$','').replace(',',''))
-        except:
-            price_exist = 0.0
-
-        # skip NEVER unless forced
-        if last_str == 'NEVER' and not force:
-            print(f"[SKIP] '{skin}' set to NEVER.")
-            continue
-
-        # check staleness
-        last_dt = None
-        if last_str and last_str != 'NEVER':
-            try:
-                last_dt = datetime.fromisoformat(last_str)
-                if last_dt.tzinfo is None:
-                    last_dt = last_dt.replace(tzinfo=timezone.utc)
-            except:
-                last_dt = None
-
-        needs = force or not last_dt or (now - last_dt) > timedelta(days=1) or price_exist <= 0.0
-        if not needs:
-            continue
-
-        # fetch price
-        driver.execute_script("window.open('');")
-        driver.switch_to.window(driver.window_handles[-1])
-        price_str, _, _ = get_pe_price_for_item(skin, driver)
-        driver.close()
-        driver.switch_to.window(driver.window_handles[0])
-
-        if price_str:
-            price = float(price_str.replace('$','').replace(',',''))
-            row['Price']       = f"{price:.2f}"
-            row['LastUpdated'] = now.isoformat()
-            updated_any        = True
-            print(f"[DONE]  {skin} → ${price:.2f}")
-        else:
-            failed_rows.append(row)
-            print(f"[FAILED] {skin} (queued for retry)")
-
-    # --- SECOND PASS (retry failures once) ---
-    if failed_rows:
-        print(f"\nRetrying {len(failed_rows)} failed lookups…")
-        for row in failed_rows:
-            skin = row['Skin']
-            driver.execute_script("window.open('');")
-            driver.switch_to.window(driver.window_handles[-1])
-            price_str, _, _ = get_pe_price_for_item(skin, driver)
-            driver.close()
-            driver.switch_to.window(driver.window_handles[0])
-
-            if price_str:
-                price = float(price_str.replace('$','').replace(',',''))
-                row['Price']       = f"{price:.2f}"
-                row['LastUpdated'] = now.isoformat()
-                updated_any        = True
-                print(f"[RETRY DONE]  {skin} → ${price:.2f}")
-            else:
-                print(f"[FAILED AGAIN] {skin} (keeping existing price)")
-
-    driver.quit()
-
-    # --- WRITE UPDATED INVENTORY ---
-    with open(INVENTORY_CSV, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    # --- COMPUTE TOTALS ---
-    total_usd = 0.0
-    for row in rows:
-        qty  = int(row.get('QTY',0))
-        try:
-            price = float(row.get('Price','').replace('$','').replace(',',''))
-        except:
-            price = 0.0
-        total_usd += price * qty
-
-    eth_price = get_eth_usd_price()
+def publish_nav(total_usd, now, force=False, no_update=False, updated_any=True):
+    """Record the inventory value in history and push it on-chain if it moved >= 1%."""
+    try:
+        eth_price = get_eth_usd_price()
+    except QuoteUnavailable as e:
+        # no quote within QUOTE_TTL; don't record or publish a NAV priced in an old one
+        print(f"[ERROR] Couldn't get a fresh ETH price ({e}); skipping history and on-chain update.")
+        return False
     total_eth = total_usd / eth_price
     print(f"\nTotal USD=${total_usd:.2f}, ETH={total_eth:.6f} (ETH/USD={eth_price:.2f})")
 
@@ -237,3 +274,109 @@ if __name__ == '__main__':
         set_val_skins_onchain(total_eth)
     else:
         print("[DEBUG] Conditions NOT met → skipping on-chain update")
+    return True
+
+def revalue_trade(store, changes, cache, oracle, now):
+    """
+    Apply one trade ([{'skin', 'delta', 'price'}]) and reprice only the
+    received SKUs that are new or stale; the running total in the store
+    absorbs both, so nothing else in the inventory is read. Returns the
+    new total in USD.
+    """
+    store.apply(changes, source='trade')
+    received = {c['skin'] for c in changes if int(c.get('delta', 0)) > 0}
+    held = Portfolio.from_rows(filter(None, (store.get(skin) for skin in sorted(received))))
+    due = [row for row in held if needs_refresh(row, now, False)]
+    print(f"[TRADE] {len(changes)} changes applied, {len(due)} of {len(received)} received SKUs need a price")
+    if due:
+        browser = LazyDriver()
+        try:
+            refreshed, _ = refresh_rows(due, browser.scrape, cache, oracle, False)
+        finally:
+            browser.quit()
+        store.set_prices([(r['Skin'], r['Price'], r['LastUpdated']) for r in refreshed], source='trade')
+    return store.total_usd()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--force', action='store_true', help='Force update all items')
+    parser.add_argument('--no-update', action='store_true',
+                        help='Only refresh prices in CSV; skip any on-chain update')
+    parser.add_argument('--budget', type=float, metavar='SECONDS',
+                        help='Refresh highest value-at-risk rows first, in parallel, for at most this long')
+    parser.add_argument('--workers', type=int, default=4, help='Max browsers to use with --budget')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Write per-stage latency percentiles and failure counts as JSON')
+    parser.add_argument('--trade', metavar='FILE',
+                        help="Apply one trade's changes (JSON, '-' for stdin) and revalue incrementally")
+    args = parser.parse_args()
+    force     = args.force
+    no_update = args.no_update
+
+    store = open_store()
+    if args.trade:
+        # incremental: only the trade's SKUs are touched, no full refresh
+        if args.trade == '-':
+            changes = json.load(sys.stdin)
+        else:
+            with open(args.trade, encoding='utf-8') as f:
+                changes = json.load(f)
+        now = datetime.now(timezone.utc)
+        total_usd = revalue_trade(store, changes, PriceCache(), load_fresh_oracle(), now)
+        if args.profile:
+            PROFILE.write(args.profile)
+        # Inventory.csv is left to the next full run / Run.py export, which are O(rows)
+        sys.exit(0 if publish_nav(total_usd, now, force, no_update) else 1)
+
+    if store.is_empty():
+        print(f"[ERROR] Inventory is empty ({INVENTORY_DB} / {INVENTORY_CSV}).")
+        sys.exit(1)
+
+    # Load inventory into columns; remember the price columns so only changed
+    # prices are written back
+    book = Portfolio.from_store(store)
+    rows = list(book)
+    before = book.snapshot()
+
+    updated_any = False
+    now = datetime.now(timezone.utc)
+
+    cache   = PriceCache()
+    oracle  = load_fresh_oracle()
+
+    if args.budget is not None:
+        updated_any = refresh_with_budget(rows, args.budget, args.workers, cache, oracle, force, now)
+    else:
+        browser = LazyDriver()
+
+        # skip NEVER unless forced
+        if not force:
+            for row in rows:
+                if row.never:
+                    print(f"[SKIP] '{row.skin}' set to NEVER.")
+        due = rows if force else [book[i] for i in book.stale(now.timestamp(), STALE_AFTER.total_seconds())]
+
+        # one browser tab at a time; the scheduler still paces and retries
+        print(f"Refreshing {len(due)} of {len(rows)} inventory items…")
+        try:
+            refreshed, _ = refresh_rows(due, browser.scrape, cache, oracle, force)
+            updated_any = bool(refreshed)
+        finally:
+            browser.quit()
+
+    if args.profile:
+        PROFILE.write(args.profile)
+
+    # --- WRITE UPDATED PRICES ---
+    # price columns only, one transaction; quantities from trades that landed
+    # during the refresh are kept, then re-read for the totals
+    updates = [(book.skins[i], book[i]['Price'], book[i]['LastUpdated']) for i in book.changed_since(before)]
+    store.set_prices(updates, source='update_inventory')
+    exported = store.export_csv(INVENTORY_CSV)
+    print(f"[INVENTORY] {len(updates)} prices written, {exported} rows exported to {INVENTORY_CSV}")
+
+    # --- COMPUTE TOTALS ---
+    # a full pass also resyncs the running total the trade path maintains
+    total_usd = store.recompute_total()
+    if not publish_nav(total_usd, now, force, no_update, updated_any):
+        sys.exit(1)
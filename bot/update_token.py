@@ -1,49 +1,98 @@
 #!/usr/bin/env python3
+# update_token.py
+#
+# Records the SKINDEX price (on-chain NAV per token x ETH/USD) into the token
+# history. All on-chain reads for one snapshot go out as a single batched
+# JSON-RPC request over a keep-alive session, so a tick is one round trip.
+#
+#   python update_token.py                        # one snapshot (cron)
+#   python update_token.py --daemon --interval 300
+#   python update_token.py --selftest             # against a local stand-in RPC server
 import os
 import csv
+import json
+import time
 from datetime import datetime, timezone
-import requests
-from web3 import Web3
 from dotenv import load_dotenv
 
+from eth_quote import fresh_eth_usd
+from nav_history import token_history, TOKEN_HISTORY_CSV
+
 # Load environment variables from .env
 load_dotenv()
 
 # Configuration
 ETH_RPC_URL         = os.getenv('ETH_RPC_URL')
 SKINDEX_ADDRESS     = os.getenv('SKINDEX_CONTRACT_ADDRESS')
-OUTPUT_CSV          = 'skindex_price_history.csv'
-
-# Minimal ABI for getNavPerToken()
-SKINDEX_ABI = [
-    {
-        "inputs": [],
-        "name": "getNavPerToken",
-        "outputs": [
-            {
-                "internalType": "uint256",
-                "name": "",
-                "type": "uint256"
-            }
-        ],
-        "stateMutability": "view",
-        "type": "function"
-    }
+OUTPUT_CSV          = TOKEN_HISTORY_CSV
+POLL_INTERVAL       = 300     # --daemon: seconds between snapshots
+RPC_TIMEOUT         = 30
+MAX_BACKOFF         = 600     # --daemon: longest wait after repeated failures
+
+# 4-byte function selectors: first 4 bytes of keccak256(signature)
+GET_NAV_PER_TOKEN = '0xd766705a'  # getNavPerToken()
+TOTAL_SUPPLY      = '0x18160ddd'  # totalSupply()
+
+# View calls made every tick: (key, selector, required). 18-decimal uints.
+VAULT_READS = [
+    ('nav_per_token', GET_NAV_PER_TOKEN, True),
+    ('total_supply',  TOTAL_SUPPLY,      False),
 ]
 
+class RpcError(Exception):
+    pass
+
 def fetch_eth_price():
-    """Fetch current ETH price in USD from CoinGecko."""
-    url = 'https://api.coingecko.com/api/v3/simple/price'
-    params = {'ids': 'ethereum', 'vs_currencies': 'usd'}
-    resp = requests.get(url, params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-    return float(data['ethereum']['usd'])
-
-def fetch_skindex_nav_per_token(w3, contract):
-    """Call getNavPerToken() and convert from 18-decimal uint to float ETH price."""
-    raw = contract.functions.getNavPerToken().call()
-    return raw / 1e18
+    """ETH price in USD no older than QUOTE_TTL; raises rather than serve a stale one."""
+    return fresh_eth_usd()
+
+class NavReader:
+    """Batched vault reads over one keep-alive JSON-RPC session."""
+    def __init__(self, rpc_url, address, reads=VAULT_READS, session=None):
+        import requests
+        self.rpc_url = rpc_url
+        self.address = address.lower()
+        self.reads = reads
+        self.session = session or requests.Session()
+        self.requests_sent = 0
+
+    def _batch(self):
+        calls = [{'jsonrpc': '2.0', 'id': 0, 'method': 'eth_blockNumber', 'params': []},
+                 {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_getBalance', 'params': [self.address, 'latest']}]
+        for i, (_, sel, _) in enumerate(self.reads, start=2):
+            calls.append({'jsonrpc': '2.0', 'id': i, 'method': 'eth_call',
+                          'params': [{'to': self.address, 'data': sel}, 'latest']})
+        return calls
+
+    def read(self):
+        """
+        {'block', 'vault_eth', <read key>...} from one HTTP request. Values are
+        floats in ETH units; an optional read the vault doesn't answer is None.
+        """
+        resp = self.session.post(self.rpc_url, json=self._batch(), timeout=RPC_TIMEOUT)
+        self.requests_sent += 1
+        resp.raise_for_status()
+        replies = resp.json()
+        if not isinstance(replies, list):
+            raise RpcError(f"batch rejected: {replies.get('error', replies)}")
+        by_id = {r.get('id'): r for r in replies}
+
+        def result(i, required):
+            r = by_id.get(i, {})
+            value = r.get('result')
+            if value in (None, '0x'):
+                if required:
+                    raise RpcError(f"call {i} failed: {r.get('error', 'no result')}")
+                return None
+            return int(value, 16)
+
+        out = {'block': result(0, True), 'vault_eth': result(1, False)}
+        if out['vault_eth'] is not None:
+            out['vault_eth'] /= 1e18
+        for i, (key, _, required) in enumerate(self.reads, start=2):
+            raw = result(i, required)
+            out[key] = raw / 1e18 if raw is not None else None
+        return out
 
 def ensure_csv_header(path):
     """Create CSV file with header if it doesn't exist."""
@@ -63,7 +112,108 @@ def append_price_snapshot(path, timestamp, price_usd, price_eth, eth_usd):
             f"{eth_usd:.2f}"
         ])
 
-def main():
+def snapshot(reader, history, eth_price=fetch_eth_price):
+    """Read the vault, price it and record one snapshot. Returns the reads."""
+    reads = reader.read()
+    eth_usd_price = eth_price()
+    price_eth = reads['nav_per_token']
+    price_usd = price_eth * eth_usd_price
+    timestamp = datetime.now(timezone.utc).isoformat()
+
+    # Write to the time-series store, and to the CSV for compatibility
+    history.append(timestamp, price_usd, price_eth, eth_usd_price, nav_per_token=price_eth)
+    ensure_csv_header(OUTPUT_CSV)
+    append_price_snapshot(OUTPUT_CSV, timestamp, price_usd, price_eth, eth_usd_price)
+    extra = ''
+    if reads.get('total_supply') is not None:
+        extra += f" | supply {reads['total_supply']:.4f}"
+    if reads.get('vault_eth') is not None:
+        extra += f" | vault {reads['vault_eth']:.6f} ETH"
+    print(f"[{timestamp}] SKINDEX = {price_usd:.2f} USD | {price_eth:.6f} ETH "
+          f"(ETH/USD = {eth_usd_price:.2f}) @ block {reads['block']}{extra}")
+    return reads
+
+def run_daemon(reader, history, interval=POLL_INTERVAL, ticks=None, eth_price=fetch_eth_price):
+    """Snapshot every `interval` seconds (on a fixed cadence), backing off on errors."""
+    failures = 0
+    done = 0
+    next_at = time.monotonic()
+    while ticks is None or done < ticks:
+        try:
+            snapshot(reader, history, eth_price)
+            failures = 0
+        except Exception as e:
+            failures += 1
+            print(f"[ERROR] Snapshot failed ({failures} in a row): {e}")
+        done += 1
+        if ticks is not None and done >= ticks:
+            break
+        if failures:
+            next_at = time.monotonic() + min(interval * 2 ** (failures - 1), max(MAX_BACKOFF, interval))
+        else:
+            next_at += interval
+            # a tick that ran long skips the slots it missed instead of bunching up
+            while next_at < time.monotonic():
+                next_at += interval
+        time.sleep(max(0.0, next_at - time.monotonic()))
+
+def selftest(ticks=3):
+    """Run the daemon against a stand-in JSON-RPC server in a temp directory."""
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    nav_wei = 1_250_000_000_000_000_000
+    answers = {GET_NAV_PER_TOKEN: nav_wei, TOTAL_SUPPLY: 40 * 10 ** 18}
+    seen = {'posts': 0, 'batch_sizes': [], 'connections': set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'   # keep-alive
+
+        def do_POST(self):
+            batch = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            seen['posts'] += 1
+            seen['batch_sizes'].append(len(batch))
+            seen['connections'].add(self.client_address)
+            replies = []
+            for call in batch:
+                if call['method'] == 'eth_blockNumber':
+                    result = hex(100 + seen['posts'])
+                elif call['method'] == 'eth_getBalance':
+                    result = hex(50 * 10 ** 18)
+                else:
+                    value = answers.get(call['params'][0]['data'])
+                    result = '0x' + format(value, '064x') if value is not None else '0x'
+                replies.append({'jsonrpc': '2.0', 'id': call['id'], 'result': result})
+            body = json.dumps(replies).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.chdir(tempfile.mkdtemp(prefix='update_token_selftest_'))
+    try:
+        reader = NavReader(f"http://127.0.0.1:{server.server_port}", '0x' + '11' * 20)
+        history = token_history()
+        run_daemon(reader, history, interval=0.05, ticks=ticks, eth_price=lambda: 2000.0)
+    finally:
+        server.shutdown()
+
+    assert seen['posts'] == ticks, seen
+    assert all(n == 2 + len(VAULT_READS) for n in seen['batch_sizes']), seen
+    assert len(seen['connections']) == 1, f"expected one kept-alive connection, saw {seen['connections']}"
+    assert len(history) == ticks
+    last = history.latest()
+    assert abs(last.nav_per_token - 1.25) < 1e-12 and abs(last.usd - 2500.0) < 1e-6, last
+    print(f"[SELFTEST] {ticks} ticks, {seen['posts']} HTTP requests on 1 connection: passed")
+
+def main(daemon=False, interval=POLL_INTERVAL):
     # Validate environment
     if not ETH_RPC_URL:
         print("[ERROR] ETH_RPC_URL not set in .env")
@@ -72,34 +222,28 @@ def main():
         print("[ERROR] SKINDEX_CONTRACT_ADDRESS not set in .env")
         return
 
-    # Initialize Web3 & contract
-    w3 = Web3(Web3.HTTPProvider(ETH_RPC_URL))
-    if not w3.is_connected():
-        print("[ERROR] Could not connect to Ethereum RPC at", ETH_RPC_URL)
-        return
-
-    contract = w3.eth.contract(address=w3.to_checksum_address(SKINDEX_ADDRESS), abi=SKINDEX_ABI)
-
-    # Fetch prices
-    try:
-        eth_usd = fetch_eth_price()
-    except Exception as e:
-        print("[ERROR] Failed to fetch ETH price:", e)
+    reader = NavReader(ETH_RPC_URL, SKINDEX_ADDRESS)
+    history = token_history()
+    if daemon:
+        print(f"[DAEMON] Polling {SKINDEX_ADDRESS} every {interval:g}s")
+        try:
+            run_daemon(reader, history, interval)
+        except KeyboardInterrupt:
+            print("[DAEMON] Stopped.")
         return
-
     try:
-        price_eth = fetch_skindex_nav_per_token(w3, contract)
+        snapshot(reader, history)
     except Exception as e:
-        print("[ERROR] Failed to fetch SKINDEX NAV per token:", e)
-        return
-
-    price_usd = price_eth * eth_usd
-    timestamp = datetime.now(timezone.utc).isoformat()
-
-    # Write to CSV
-    ensure_csv_header(OUTPUT_CSV)
-    append_price_snapshot(OUTPUT_CSV, timestamp, price_usd, price_eth, eth_usd)
-    print(f"[{timestamp}] SKINDEX = {price_usd:.2f} USD | {price_eth:.6f} ETH (ETH/USD = {eth_usd:.2f})")
+        print("[ERROR] Failed to record SKINDEX price:", e)
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--daemon', action='store_true', help='Keep running and snapshot every --interval')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='Seconds between snapshots')
+    parser.add_argument('--selftest', action='store_true', help='Run against a local stand-in RPC server')
+    args = parser.parse_args()
+    if args.selftest:
+        selftest()
+    else:
+        main(args.daemon, args.interval)